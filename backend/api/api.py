@@ -8,12 +8,23 @@ import time
 import platform
 import logging
 import asyncio
+import inspect
 import subprocess
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
 from pydantic import BaseModel
 
+from utils.fast_json import FastJSONResponse
+from utils.response_cache import response_cache
+from utils.single_flight import get_all_stats as get_single_flight_stats
+from utils.request_metrics import request_metrics, timed
+from utils.sampling_profiler import sampling_profiler
+from utils.memory_diagnostics import memory_diagnostics, GROUP_BY
+from utils.settings import get_section
+
 # 首先设置日志器
 logger = logging.getLogger("x2-launcher.api")
 
@@ -63,24 +74,224 @@ async def diagnose_api(request: Request):
         }
         routes.append(route_info)
     
+    # 多进程模式下与状态中心的连接
+    hub = getattr(request.app.state, "hub", None)
+    loop_monitor = getattr(request.app.state, "loop_monitor", None)
+    # 配置文件监视器由配置缓存关联，多进程模式下在状态中心
+    instance_config = getattr(request.app.state, "instance_config", None)
+    config_watcher = None
+    if instance_config is not None:
+        try:
+            config_watcher = await instance_config.get_watcher_stats()
+        except Exception as e:
+            config_watcher = {"error": str(e)}
+
     # 返回应用状态信息
     return {
         "routes_count": len(routes),
         "routes": routes,
         "environment": platform.platform(),
         "python_version": platform.python_version(),
+        "response_cache": response_cache.get_stats(),
+        "single_flight": get_single_flight_stats(),
+        "hub": hub.get_stats() if hub is not None else None,
+        "event_loop": loop_monitor.get_stats() if loop_monitor is not None else None,
+        "config_watcher": config_watcher,
         "timestamp": time.time()
     }
 
+# 启动耗时分析
+@router.get("/debug/startup")
+async def get_startup_report(request: Request, top: int = 50, sort: str = "self_ms"):
+    """返回启动各阶段耗时；以 X2_STARTUP_PROFILE=1 启动时包含各模块导入耗时"""
+    profiler = getattr(request.app.state, "startup_profiler", None)
+    if profiler is None:
+        raise HTTPException(status_code=503, detail="启动耗时分析不可用")
+    if sort not in ("self_ms", "cumulative_ms"):
+        raise HTTPException(status_code=400, detail=f"不支持的排序字段: {sort}")
+    return profiler.report(top=top, sort=sort)
+
+# 请求耗时统计
+@router.get("/debug/perf")
+async def get_perf_report(sort: str = "p99"):
+    """返回各路由的延迟分位数、状态码、响应大小及最近的慢请求"""
+    if sort not in ("p50", "p95", "p99", "max", "mean", "count"):
+        raise HTTPException(status_code=400, detail=f"不支持的排序字段: {sort}")
+    return FastJSONResponse(request_metrics.report(sort=sort))
+
+@router.delete("/debug/perf")
+async def reset_perf_report():
+    """清空请求耗时统计"""
+    request_metrics.reset()
+    return {"success": True}
+
+# 事件循环延迟
+@router.get("/debug/loop")
+async def get_loop_report(request: Request):
+    """返回事件循环调度延迟的分位数及最近的阻塞记录（含阻塞时的调用栈）"""
+    monitor = getattr(request.app.state, "loop_monitor", None)
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="事件循环延迟监控未启用")
+    return FastJSONResponse(monitor.report())
+
+@router.delete("/debug/loop")
+async def reset_loop_report(request: Request):
+    """清空事件循环延迟统计和阻塞记录"""
+    monitor = getattr(request.app.state, "loop_monitor", None)
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="事件循环延迟监控未启用")
+    monitor.reset()
+    return {"success": True}
+
+# CPU分析
+def _profiler_config() -> Dict[str, Any]:
+    config = get_section("perf").get("profiler", {})
+    if not config.get("enabled", True):
+        raise HTTPException(status_code=403, detail="CPU分析已在配置中禁用")
+    return config
+
+@router.post("/debug/profile/start")
+async def start_profile(interval_ms: float = 10, duration: float = 30):
+    """开始采样式CPU分析，到达duration秒后自动停止"""
+    config = _profiler_config()
+    max_duration = float(config.get("max_duration", 300))
+    if duration <= 0 or duration > max_duration:
+        raise HTTPException(status_code=400, detail=f"分析时长需在 0 到 {max_duration:.0f} 秒之间")
+    try:
+        sampling_profiler.start(interval=interval_ms / 1000, duration=duration)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return sampling_profiler.status()
+
+@router.post("/debug/profile/stop")
+async def stop_profile():
+    """停止CPU分析，结果保留到下一次开始"""
+    _profiler_config()
+    await asyncio.get_running_loop().run_in_executor(None, sampling_profiler.stop)
+    return sampling_profiler.status()
+
+@router.get("/debug/profile")
+async def get_profile_status():
+    """返回CPU分析的状态"""
+    return sampling_profiler.status()
+
+@router.get("/debug/profile/collapsed")
+async def download_profile_collapsed(by_thread: bool = True):
+    """下载collapsed格式的调用栈（flamegraph.pl / speedscope可直接读取）"""
+    _profiler_config()
+    if not sampling_profiler.samples:
+        raise HTTPException(status_code=404, detail="没有分析数据")
+    data = await asyncio.get_running_loop().run_in_executor(None, sampling_profiler.collapsed, by_thread)
+    return PlainTextResponse(data, headers={"Content-Disposition": 'attachment; filename="x2-profile.collapsed.txt"'})
+
+@router.get("/debug/profile/pstats")
+async def download_profile_pstats():
+    """下载pstats格式的统计文件"""
+    _profiler_config()
+    if not sampling_profiler.samples:
+        raise HTTPException(status_code=404, detail="没有分析数据")
+    data = await asyncio.get_running_loop().run_in_executor(None, sampling_profiler.pstats_data)
+    return Response(data, media_type="application/octet-stream",
+                    headers={"Content-Disposition": 'attachment; filename="x2-profile.pstats"'})
+
+# 内存诊断
+def _memory_config() -> Dict[str, Any]:
+    config = get_section("perf").get("memory", {})
+    if not config.get("enabled", True):
+        raise HTTPException(status_code=403, detail="内存诊断已在配置中禁用")
+    return config
+
+def _check_group_by(group_by: str) -> None:
+    if group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"不支持的分组方式: {group_by}")
+
+@router.get("/debug/memory")
+async def get_memory_report():
+    """返回进程内存、tracemalloc状态、GC统计及各缓存和缓冲区的大小"""
+    _memory_config()
+    return FastJSONResponse(memory_diagnostics.report())
+
+@router.post("/debug/memory/tracemalloc")
+async def start_tracemalloc(frames: int = 1):
+    """开启tracemalloc，frames为每次分配记录的调用栈深度（修改深度会丢弃已有快照）"""
+    _memory_config()
+    memory_diagnostics.start_tracing(frames)
+    return memory_diagnostics.tracemalloc_status()
+
+@router.delete("/debug/memory/tracemalloc")
+async def stop_tracemalloc():
+    """关闭tracemalloc并丢弃所有快照"""
+    _memory_config()
+    memory_diagnostics.stop_tracing()
+    return memory_diagnostics.tracemalloc_status()
+
+@router.post("/debug/memory/snapshots")
+async def take_memory_snapshot(name: str):
+    """保存命名的tracemalloc快照"""
+    _memory_config()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, memory_diagnostics.take_snapshot, name)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.delete("/debug/memory/snapshots/{name}")
+async def delete_memory_snapshot(name: str):
+    """删除快照"""
+    _memory_config()
+    if not memory_diagnostics.delete_snapshot(name):
+        raise HTTPException(status_code=404, detail=f"快照不存在: {name}")
+    return {"success": True}
+
+@router.get("/debug/memory/top")
+async def get_memory_top(snapshot: Optional[str] = None, top: int = 20, group_by: str = "lineno"):
+    """快照中占用最多的分配位置，未指定快照时使用当前状态"""
+    _memory_config()
+    _check_group_by(group_by)
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, memory_diagnostics.top, snapshot, top, group_by
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"快照不存在: {snapshot}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FastJSONResponse(result)
+
+@router.get("/debug/memory/diff")
+async def get_memory_diff(old: str, new: Optional[str] = None, top: int = 20, group_by: str = "lineno"):
+    """两次快照间按分配位置的内存变化，未指定new时与当前状态对比"""
+    _memory_config()
+    _check_group_by(group_by)
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, memory_diagnostics.diff, old, new, top, group_by
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"快照不存在: {e.args[0]}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FastJSONResponse(result)
+
+@router.get("/debug/memory/types")
+async def get_memory_object_types(top: int = 30):
+    """GC跟踪的对象按类型计数"""
+    _memory_config()
+    return await asyncio.get_running_loop().run_in_executor(None, memory_diagnostics.object_types, top)
+
+@router.post("/debug/memory/gc")
+async def run_gc():
+    """执行一次完整的垃圾回收"""
+    _memory_config()
+    return memory_diagnostics.collect()
+
 # 状态API
 @router.get("/status")
 async def get_status(request: Request):
     """获取系统状态"""
     try:
-        # 使用系统信息服务
+        # 使用系统信息服务，服务状态没有版本号，使用短时缓存
         system_info = request.app.state.system_info
-        status = await system_info.get_service_status()
-        return status
+        return await response_cache.respond_ttl(request, "status", system_info.get_service_status, ttl=2.0)
     except Exception as e:
         logger.error(f"获取状态失败: {e}", exc_info=True)
         # 使用备选数据
@@ -96,10 +307,13 @@ async def get_status(request: Request):
 async def get_instances(request: Request):
     """获取已安装的实例列表"""
     try:
-        # 使用实例管理器
+        # 使用实例管理器，实例列表未变化时直接返回缓存
         instance_manager = request.app.state.instance_manager
-        instances = await instance_manager.get_instances()
-        return {"instances": instances}
+
+        async def compute():
+            return {"instances": await instance_manager.get_instances()}
+
+        return await response_cache.respond(request, "instances", await instance_manager.state_version(), compute)
     except Exception as e:
         logger.error(f"获取实例列表失败: {e}", exc_info=True)
         return {"instances": [], "error": str(e)}
@@ -123,6 +337,61 @@ async def start_instance(instance_name: str, request: Request):
         logger.error(f"启动实例失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+# 实例配置API
+def _instance_config(request: Request):
+    store = getattr(request.app.state, "instance_config", None)
+    if store is None:
+        raise HTTPException(status_code=503, detail="实例配置缓存不可用")
+    return store
+
+
+def _config_error(instance_name: str, error: Exception) -> HTTPException:
+    """实例配置操作的异常对应的HTTP错误"""
+    from scripts.configurator import ConfigConflictError
+
+    if isinstance(error, ConfigConflictError):
+        return HTTPException(status_code=409, detail=str(error))
+    if isinstance(error, LookupError):
+        return HTTPException(status_code=404, detail=str(error))
+    if isinstance(error, ValueError):
+        return HTTPException(status_code=400, detail=str(error))
+    logger.error(f"实例 {instance_name} 配置操作失败: {error}", exc_info=True)
+    return HTTPException(status_code=500, detail=str(error))
+
+
+@router.get("/instances/config")
+async def query_instance_configs(request: Request, port: Optional[int] = None, qq: Optional[str] = None,
+                                 model: Optional[str] = None):
+    """在配置缓存中查找使用指定端口 / QQ号 / 模型的实例，不读取配置文件"""
+    store = _instance_config(request)
+    matches = await store.find(port=port, qq_number=qq, model=model)
+    return {"instances": matches, "count": len(matches)}
+
+
+@router.get("/instances/{instance_name}/config")
+async def get_instance_config(instance_name: str, request: Request):
+    """实例的 .env、bot_config.toml、适配器 config.toml 及实际使用的端口、QQ号和模型"""
+    store = _instance_config(request)
+    try:
+        return await store.get_config(instance_name)
+    except Exception as e:
+        raise _config_error(instance_name, e)
+
+
+@router.patch("/instances/{instance_name}/config")
+async def patch_instance_config(instance_name: str, request: Request, patch: Dict[str, Any],
+                                allow_lossy: bool = False):
+    """按JSON Merge Patch修改实例配置: {"env": {...}, "bot_config": {...}, "adapter": {...}}
+
+    值为null的键会被删除。只写入内容有变化的文件，实例运行中时重启配置有改动的组件。
+    组件未部署，或未安装tomlkit时修改含有注释的TOML文件且未指定 allow_lossy=true，返回409。
+    """
+    store = _instance_config(request)
+    try:
+        return await store.patch(instance_name, patch, allow_lossy)
+    except Exception as e:
+        raise _config_error(instance_name, e)
+
 # 停止实例API
 @router.post("/stop")
 async def stop_instance(request: Request):
@@ -150,44 +419,77 @@ async def open_folder(data: dict):
     if not path or not os.path.exists(path):
         raise HTTPException(status_code=400, detail="路径不存在")
     
+    if sys.platform == "win32":
+        command = ["explorer", path]
+    elif sys.platform == "darwin":
+        command = ["open", path]
+    else:
+        command = ["xdg-open", path]
     try:
-        if sys.platform == "win32":
-            subprocess.run(["explorer", path])
-        elif sys.platform == "darwin":
-            subprocess.run(["open", path])
-        else:
-            subprocess.run(["xdg-open", path])
+        # 等待文件管理器进程返回会阻塞事件循环，放到线程池执行
+        await asyncio.get_running_loop().run_in_executor(None, subprocess.run, command)
         return {"success": True}
     except Exception as e:
         logger.error(f"打开文件夹失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """解析Unix时间戳或ISO格式时间"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的时间格式: {value}")
+
 # 日志API
 @router.get("/logs/system")
-async def get_system_logs():
-    """获取系统日志"""
-    try:
-        # 从日志文件读取或使用内存中的日志
-        logs = [
-            {"time": "2023-05-07 17:15:22", "level": "INFO", "message": "系统启动"},
-            {"time": "2023-05-07 17:15:25", "level": "INFO", "message": "MongoDB 连接成功"},
-            {"time": "2023-05-07 17:15:30", "level": "WARNING", "message": "NoneBot 适配器未启动"},
-            {"time": "2023-05-07 17:16:45", "level": "ERROR", "message": "MaiBot 初始化失败: 配置文件损坏"}
-        ]
-        return {"logs": logs}
+async def get_system_logs(request: Request, level: Optional[str] = None, since: Optional[str] = None,
+                          until: Optional[str] = None, limit: int = 200, cursor: Optional[int] = None):
+    """获取系统日志
+
+    Args:
+        level: 最低日志级别，例如 WARNING
+        since / until: 时间范围，Unix时间戳或ISO格式
+        limit: 最多返回的条数
+        cursor: 上一页返回的next_cursor，用于继续向前翻页
+    """
+    log_store = getattr(request.app.state, "log_store", None)
+    if log_store is None:
+        return {"logs": [], "next_cursor": None, "error": "未配置日志文件"}
+
+    level_no = None
+    if level:
+        level_no = logging.getLevelName(level.upper())
+        if not isinstance(level_no, int):
+            raise HTTPException(status_code=400, detail=f"无效的日志级别: {level}")
+
+    since_ts, until_ts = _parse_time(since), _parse_time(until)
+    try:
+        # 读取文件放到线程池，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, lambda: log_store.query(level=level_no, since=since_ts, until=until_ts, limit=limit, cursor=cursor)
+        )
+        # 结果只包含基本类型，直接返回响应对象以跳过jsonable_encoder
+        return FastJSONResponse(result)
     except Exception as e:
         logger.error(f"获取系统日志失败: {e}", exc_info=True)
-        return {"logs": [], "error": str(e)}
+        return {"logs": [], "next_cursor": None, "error": str(e)}
 
 # 实例统计API - 旧版路径（保持兼容）
 @router.get("/instance-stats")
 async def get_instance_stats_old(request: Request):
     """获取实例统计数据（旧API，保留兼容性）"""
     try:
-        logger.info("通过旧API路径请求实例统计数据")
         instance_manager = request.app.state.instance_manager
-        stats = await instance_manager.get_instance_stats()
-        return stats
+        return await response_cache.respond(
+            request, "instance-stats", await instance_manager.state_version(), instance_manager.get_instance_stats
+        )
     except Exception as e:
         logger.error(f"获取实例统计数据失败: {e}", exc_info=True)
         return {"total": 0, "running": 0, "error": str(e)}
@@ -197,10 +499,93 @@ async def get_instance_stats_old(request: Request):
 async def get_instances_stats(request: Request):
     """获取实例统计数据 - 新版API"""
     try:
-        logger.info("通过新API路径请求实例统计数据")
         instance_manager = request.app.state.instance_manager
-        stats = await instance_manager.get_instance_stats()
-        return stats
+        return await response_cache.respond(
+            request, "instance-stats", await instance_manager.state_version(), instance_manager.get_instance_stats
+        )
     except Exception as e:
         logger.error(f"获取实例统计数据失败: {e}", exc_info=True)
         return {"total": 0, "running": 0, "error": str(e)}
+
+# 告警API
+@router.get("/alerts")
+async def get_alerts(request: Request):
+    """获取告警规则、活跃告警和最近的告警历史"""
+    alert_engine = getattr(request.app.state, "alert_engine", None)
+    if alert_engine is None:
+        return {"rules": [], "active": [], "history": [], "error": "告警引擎未启动"}
+    status = alert_engine.get_status()
+    if inspect.isawaitable(status):
+        # 多进程模式下告警在状态中心评估
+        status = await status
+    return FastJSONResponse(status)
+
+# 仪表盘聚合API
+async def _dashboard_status(state) -> Dict[str, Any]:
+    # 与/status共用短时缓存
+    _, value = await response_cache.memo.get("status", state.system_info.get_service_status, ttl=2.0)
+    return value
+
+async def _dashboard_instances(state) -> List[Dict[str, Any]]:
+    return await state.instance_manager.get_instances()
+
+async def _dashboard_stats(state) -> Dict[str, Any]:
+    return await state.instance_manager.get_instance_stats()
+
+async def _dashboard_performance(state) -> Dict[str, Any]:
+    _, value = await response_cache.memo.get("performance", state.system_info.get_system_metrics, ttl=2.0)
+    return value
+
+async def _dashboard_logs(state) -> Dict[str, Any]:
+    # 最近的警告及错误日志
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, lambda: state.log_store.query(level=logging.WARNING, limit=200))
+
+async def _dashboard_health(state) -> Dict[str, Any]:
+    health = await health_check()
+    services = getattr(state, "services", None)
+    health["ready"] = services.ready if services is not None else False
+    return health
+
+DASHBOARD_SECTIONS = {
+    "health": _dashboard_health,
+    "status": _dashboard_status,
+    "instances": _dashboard_instances,
+    "stats": _dashboard_stats,
+    "performance": _dashboard_performance,
+    "logs": _dashboard_logs,
+}
+
+async def _dashboard_section(name: str, state) -> Any:
+    # 各分区的耗时会出现在慢请求日志的耗时分解中
+    with timed(f"dashboard.{name}"):
+        return await DASHBOARD_SECTIONS[name](state)
+
+@router.get("/dashboard")
+async def get_dashboard(request: Request, sections: Optional[str] = None):
+    """一次获取仪表盘所需的多个数据分区，各分区并发获取
+
+    Args:
+        sections: 逗号分隔的分区名，可选 health,status,instances,stats,performance,logs，默认全部
+    """
+    if sections:
+        names = list(dict.fromkeys(name.strip() for name in sections.split(",") if name.strip()))
+    else:
+        names = list(DASHBOARD_SECTIONS)
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知的分区: {', '.join(unknown)}")
+
+    state = request.app.state
+    results = await asyncio.gather(*[_dashboard_section(name, state) for name in names], return_exceptions=True)
+
+    data: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            # 单个分区失败不影响其他分区
+            logger.error(f"获取仪表盘分区 {name} 失败: {result}")
+            errors[name] = str(result)
+        else:
+            data[name] = result
+    return FastJSONResponse({"sections": data, "errors": errors, "timestamp": time.time()})
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+API响应序列化与压缩基准测试
+
+在临时目录中生成合成数据（实例目录、系统日志），对数据量最大的接口
+（/api/instances、/api/logs/system、/api/dashboard）比较：
+  1. 序列化：默认路径（jsonable_encoder + 标准库JSONResponse）与 FastJSONResponse
+  2. 压缩：各接口响应体在 gzip / brotli 下的大小与耗时
+  3. 端到端：通过ASGI直接请求后端，比较不压缩与压缩时的延迟和传输字节数
+
+用法:
+    python benchmarks/api_responses.py --instances 300 --logs 5000 --iterations 200
+    python benchmarks/api_responses.py --output result.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+from typing import Dict, Any, List, Callable
+
+# 确保可以导入后端模块（与main.py相同的导入方式）
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+ENDPOINTS = {
+    "instances": "/api/instances",
+    "logs": "/api/logs/system?limit=5000",
+    "dashboard": "/api/dashboard?sections=status,instances,stats,logs",
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算分位数（values需已排序）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """耗时统计（毫秒）"""
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def time_call(fn: Callable[[], Any], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def prepare_fixtures(root: str, instances: int, logs: int) -> None:
+    """生成合成实例目录和配置，并设置环境变量使后端使用它们"""
+    home = os.path.join(root, "home")
+    for i in range(instances):
+        instance_dir = os.path.join(home, "MaiM-with-u", f"bench-instance-{i:04d}")
+        os.makedirs(os.path.join(instance_dir, "MaiBot"), exist_ok=True)
+        os.makedirs(os.path.join(instance_dir, "MaiBot-Napcat-Adapter"), exist_ok=True)
+
+    from utils.settings import SETTINGS_PATH
+    with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    settings.setdefault("logging", {})["file_path"] = os.path.join(root, "logs", "app.log")
+    settings["logging"]["max_size"] = "1GB"
+    settings["logging"]["bridge"] = dict(settings["logging"].get("bridge", {}), level="CRITICAL")
+    # 压缩与否由请求的Accept-Encoding决定，中间件需保持启用
+    settings.setdefault("http", {})["compression"] = dict(settings["http"].get("compression", {}), enabled=True)
+    settings_path = os.path.join(root, "settings.json")
+    with open(settings_path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, ensure_ascii=False)
+
+    os.environ["HOME"] = home
+    os.environ["USERPROFILE"] = home
+    os.environ["X2_SETTINGS"] = settings_path
+
+
+def fill_logs(log_store, count: int) -> None:
+    """直接写入日志文件，不经过控制台输出"""
+    levels = [logging.INFO, logging.INFO, logging.WARNING, logging.ERROR]
+    for i in range(count):
+        record = logging.makeLogRecord({
+            "name": "x2-launcher.bench",
+            "levelno": levels[i % len(levels)],
+            "levelname": logging.getLevelName(levels[i % len(levels)]),
+            "msg": f"合成日志 #{i} 实例 bench-instance-{i % 100:04d} 状态检查完成，耗时 {i % 997} ms",
+        })
+        log_store.handler.handle(record)
+
+
+def bench_serialization(payloads: Dict[str, Any], iterations: int) -> Dict[str, Any]:
+    """比较默认JSON序列化路径与FastJSONResponse"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from utils.fast_json import FastJSONResponse
+
+    results = {}
+    for name, payload in payloads.items():
+        before = summarize(time_call(lambda: JSONResponse(jsonable_encoder(payload)), iterations))
+        after = summarize(time_call(lambda: FastJSONResponse(payload), iterations))
+        results[name] = {
+            "bytes_before": len(JSONResponse(jsonable_encoder(payload)).body),
+            "bytes_after": len(FastJSONResponse(payload).body),
+            "before": before,
+            "after": after,
+            "speedup_p50": round(before["p50_ms"] / after["p50_ms"], 2) if after["p50_ms"] else None,
+        }
+    return results
+
+
+def bench_compression(bodies: Dict[str, bytes], iterations: int) -> Dict[str, Any]:
+    """各响应体在不同压缩方式下的大小与耗时"""
+    from utils.compression import CompressionMiddleware, BROTLI_AVAILABLE
+
+    middleware = CompressionMiddleware(None)
+    encodings = ["gzip"] + (["br"] if BROTLI_AVAILABLE else [])
+    results = {}
+    for name, body in bodies.items():
+        entry = {"identity_bytes": len(body)}
+        for encoding in encodings:
+            compressed = middleware.compress(body, encoding)
+            entry[encoding] = {
+                "bytes": len(compressed),
+                "ratio": round(len(compressed) / len(body), 4) if body else 0,
+                "time": summarize(time_call(lambda: middleware.compress(body, encoding), iterations)),
+            }
+        results[name] = entry
+    return results
+
+
+async def bench_end_to_end(app, iterations: int) -> Dict[str, Any]:
+    """通过ASGI直接请求接口，比较不压缩与压缩时的延迟和传输字节数"""
+    import httpx
+    from utils.compression import BROTLI_AVAILABLE
+
+    modes = {"identity": "identity", "gzip": "gzip"}
+    if BROTLI_AVAILABLE:
+        modes["br"] = "br"
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path in ENDPOINTS.items():
+            results[name] = {}
+            for mode, accept in modes.items():
+                headers = {"Accept-Encoding": accept}
+                samples = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    response = await client.get(path, headers=headers)
+                    samples.append(time.perf_counter() - started)
+                results[name][mode] = {
+                    "status": response.status_code,
+                    "content_encoding": response.headers.get("content-encoding", "identity"),
+                    # Content-Length为实际传输（压缩后）的字节数
+                    "wire_bytes": int(response.headers.get("content-length", len(response.content))),
+                    "latency": summarize(samples),
+                }
+    return results
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    root = tempfile.mkdtemp(prefix="x2-bench-")
+    try:
+        prepare_fixtures(root, args.instances, args.logs)
+
+        logging.getLogger().setLevel(logging.WARNING)
+        import main as backend_main
+        from services.instance_manager import InstanceManager
+        from services.system_info import SystemInfoService
+
+        app = backend_main.app
+        if getattr(app.state, "instance_manager", None) is None:
+            app.state.instance_manager = InstanceManager()
+        if getattr(app.state, "system_info", None) is None:
+            app.state.system_info = SystemInfoService()
+
+        log_store = app.state.log_store
+        fill_logs(log_store, args.logs)
+
+        async def collect_payloads():
+            instances = await app.state.instance_manager.get_instances()
+            return {
+                "instances": {"instances": instances},
+                "logs": log_store.query(limit=5000),
+            }
+
+        payloads = asyncio.run(collect_payloads())
+        from utils.fast_json import dumps, ORJSON_AVAILABLE
+        end_to_end = asyncio.run(bench_end_to_end(app, args.iterations))
+
+        from utils.compression import BROTLI_AVAILABLE
+        return {
+            "config": {
+                "instances": args.instances,
+                "logs": args.logs,
+                "iterations": args.iterations,
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "orjson": ORJSON_AVAILABLE,
+                "brotli": BROTLI_AVAILABLE,
+            },
+            "serialization": bench_serialization(payloads, args.iterations),
+            "compression": bench_compression({name: dumps(p) for name, p in payloads.items()}, args.iterations),
+            "end_to_end": end_to_end,
+        }
+    finally:
+        logging.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API响应序列化与压缩基准测试")
+    parser.add_argument("--instances", type=int, default=300, help="合成实例数量")
+    parser.add_argument("--logs", type=int, default=5000, help="合成日志条数")
+    parser.add_argument("--iterations", type=int, default=100, help="每项测试的重复次数")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+
+    print("\nJSON结果:")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n结果已保存至: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
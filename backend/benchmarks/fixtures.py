@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成数据
+
+全部在本地生成，不需要网络:
+  - MaiM-with-u 实例目录树（数百至数千个实例，每个实例带MaiBot/适配器的配置文件）
+  - 代替 MaiBot 与 MaiBot-Napcat-Adapter 仓库的本地git仓库（以 file:// 地址克隆）
+  - 本地wheel目录，部署时pip只从这里安装依赖
+
+prepare() 会设置环境变量，使后端、下载器、配置器和pip使用这些数据。
+"""
+import os
+import sys
+import json
+import base64
+import shutil
+import hashlib
+import zipfile
+import subprocess
+from typing import Dict, Any, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 合成依赖包，写入MaiBot仓库的requirements.txt
+DEPENDENCIES = [("x2-bench-dep-a", "1.0.0"), ("x2-bench-dep-b", "2.1.0")]
+
+MAIBOT_FILES = {
+    "app.py": "print('MaiBot bench fixture')\n",
+    "requirements.txt": "".join(f"{name}=={version}\n" for name, version in DEPENDENCIES),
+    "template/template.env": "HOST=127.0.0.1\nPORT=8000\n",
+    "template/bot_config_template.toml": (
+        "[inner]\nversion = \"1.0.0\"\n\n"
+        "[bot]\nqq = 0\nnickname = \"麦麦\"\n\n"
+        "[message]\nmax_context_size = 15\nemoji_chance = 0.2\n"
+    ),
+}
+
+ADAPTER_FILES = {
+    "main.py": "print('Adapter bench fixture')\n",
+    "requirements.txt": "",
+    "template/template_config.toml": (
+        "[Napcat_Server]\nhost = \"localhost\"\nport = 8095\nheartbeat = 30\n\n"
+        "[MaiBot_Server]\nplatform_name = \"qq\"\nhost = \"localhost\"\nport = 8000\n\n"
+        "[Napcat]\nQQ = \"0\"\n\n"
+        "[Adapter]\nport = 18002\n"
+    ),
+}
+
+
+def _git(args: List[str], cwd: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=x2-bench", "-c", "user.email=bench@localhost", "-c", "commit.gpgsign=false"] + args,
+        cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def make_git_repo(path: str, files: Dict[str, str]) -> str:
+    """创建带一次提交的git仓库，返回 file:// 地址（浅克隆需要file协议）"""
+    for name, content in files.items():
+        file_path = os.path.join(path, name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    _git(["init", "-q"], path)
+    _git(["add", "-A"], path)
+    _git(["commit", "-q", "-m", "bench fixture"], path)
+    return "file://" + os.path.abspath(path).replace(os.sep, "/")
+
+
+def _record_hash(data: bytes) -> str:
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode("ascii")
+    return f"sha256={digest},{len(data)}"
+
+
+def build_wheel(wheelhouse: str, name: str, version: str) -> str:
+    """生成一个纯Python的wheel（不依赖setuptools/wheel）"""
+    module = name.replace("-", "_")
+    dist_info = f"{module}-{version}.dist-info"
+    files = {
+        f"{module}/__init__.py": f"__version__ = \"{version}\"\n".encode("utf-8"),
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n".encode("utf-8"),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: x2-bench\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = "".join(f"{path},{_record_hash(data)}\n" for path, data in files.items())
+    record += f"{dist_info}/RECORD,,\n"
+    files[f"{dist_info}/RECORD"] = record.encode("utf-8")
+
+    path = os.path.join(wheelhouse, f"{module}-{version}-py3-none-any.whl")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as wheel:
+        for file_name, data in files.items():
+            wheel.writestr(file_name, data)
+    return path
+
+
+def _write_files(path: str, files: Dict[str, str], names: List[str]) -> None:
+    for name in names:
+        file_path = os.path.join(path, name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(files[name])
+
+
+def make_instance_tree(base_dir: str, count: int) -> List[str]:
+    """生成合成实例目录，每个实例带 .env、bot_config.toml、适配器 config.toml 及与仓库相同的模板文件"""
+    names = []
+    for i in range(count):
+        name = f"bench-instance-{i:04d}"
+        instance_dir = os.path.join(base_dir, name)
+        config_dir = os.path.join(instance_dir, "MaiBot", "config")
+        adapter_dir = os.path.join(instance_dir, "MaiBot-Napcat-Adapter")
+        os.makedirs(config_dir, exist_ok=True)
+        _write_files(os.path.join(instance_dir, "MaiBot"), MAIBOT_FILES,
+                     ["template/template.env", "template/bot_config_template.toml"])
+        _write_files(adapter_dir, ADAPTER_FILES, ["template/template_config.toml"])
+        with open(os.path.join(instance_dir, "MaiBot", ".env"), "w", encoding="utf-8") as f:
+            f.write(f"HOST=0.0.0.0\nPORT={8000 + i}\n")
+        with open(os.path.join(config_dir, "bot_config.toml"), "w", encoding="utf-8") as f:
+            f.write(MAIBOT_FILES["template/bot_config_template.toml"].replace("qq = 0", f"qq = {100000 + i}"))
+        with open(os.path.join(adapter_dir, "config.toml"), "w", encoding="utf-8") as f:
+            f.write(ADAPTER_FILES["template/template_config.toml"]
+                    .replace("port = 18002", f"port = {18002 + i}")
+                    .replace("QQ = \"0\"", f"QQ = \"{100000 + i}\""))
+        names.append(name)
+    return names
+
+
+def write_settings(root: str) -> str:
+    """复制settings.json，日志写入临时目录并关闭日志推送"""
+    from utils.settings import SETTINGS_PATH
+    with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    settings.setdefault("logging", {})["file_path"] = os.path.join(root, "logs", "app.log")
+    settings["logging"]["max_size"] = "1GB"
+    settings["logging"]["bridge"] = dict(settings["logging"].get("bridge", {}), level="CRITICAL")
+    settings.setdefault("server", {})["workers"] = 1
+    path = os.path.join(root, "settings.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, ensure_ascii=False)
+    return path
+
+
+def prepare(root: str, instances: int) -> Dict[str, Any]:
+    """在root下生成全部合成数据并设置环境变量，返回各路径"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+
+    home = os.path.join(root, "home")
+    instances_dir = os.path.join(home, "MaiM-with-u")
+    repos_dir = os.path.join(root, "repos")
+    wheelhouse = os.path.join(root, "wheelhouse")
+    deploy_root = os.path.join(root, "deploy")
+    for path in (instances_dir, repos_dir, wheelhouse, deploy_root):
+        os.makedirs(path, exist_ok=True)
+
+    names = make_instance_tree(instances_dir, instances)
+    maibot_repo = make_git_repo(os.path.join(repos_dir, "MaiBot"), MAIBOT_FILES)
+    adapter_repo = make_git_repo(os.path.join(repos_dir, "MaiBot-Napcat-Adapter"), ADAPTER_FILES)
+    for name, version in DEPENDENCIES:
+        build_wheel(wheelhouse, name, version)
+
+    environ = {
+        "HOME": home,
+        "USERPROFILE": home,
+        "X2_SETTINGS": write_settings(root),
+        "X2_INSTANCES_DIR": instances_dir,
+        "X2_MAIBOT_REPO": maibot_repo,
+        "X2_ADAPTER_REPO": adapter_repo,
+        # pip只从本地wheel目录安装
+        "PIP_NO_INDEX": "1",
+        "PIP_FIND_LINKS": wheelhouse,
+        "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+    }
+    os.environ.update(environ)
+    return {
+        "root": root,
+        "instances_dir": instances_dir,
+        "instance_names": names,
+        "deploy_root": deploy_root,
+        "wheelhouse": wheelhouse,
+        "environ": environ,
+    }
+
+
+def cleanup(root: str) -> None:
+    shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+后端启动耗时测试
+
+多次以子进程方式启动 main.py（默认关闭自动重载），每10毫秒轮询一次 /api/health，
+统计从启动进程到健康检查首次成功的耗时。使用 --profile 时同时开启启动分析模式，
+并输出 /api/debug/startup 报告中耗时最多的模块。
+
+用法:
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --runs 3 --profile --output result.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import subprocess
+import urllib.request
+from typing import Dict, Any, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_json(url: str, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            if response.status == 200:
+                return json.loads(response.read().decode("utf-8"))
+    except Exception:
+        return None
+    return None
+
+
+def measure_once(profile: bool, reload: bool, timeout: float) -> Dict[str, Any]:
+    port = _free_port()
+    env = dict(os.environ, X2_PORT=str(port), X2_HOST="127.0.0.1", X2_RELOAD="true" if reload else "false", PYTHONIOENCODING="utf-8")
+    if profile:
+        env["X2_STARTUP_PROFILE"] = "1"
+
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "main.py"], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}/api"
+    elapsed = None
+    report = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                break
+            if _get_json(base_url + "/health", timeout=0.5) is not None:
+                elapsed = time.perf_counter() - started
+                break
+            time.sleep(0.01)
+        if elapsed is not None and profile:
+            report = _get_json(base_url + "/debug/startup", timeout=5)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    return {"health_ok_ms": round(elapsed * 1000, 1) if elapsed is not None else None, "report": report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后端启动耗时测试")
+    parser.add_argument("--runs", type=int, default=5, help="启动次数")
+    parser.add_argument("--timeout", type=float, default=60, help="单次启动的最长等待秒数")
+    parser.add_argument("--profile", action="store_true", help="开启启动分析模式并输出模块耗时")
+    parser.add_argument("--reload", action="store_true", help="以自动重载模式启动（默认关闭）")
+    parser.add_argument("--top", type=int, default=15, help="输出耗时最多的模块数量")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    samples: List[float] = []
+    last_report = None
+    for i in range(args.runs):
+        result = measure_once(args.profile, args.reload, args.timeout)
+        print(f"第 {i + 1} 次: 健康检查首次成功耗时 {result['health_ok_ms']} ms")
+        if result["health_ok_ms"] is not None:
+            samples.append(result["health_ok_ms"])
+        last_report = result["report"] or last_report
+
+    samples.sort()
+    result = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "runs": args.runs,
+        "reload": args.reload,
+        "succeeded": len(samples),
+        "health_ok_ms": {
+            "min": samples[0] if samples else None,
+            "median": samples[len(samples) // 2] if samples else None,
+            "max": samples[-1] if samples else None,
+        },
+    }
+    if last_report:
+        result["phases"] = last_report.get("phases")
+        result["modules"] = (last_report.get("modules") or [])[:args.top]
+
+    print("\nJSON结果:")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n结果已保存至: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+后端性能基准测试套件
+
+离线运行: 在临时目录中生成合成实例目录树、本地git仓库（代替MaiBot和适配器仓库）和
+本地wheel目录（见 fixtures.py），然后测量:
+  1. 实例列表与统计: 直接扫描目录的耗时，以及 /api/instances、/api/instances/stats 的请求延迟
+  2. 指标接口: /api/dashboard 性能分区、/api/alerts、/api/diagnose 及各调试接口的请求延迟，指标采样一次的耗时
+  3. 部署与更新: BotDownloader 从本地仓库克隆、创建虚拟环境并从本地wheel目录安装依赖；对同一实例再次部署即更新
+  4. 配置: BotConfigurator 首次配置（克隆适配器）与重复配置的耗时，以及 configure_fleet 按参数表批量配置合成实例的耗时
+  5. WebSocket广播: 以小规模参数运行 ws_fanout.py
+
+结果写为JSON（包含git提交号），使用 --baseline 指定之前的结果文件可输出各项p50的变化。
+
+用法:
+    python benchmarks/suite.py --instances 1000 --output result.json
+    python benchmarks/suite.py --skip deploy,ws --baseline before.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from typing import Dict, Any, List, Callable, Awaitable
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import fixtures  # noqa: E402  (benchmarks 目录即脚本所在目录)
+
+SECTIONS = ("instances", "metrics", "deploy", "configure", "ws")
+
+METRIC_ENDPOINTS = {
+    "dashboard_performance": "/api/dashboard?sections=performance",
+    "alerts": "/api/alerts",
+    "diagnose": "/api/diagnose",
+    "debug_perf": "/api/debug/perf",
+    "debug_loop": "/api/debug/loop",
+    "debug_memory": "/api/debug/memory",
+    "ws_stats": "/api/logs/ws/stats",
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算分位数（values需已排序）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """耗时统计（毫秒）"""
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+async def time_async(fn: Callable[[], Awaitable[Any]], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def git_commit() -> Dict[str, Any]:
+    """当前git提交号及工作区是否有未提交的修改"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def bench_app(app, iterations: int, running: int) -> Dict[str, Any]:
+    """在应用生命周期内测量实例列表和指标接口"""
+    import httpx
+
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        state = app.state
+        # 等待预热完成，避免首次扫描计入测量
+        deadline = time.perf_counter() + 60
+        while not state.services.ready and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+
+        manager = state.instance_manager
+        instances = await manager.get_instances()
+        for instance in instances[:running]:
+            await manager.start_instance(instance["name"])
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def get(path: str) -> None:
+                response = await client.get(path)
+                response.raise_for_status()
+
+            results["instances"] = {
+                "count": len(instances),
+                "scan": summarize(await time_async(manager.get_instances, iterations)),
+                "count_stats": summarize(await time_async(manager.get_instance_stats, iterations)),
+                # 版本号未变化时命中响应缓存
+                "api_instances": summarize(await time_async(lambda: get("/api/instances"), iterations)),
+                "api_instances_stats": summarize(await time_async(lambda: get("/api/instances/stats"), iterations)),
+            }
+
+            metrics: Dict[str, Any] = {}
+            sampler = getattr(state, "metrics_sampler", None)
+            if sampler is not None:
+                loop = asyncio.get_running_loop()
+                metrics["sampler_collect"] = summarize(
+                    await time_async(lambda: loop.run_in_executor(None, sampler.collect), iterations)
+                )
+            for name, path in METRIC_ENDPOINTS.items():
+                metrics[name] = summarize(await time_async(lambda: get(path), iterations))
+            results["metrics"] = metrics
+
+        await manager.stop_all_instances()
+    return results
+
+
+def bench_deploy(deploy_root: str, deploys: int) -> Dict[str, Any]:
+    """从本地仓库部署实例，再次部署同一实例作为更新"""
+    from scripts.downloader import BotDownloader
+
+    downloader = BotDownloader(deploy_root)
+    fresh, update = [], []
+    failures = 0
+    for i in range(deploys):
+        name = f"bench-deploy-{i}"
+        for samples in (fresh, update):
+            started = time.perf_counter()
+            # 下载器会打印git/pip输出，测量时丢弃
+            with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+                result = downloader.download(name, "latest")
+            samples.append(time.perf_counter() - started)
+            if not result.get("success"):
+                failures += 1
+                logging.getLogger("x2-launcher.bench").error(f"部署失败: {result.get('message')}")
+    return {"deploy": summarize(fresh), "update": summarize(update), "failures": failures}
+
+
+def bench_configure(deploy_root: str, configures: int) -> Dict[str, Any]:
+    """配置已部署的实例: 首次配置会克隆适配器，之后为重复配置"""
+    from scripts.configurator import BotConfigurator
+
+    instance_dir = os.path.join(deploy_root, "MaiM-with-u", "bench-deploy-0")
+    if not os.path.isdir(instance_dir):
+        return {"skipped": "没有已部署的实例（需要先运行deploy）"}
+    params = {
+        "qq_number": "123456",
+        "install_napcat": True,
+        "install_adapter": True,
+        "ports": {"maibot": 8000, "adapter": 18002, "napcat": 8095},
+    }
+    first, repeat = [], []
+    failures = 0
+    for i in range(configures + 1):
+        started = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            result = BotConfigurator(instance_dir, "bench-deploy-0").configure(dict(params, qq_number=str(123456 + i)))
+        (first if i == 0 else repeat).append(time.perf_counter() - started)
+        if not result.get("success"):
+            failures += 1
+    return {"first": summarize(first), "repeat": summarize(repeat), "failures": failures}
+
+
+def bench_fleet(instances_dir: str, names: List[str], fleet: int, rounds: int) -> Dict[str, Any]:
+    """按参数表批量配置前fleet个合成实例，每轮使用不同的QQ号和端口"""
+    from scripts.configurator import configure_fleet, template_cache
+
+    names = names[:fleet]
+    if not names:
+        return {"skipped": "没有合成实例"}
+    defaults = {"install_napcat": True, "install_adapter": True, "ports": {"napcat": 8095}}
+    template_cache.clear()
+    durations = []
+    failures = 0
+    for r in range(rounds):
+        table = [
+            {"instance_name": name, "qq_number": str(100000 + i + r),
+             "ports": {"maibot": 8000 + i, "adapter": 18002 + i}}
+            for i, name in enumerate(names)
+        ]
+        started = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            result = configure_fleet(instances_dir, table, defaults)
+        durations.append(time.perf_counter() - started)
+        failures += len(result["failed"])
+    return {"instances": len(names), "duration": summarize(durations), "failures": failures,
+            "template_cache": template_cache.get_stats()}
+
+
+def bench_ws(root: str, clients: int, duration: float) -> Dict[str, Any]:
+    """以子进程运行 ws_fanout.py，取其中的投递延迟和吞吐"""
+    output = os.path.join(root, "ws_fanout.json")
+    command = [
+        sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "ws_fanout.py"),
+        "--clients", str(clients), "--slow", str(max(1, clients // 10)), "--rate", "500",
+        "--duration", str(duration), "--drain", "5", "--procs", "1", "--output", output,
+    ]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if completed.returncode != 0 or not os.path.exists(output):
+        return {"error": f"ws_fanout.py 退出码 {completed.returncode}"}
+    with open(output, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    return {key: value for key, value in result.items() if key != "environment"}
+
+
+def _flatten_p50(data: Any, prefix: str = "") -> Dict[str, float]:
+    result = {}
+    if isinstance(data, dict):
+        if "p50_ms" in data:
+            result[prefix] = data["p50_ms"]
+        for key, value in data.items():
+            result.update(_flatten_p50(value, f"{prefix}.{key}" if prefix else key))
+    return result
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """逐项比较两次结果的p50"""
+    before = _flatten_p50(baseline.get("results", {}))
+    after = _flatten_p50(current.get("results", {}))
+    rows = []
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        rows.append({
+            "metric": key,
+            "baseline_p50_ms": old,
+            "p50_ms": new,
+            "change": round((new - old) / old, 4) if old else None,
+        })
+    return rows
+
+
+def run_suite(args) -> Dict[str, Any]:
+    skip = set(filter(None, (args.skip or "").split(",")))
+    root = tempfile.mkdtemp(prefix="x2-suite-")
+    try:
+        prepared_at = time.perf_counter()
+        paths = fixtures.prepare(root, args.instances)
+        fixture_ms = round((time.perf_counter() - prepared_at) * 1000, 1)
+
+        logging.getLogger().setLevel(logging.WARNING)
+        results: Dict[str, Any] = {}
+        if not {"instances", "metrics"} <= skip:
+            import main as backend_main
+            app_results = asyncio.run(bench_app(backend_main.app, args.iterations, args.running))
+            results.update({key: value for key, value in app_results.items() if key not in skip})
+        if "deploy" not in skip:
+            results["deploy"] = bench_deploy(paths["deploy_root"], args.deploys)
+        if "configure" not in skip:
+            results["configure"] = bench_configure(paths["deploy_root"], args.configures)
+            results["configure"]["fleet"] = bench_fleet(paths["instances_dir"], paths["instance_names"],
+                                                        args.fleet, args.fleet_rounds)
+        if "ws" not in skip:
+            results["ws_fanout"] = bench_ws(root, args.ws_clients, args.ws_duration)
+
+        return {
+            "suite": "backend",
+            "git": git_commit(),
+            "timestamp": time.time(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "config": {
+                "instances": args.instances,
+                "running": args.running,
+                "iterations": args.iterations,
+                "deploys": args.deploys,
+                "configures": args.configures,
+                "fleet": args.fleet,
+                "fleet_rounds": args.fleet_rounds,
+                "ws_clients": args.ws_clients,
+                "ws_duration": args.ws_duration,
+                "skip": sorted(skip),
+            },
+            "fixture_ms": fixture_ms,
+            "results": results,
+        }
+    finally:
+        logging.shutdown()
+        fixtures.cleanup(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后端性能基准测试套件")
+    parser.add_argument("--instances", type=int, default=1000, help="合成实例数量")
+    parser.add_argument("--running", type=int, default=20, help="其中标记为运行中的实例数量")
+    parser.add_argument("--iterations", type=int, default=50, help="每个接口的请求次数")
+    parser.add_argument("--deploys", type=int, default=2, help="部署的实例数量（每个实例部署两次，第二次为更新）")
+    parser.add_argument("--configures", type=int, default=10, help="重复配置的次数")
+    parser.add_argument("--fleet", type=int, default=100, help="批量配置的实例数量")
+    parser.add_argument("--fleet-rounds", type=int, default=3, help="批量配置的轮数")
+    parser.add_argument("--ws-clients", type=int, default=50, help="WebSocket广播测试的客户端数量")
+    parser.add_argument("--ws-duration", type=float, default=3, help="WebSocket广播测试的发送秒数")
+    parser.add_argument("--skip", help=f"跳过的测试项，逗号分隔: {', '.join(SECTIONS)}")
+    parser.add_argument("--baseline", help="之前的结果JSON，输出各项p50的变化")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    result = run_suite(args)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        result["comparison"] = {"baseline_commit": baseline.get("git", {}).get("commit"),
+                                "rows": compare(baseline, result)}
+
+    print("\nJSON结果:")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n结果已保存至: {args.output}")
+    if result.get("comparison"):
+        print(f"\n与基线 {result['comparison']['baseline_commit']} 比较（p50）:")
+        for row in result["comparison"]["rows"]:
+            change = f"{row['change'] * 100:+.1f}%" if row["change"] is not None else "-"
+            print(f"  {row['metric']:<48} {row['baseline_p50_ms']:>10.3f} -> {row['p50_ms']:>10.3f} ms  {change}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+WebSocket日志广播压测工具
+
+在本进程中以uvicorn启动后端（监听localhost），由若干客户端子进程建立大量
+/api/logs/ws连接（其中一部分故意慢速读取），按固定速率通过broadcast_log
+发送日志，统计投递延迟分位数、吞吐量、内存增长和丢弃数量。
+
+用法:
+    python benchmarks/ws_fanout.py --clients 500 --slow 50 --rate 2000 --duration 10
+    python benchmarks/ws_fanout.py --framing batch --encoding msgpack --output result.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import multiprocessing
+from typing import Dict, Any, List
+
+# 确保可以导入后端模块（与main.py相同的导入方式）
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 每个客户端子进程最多保留的延迟样本数
+MAX_SAMPLES_PER_WORKER = 200000
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算分位数（values需已排序）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """延迟统计（毫秒）"""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "p999_ms": round(percentile(values, 99.9) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def _decode(frame) -> List[Dict[str, Any]]:
+    """解码一帧为消息列表"""
+    if isinstance(frame, bytes):
+        import msgpack
+        data = msgpack.unpackb(frame)
+    else:
+        data = json.loads(frame)
+    if isinstance(data, dict) and data.get("type") == "batch":
+        return data.get("messages", [])
+    return [data]
+
+
+async def _run_client(url: str, slow_delay: float, samples: List[float], counters: Dict[str, int],
+                      deadline: float, compression) -> None:
+    import websockets
+
+    rng = random.Random(len(samples))
+    try:
+        async with websockets.connect(url, max_size=None, compression=compression, open_timeout=30) as ws:
+            counters["connected"] += 1
+            while time.time() < deadline:
+                try:
+                    frame = await asyncio.wait_for(ws.recv(), timeout=max(0.1, deadline - time.time()))
+                except asyncio.TimeoutError:
+                    break
+                now = time.time()
+                for message in _decode(frame):
+                    sent_at = message.get("bench_ts")
+                    if sent_at is None:
+                        continue
+                    if message.get("bench_end"):
+                        return
+                    counters["received"] += 1
+                    if len(samples) < MAX_SAMPLES_PER_WORKER:
+                        samples.append(now - sent_at)
+                    elif rng.random() < 0.01:
+                        samples[rng.randrange(len(samples))] = now - sent_at
+                if slow_delay:
+                    await asyncio.sleep(slow_delay)
+    except Exception:
+        counters["errors"] += 1
+
+
+def _client_worker(url: str, fast: int, slow: int, slow_delay: float, timeout: float,
+                   compression, ready, result_queue) -> None:
+    """客户端子进程：建立连接并收集延迟样本"""
+
+    async def main():
+        fast_samples: List[float] = []
+        slow_samples: List[float] = []
+        counters = {"connected": 0, "received": 0, "errors": 0}
+        deadline = time.time() + timeout
+        tasks = [asyncio.create_task(_run_client(url, 0, fast_samples, counters, deadline, compression))
+                 for _ in range(fast)]
+        tasks += [asyncio.create_task(_run_client(url, slow_delay, slow_samples, counters, deadline, compression))
+                  for _ in range(slow)]
+
+        # 等待所有连接建立后通知主进程
+        while counters["connected"] + counters["errors"] < fast + slow and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        ready.set()
+        await asyncio.gather(*tasks)
+        result_queue.put({"fast": fast_samples, "slow": slow_samples, "counters": counters})
+
+    asyncio.run(main())
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss() -> int:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    import uvicorn
+
+    logging.getLogger().setLevel(logging.WARNING)
+    import main as backend_main
+    from routes import websocket as ws_routes
+
+    port = _free_port()
+    config = uvicorn.Config(backend_main.app, host="127.0.0.1", port=port, log_level="warning",
+                            ws_per_message_deflate=args.deflate, ws_max_queue=args.ws_max_queue)
+    server = uvicorn.Server(config)
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    query = [f"framing={args.framing}", f"encoding={args.encoding}"]
+    url = f"ws://127.0.0.1:{port}/api/logs/ws?" + "&".join(query)
+
+    # 均匀分配快/慢客户端到各个子进程
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    workers = []
+    procs = max(1, min(args.procs, args.clients))
+    timeout = args.duration + args.drain + args.connect_timeout
+    for i in range(procs):
+        fast = (args.clients - args.slow) // procs + (1 if i < (args.clients - args.slow) % procs else 0)
+        slow = args.slow // procs + (1 if i < args.slow % procs else 0)
+        ready = ctx.Event()
+        proc = ctx.Process(target=_client_worker, daemon=True,
+                           args=(url, fast, slow, args.slow_delay, timeout,
+                                 "deflate" if args.deflate else None, ready, result_queue))
+        proc.start()
+        workers.append((proc, ready))
+
+    loop = asyncio.get_running_loop()
+    for proc, ready in workers:
+        await loop.run_in_executor(None, ready.wait, args.connect_timeout)
+
+    connected = len(ws_routes.active_connections)
+    rss_before = _rss()
+
+    # 按固定速率发送日志，每个tick发送一批
+    tick = 0.01
+    per_tick = args.rate * tick
+    sent = 0
+    started = time.perf_counter()
+    carry = 0.0
+    payload = "x" * args.message_size
+    while time.perf_counter() - started < args.duration:
+        carry += per_tick
+        count = int(carry)
+        carry -= count
+        now = time.time()
+        for _ in range(count):
+            await ws_routes.broadcast_log({
+                "time": "bench",
+                "level": "INFO",
+                "message": payload,
+                "source": "bench",
+                "bench_ts": now,
+            })
+            sent += 1
+        next_tick = started + (sent / args.rate if args.rate else tick)
+        await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+    publish_elapsed = time.perf_counter() - started
+
+    await ws_routes.broadcast_log({"time": "bench", "level": "INFO", "message": "bench_end",
+                                   "source": "bench", "bench_ts": time.time(), "bench_end": True})
+
+    # 等待客户端收尾并收集结果
+    results = []
+    for _ in workers:
+        results.append(await loop.run_in_executor(None, result_queue.get, timeout + 30))
+    stats = ws_routes.get_broadcast_stats()
+    rss_after = _rss()
+
+    for proc, _ in workers:
+        proc.join(timeout=5)
+    server.should_exit = True
+    await server_task
+
+    fast_samples = [v for r in results for v in r["fast"]]
+    slow_samples = [v for r in results for v in r["slow"]]
+    received = sum(r["counters"]["received"] for r in results)
+    errors = sum(r["counters"]["errors"] for r in results)
+    total_elapsed = time.perf_counter() - started
+
+    return {
+        "config": {
+            "clients": args.clients,
+            "slow_clients": args.slow,
+            "slow_delay": args.slow_delay,
+            "rate": args.rate,
+            "duration": args.duration,
+            "message_size": args.message_size,
+            "framing": args.framing,
+            "encoding": args.encoding,
+            "deflate": args.deflate,
+            "procs": procs,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "connected": connected,
+        "client_errors": errors,
+        "messages_sent": sent,
+        "publish_rate": round(sent / publish_elapsed, 1) if publish_elapsed else 0,
+        "deliveries_expected": sent * connected,
+        "deliveries_received": received,
+        "delivery_throughput": round(received / total_elapsed, 1) if total_elapsed else 0,
+        "latency_fast": summarize(fast_samples),
+        "latency_slow": summarize(slow_samples),
+        "server_dropped": stats.get("dropped_total", 0),
+        "memory": {
+            "rss_before": rss_before,
+            "rss_after": rss_after,
+            "rss_growth": rss_after - rss_before,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket日志广播压测工具")
+    parser.add_argument("--clients", type=int, default=200, help="客户端连接总数")
+    parser.add_argument("--slow", type=int, default=20, help="其中慢速客户端数量")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="慢速客户端每帧读取后的等待秒数")
+    parser.add_argument("--rate", type=int, default=1000, help="每秒发送的日志条数")
+    parser.add_argument("--duration", type=float, default=10, help="发送持续秒数")
+    parser.add_argument("--drain", type=float, default=10, help="发送结束后等待客户端接收的秒数")
+    parser.add_argument("--message-size", type=int, default=120, help="日志消息正文长度")
+    parser.add_argument("--framing", choices=["single", "batch"], default="single", help="帧模式")
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json", help="帧编码")
+    parser.add_argument("--deflate", action="store_true", help="启用permessage-deflate")
+    parser.add_argument("--ws-max-queue", type=int, default=32, help="uvicorn WebSocket接收队列长度")
+    parser.add_argument("--procs", type=int, default=max(1, (os.cpu_count() or 2) - 1), help="客户端子进程数")
+    parser.add_argument("--connect-timeout", type=float, default=60, help="等待所有客户端连接的秒数")
+    parser.add_argument("--output", help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    if args.slow > args.clients:
+        parser.error("--slow 不能大于 --clients")
+
+    result = asyncio.run(run_benchmark(args))
+
+    print("\nJSON结果:")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n结果已保存至: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
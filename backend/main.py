@@ -4,15 +4,15 @@ X2 Launcher 后端主应用
 """
 import os
 import sys
+import asyncio
 import logging
 import importlib
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 
-from fastapi import FastAPI, APIRouter, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+# 启动耗时分析需要先于其他模块导入（X2_STARTUP_PROFILE=1 时记录各模块导入耗时）
+from utils.startup_profiler import startup_profiler
 
 # 配置日志
 logging.basicConfig(
@@ -22,6 +22,83 @@ logging.basicConfig(
 )
 
 logger = logging.getLogger("x2-launcher")
+
+
+def reload_enabled() -> bool:
+    return os.environ.get("X2_RELOAD", "true").lower() == "true"
+
+
+def worker_count() -> int:
+    """工作进程数，环境变量 X2_WORKERS 优先于 settings.json 的 server.workers"""
+    from utils.settings import get_section
+    value = os.environ.get("X2_WORKERS") or get_section("server").get("workers", 1)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+
+def run_server(target) -> None:
+    """以脚本方式运行时启动uvicorn"""
+    import uvicorn
+    from utils.settings import get_section
+
+    # 可以通过环境变量覆盖端口和主机
+    port = int(os.environ.get("X2_PORT", 5000))
+    host = os.environ.get("X2_HOST", "127.0.0.1")
+    workers = worker_count()
+    reload = reload_enabled()
+    if workers > 1 and reload:
+        logger.warning(f"多进程模式（{workers} 个工作进程）不支持自动重载，已关闭自动重载")
+        reload = False
+    logger.info(f"启动服务器，监听地址: {host}:{port}")
+
+    # 多进程模式: 主进程运行状态中心，持有实例管理器、告警和日志文件，工作进程通过本地连接共享
+    hub = None
+    if workers > 1:
+        from services.hub import StateHub
+        hub = StateHub()
+        hub.run_in_thread()
+        os.environ.update(hub.environ())
+
+    # WebSocket帧压缩 (permessage-deflate)，浏览器会自动协商
+    per_message_deflate = get_section("websocket").get("per_message_deflate", True)
+    try:
+        uvicorn.run(target, host=host, port=port, reload=reload, workers=workers,
+                    ws_per_message_deflate=per_message_deflate)
+    finally:
+        if hub is not None:
+            hub.stop_thread()
+
+
+# 自动重载及多进程模式下，当前进程只负责监视文件变化或管理工作进程，不需要创建应用，直接启动uvicorn。
+# uvicorn以spawn方式启动工作进程，工作进程会以 __mp_main__ 的身份重新执行本脚本，
+# 并令 sys.modules["__main__"] 指向它；"__main__:app" 直接复用这次执行创建的应用，
+# 避免再以 main 模块名完整导入一遍。
+if __name__ == "__main__" and (reload_enabled() or worker_count() > 1):
+    run_server("__main__:app")
+    sys.exit(0)
+
+with startup_profiler.phase("导入FastAPI"):
+    from fastapi import FastAPI, APIRouter, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from pydantic import BaseModel
+
+# 持久化系统日志（settings.json 的 logging 分区）
+log_store = None
+try:
+    with startup_profiler.phase("初始化日志文件"):
+        from utils.settings import get_section
+        from services.hub import is_worker
+        from services.log_store import setup_file_logging, open_log_store
+        # 多进程模式下日志文件由状态中心写入，工作进程只读
+        if is_worker():
+            log_store = open_log_store(get_section("logging"))
+        else:
+            log_store = setup_file_logging(get_section("logging"))
+except Exception as e:
+    logger.warning(f"初始化日志文件失败: {e}")
+
 logger.info("正在启动X2 Launcher后端...")
 
 # 首先确保编码正确
@@ -31,12 +108,274 @@ try:
 except ImportError:
     print("警告: 无法导入编码修复模块，中文显示可能会有问题")
 
+from utils.fast_json import FastJSONResponse
+from utils.compression import CompressionMiddleware
+from utils.request_metrics import RequestMetricsMiddleware, request_metrics
+from utils.static_files import StaticAssets
+from services.container import ServiceContainer
+
+
+def register_services(container: ServiceContainer) -> None:
+    """登记各服务组件及预热步骤，组件按登记的逆序停止"""
+    from services.instance_manager import InstanceManager
+    from services.system_info import SystemInfoService
+    from services.hub import is_worker, RemoteInstanceManager, RemoteAlertEngine, RemoteInstanceConfigStore
+
+    # 多进程模式: 实例管理与告警由状态中心负责，本进程使用代理
+    hub = container.provide("hub", start_hub_client, stop=stop_hub_client) if is_worker() else None
+    if hub is not None:
+        instance_manager = container.provide("instance_manager", lambda: RemoteInstanceManager(hub))
+    else:
+        instance_manager = container.provide("instance_manager", InstanceManager,
+                                             stop=lambda manager: manager.shutdown())
+    system_info = container.provide("system_info", SystemInfoService)
+    container.provide("downloader", create_downloader)
+
+    # 事件循环延迟监控（settings.json 的 perf.loop 分区）
+    loop_config = get_section("perf").get("loop", {})
+    loop_monitor = None
+    if loop_config.get("enabled", True):
+        loop_monitor = container.provide("loop_monitor", lambda: start_loop_monitor(loop_config),
+                                         stop=lambda monitor: monitor.stop())
+
+    # 实例配置解析缓存，供 /api/instances/{name}/config 读取和修改；多进程模式下缓存由状态中心持有
+    instance_config = None
+    if hub is not None:
+        container.provide("instance_config", lambda: RemoteInstanceConfigStore(hub))
+    elif instance_manager is not None:
+        instance_config = container.provide("instance_config", lambda: create_instance_config(instance_manager))
+
+    # 实例配置文件监视: 配置变化后只重启受影响的组件（settings.json 的 process.config_watch 分区）；
+    # 多进程模式下由状态中心运行
+    watch_config = get_section("process").get("config_watch", {})
+    if instance_config is not None:
+        if watch_config.get("enabled", True):
+            container.provide("config_watcher",
+                              lambda: start_config_watcher(instance_manager, watch_config, instance_config),
+                              stop=lambda watcher: watcher.stop())
+        else:
+            logger.info("配置文件监视未启用，手动修改实例配置后需要自行重启实例")
+
+    # 日志桥接: 将后端日志转发到WebSocket日志流
+    container.provide("log_bridge", start_log_bridge, stop=lambda bridge: bridge.stop())
+
+    # 指标采样与告警
+    if hub is not None:
+        container.provide("alert_engine", lambda: RemoteAlertEngine(hub))
+    else:
+        alerts_config = get_section("alerts")
+        alert_engine = container.provide("alert_engine", lambda: create_alert_engine(alerts_config))
+        container.provide(
+            "metrics_sampler",
+            lambda: start_metrics_sampler(alerts_config, system_info, instance_manager, alert_engine, loop_monitor),
+            stop=lambda sampler: sampler.stop()
+        )
+
+    # 预热: 首次扫描实例目录、导入psutil并建立CPU采样基线、生成静态资源清单
+    if instance_manager is not None:
+        container.add_warmup("instances", instance_manager.get_instances)
+        container.add_warmup("instance_stats", instance_manager.get_instance_stats)
+    if instance_config is not None:
+        container.add_warmup(
+            "instance_configs",
+            lambda: asyncio.get_running_loop().run_in_executor(None, instance_config.load_all)
+        )
+    if system_info is not None:
+        container.add_warmup("system_metrics", system_info.get_system_metrics)
+        container.add_warmup("service_status", system_info.get_service_status)
+    if static_assets is not None:
+        container.add_warmup(
+            "static_manifest",
+            lambda: asyncio.get_running_loop().run_in_executor(None, static_assets.ensure_manifest)
+        )
+
+
+def register_memory_probes(app: FastAPI) -> None:
+    """登记各缓存和缓冲区的大小探针，由 /api/debug/memory 汇总"""
+    from utils.memory_diagnostics import memory_diagnostics, estimate_size
+    from utils.response_cache import response_cache
+    from utils.sampling_profiler import sampling_profiler
+    from routes import websocket as ws_routes
+
+    memory_diagnostics.configure(get_section("perf").get("memory", {}))
+    probe = memory_diagnostics.add_probe
+    state = app.state
+
+    probe("websocket", lambda: {
+        "connections": len(ws_routes.active_connections),
+        "topics": len(ws_routes.subscriptions),
+        "queued": sum(len(client.queue) for client in list(ws_routes.active_connections)),
+        "backlog": len(ws_routes.backlog),
+        "backlog_bytes": estimate_size(ws_routes.backlog),
+    })
+    probe("response_cache", response_cache.get_stats)
+    probe("request_metrics", lambda: {
+        "routes": len(request_metrics.routes),
+        "slow_requests": len(request_metrics.slow_requests),
+        "bytes": estimate_size(request_metrics.routes),
+    })
+    probe("sampling_profiler", lambda: {"stacks": len(sampling_profiler.stacks)})
+    monitor = getattr(state, "loop_monitor", None)
+    if monitor is not None:
+        probe("loop_monitor", lambda: {"stalls": len(monitor.stalls), "bytes": estimate_size(monitor.stalls)})
+    if static_assets is not None:
+        probe("static_assets", static_assets.get_stats)
+
+    bridge = getattr(state, "log_bridge", None)
+    if bridge is not None:
+        probe("log_bridge", bridge.get_stats)
+    engine = getattr(state, "alert_engine", None)
+    if engine is not None and hasattr(engine, "history"):
+        probe("alert_engine", lambda: {
+            "active": len(engine.active),
+            "history": len(engine.history),
+            "bytes": estimate_size(engine.history),
+        })
+    sampler = getattr(state, "metrics_sampler", None)
+    if sampler is not None:
+        probe("metrics_sampler", lambda: {"latest": len(sampler.latest)})
+    system_info = getattr(state, "system_info", None)
+    if system_info is not None:
+        probe("system_info", lambda: {"last_metrics_bytes": estimate_size(system_info.last_metrics)})
+    instance_manager = getattr(state, "instance_manager", None)
+    if instance_manager is not None and hasattr(instance_manager, "running_instances"):
+        probe("instance_manager", lambda: {
+            "running_instances": len(instance_manager.running_instances),
+            "bytes": estimate_size(instance_manager.running_instances),
+        })
+    instance_config = getattr(state, "instance_config", None)
+    if instance_config is not None and hasattr(instance_config, "entries"):
+        probe("instance_config", lambda: dict(instance_config.get_stats(),
+                                              bytes=estimate_size(instance_config.entries)))
+    watcher = getattr(state, "config_watcher", None)
+    if watcher is not None:
+        probe("config_watcher", lambda: {"files": len(watcher.hashes), "bytes": estimate_size(watcher.hashes)})
+    hub = getattr(state, "hub", None)
+    if hub is not None:
+        probe("hub_client", lambda: {key: value for key, value in hub.get_stats().items() if key != "state"})
+
+
+def start_hub_client():
+    """连接状态中心: 本进程的日志交由中心写入文件，WebSocket广播由中心编号后发给所有工作进程"""
+    from services.hub import HubClient
+    from routes import websocket as ws_routes
+
+    client = HubClient.from_env(on_message=ws_routes.deliver_relayed,
+                                on_connect=lambda state: ws_routes.sync_sequence(state.get("seq", 0)))
+    client.start()
+    client.attach_logging(str(get_section("logging").get("level", "INFO")).upper())
+    ws_routes.relay = client.publish
+    return client
+
+
+async def stop_hub_client(client):
+    """断开状态中心"""
+    from routes import websocket as ws_routes
+
+    ws_routes.relay = None
+    client.detach_logging()
+    await client.stop()
+
+
+def create_downloader():
+    """创建部署共用的下载器"""
+    from scripts.downloader import BotDownloader
+    return BotDownloader(str(Path(__file__).parent.parent))
+
+
+def start_log_bridge():
+    """创建并启动日志桥接器"""
+    from services.log_bridge import LogBridge
+    from routes import websocket as ws_routes
+
+    bridge = LogBridge.from_settings(ws_routes.publish_log, get_section("logging").get("bridge", {}))
+    bridge.start()
+    ws_routes.log_bridge = bridge
+    return bridge
+
+
+def create_alert_engine(alerts_config):
+    """创建告警引擎，并将告警转发到WebSocket日志通道"""
+    from services.alert_engine import AlertEngine, alert_log_message
+    from routes.websocket import publish_log
+
+    alert_engine = AlertEngine.from_settings(alerts_config)
+    alert_engine.add_listener(lambda event: publish_log(alert_log_message(event)))
+    return alert_engine
+
+
+def start_loop_monitor(loop_config):
+    """创建并启动事件循环延迟监控"""
+    from utils.loop_monitor import LoopMonitor
+
+    monitor = LoopMonitor.from_settings(loop_config)
+    monitor.start()
+    return monitor
+
+
+def create_instance_config(instance_manager):
+    """创建实例配置解析缓存"""
+    from services.instance_config import InstanceConfigStore
+    return InstanceConfigStore(instance_manager.base_dir, instance_manager)
+
+
+def start_config_watcher(instance_manager, watch_config, instance_config=None):
+    """创建并启动实例配置文件监视，配置变化时同时刷新配置缓存"""
+    from services.config_watcher import ConfigWatcher
+
+    watcher = ConfigWatcher.from_settings(instance_manager, watch_config)
+    if instance_config is not None:
+        instance_config.attach_watcher(watcher)
+    watcher.start()
+    return watcher
+
+
+def start_metrics_sampler(alerts_config, system_info, instance_manager, alert_engine, loop_monitor=None):
+    """创建指标采样器，告警启用时开始采样"""
+    from services.metrics_sampler import MetricsSampler
+
+    sampler = MetricsSampler(
+        system_info=system_info,
+        instance_manager=instance_manager,
+        alert_engine=alert_engine,
+        loop_monitor=loop_monitor,
+        interval=alerts_config.get("interval", 5)
+    )
+    if alerts_config.get("enabled", True):
+        sampler.start()
+    return sampler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期: 创建服务并在后台预热，关闭时按逆序停止"""
+    container = ServiceContainer(app, warmup_timeout=get_section("startup").get("warmup_timeout", 15))
+    app.state.services = container
+    register_services(container)
+    register_memory_probes(app)
+    await container.start()
+
+    startup_profiler.mark_ready()
+    logger.info(f"后端启动完成，耗时 {startup_profiler.ready_ms:.0f} ms")
+    try:
+        yield
+    finally:
+        await container.stop()
+        from utils.sampling_profiler import sampling_profiler
+        sampling_profiler.stop()
+
+
 # 创建FastAPI应用
 app = FastAPI(
     title="X2 Launcher API",
     description="X2 Launcher后端API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
+app.state.startup_profiler = startup_profiler
+
+app.state.log_store = log_store
 
 # 添加CORS中间件
 app.add_middleware(
@@ -47,6 +386,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（settings.json 的 http.compression 分区）
+compression_config = get_section("http").get("compression", {})
+if compression_config.get("enabled", True):
+    app.add_middleware(CompressionMiddleware, **CompressionMiddleware.settings_kwargs(compression_config))
+
+# 请求耗时统计（settings.json 的 perf 分区），最后添加使其位于最外层，统计包含压缩在内的完整耗时
+perf_config = get_section("perf")
+if perf_config.get("enabled", True):
+    request_metrics.configure(perf_config)
+    app.add_middleware(RequestMetricsMiddleware)
+
 # 设置API路由前缀
 api_router = APIRouter(prefix="/api")
 
@@ -56,34 +406,48 @@ async def health_check():
     """健康检查API"""
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
+# 就绪检查端点：服务创建并预热完成后才返回200
+@api_router.get("/ready")
+async def readiness_check(request: Request):
+    """就绪检查API"""
+    container = getattr(request.app.state, "services", None)
+    if container is None:
+        return FastJSONResponse({"ready": False, "state": "unavailable"}, status_code=503)
+    report = container.readiness()
+    return FastJSONResponse(report, status_code=200 if report["ready"] else 503)
+
 # 引入其他路由
-try:
-    # 加载其他API路由
+with startup_profiler.phase("加载路由"):
     try:
-        from api.api import router as api_routes
-        api_router.include_router(api_routes, prefix="")
-        logger.info("已加载通用API路由")
-    except ImportError as e:
-        logger.warning(f"加载通用API路由失败: {e}")
+        # 加载其他API路由
+        try:
+            from api.api import router as api_routes
+            api_router.include_router(api_routes, prefix="")
+            logger.info("已加载通用API路由")
+        except ImportError as e:
+            logger.warning(f"加载通用API路由失败: {e}")
     
-    try:
-        from routes.websocket import router as ws_router
-        api_router.include_router(ws_router, prefix="")
-        logger.info("已加载WebSocket路由")
-    except ImportError as e:
-        logger.warning(f"加载WebSocket路由失败: {e}")
+        try:
+            from routes.websocket import router as ws_router
+            api_router.include_router(ws_router, prefix="")
+            logger.info("已加载WebSocket路由")
+        except ImportError as e:
+            logger.warning(f"加载WebSocket路由失败: {e}")
         
-except ImportError as e: 
-    logger.error(f"加载路由模块时发生意外错误: {e}", exc_info=True)
+    except ImportError as e: 
+        logger.error(f"加载路由模块时发生意外错误: {e}", exc_info=True)
 
 # 包含API路由到主应用
 app.include_router(api_router)
 
 # 设置前端静态文件服务
+static_assets = None
 try:
     frontend_path = Path(__file__).parent.parent / "frontend" / "dist"
+    static_config = get_section("static")
     if frontend_path.exists():
-        app.mount("/", StaticFiles(directory=str(frontend_path), html=True), name="static")
+        static_assets = StaticAssets(str(frontend_path), compress_min_size=static_config.get("compress_min_size", 1024), defer=True)
+        app.mount("/", static_assets, name="static")
         logger.info(f"已挂载前端静态文件: {frontend_path}")
     else:
         # 尝试创建基本的前端目录结构
@@ -109,7 +473,8 @@ try:
     <p>API状态检查: <a href="/api/health">点击这里</a></p>
 </body>
 </html>""")
-        app.mount("/", StaticFiles(directory=str(frontend_path), html=True), name="static")
+        static_assets = StaticAssets(str(frontend_path), compress_min_size=static_config.get("compress_min_size", 1024), defer=True)
+        app.mount("/", static_assets, name="static")
         logger.info(f"已创建并挂载临时前端页面")
 except Exception as e:
     logger.error(f"挂载前端静态文件失败: {e}", exc_info=True)
@@ -122,34 +487,18 @@ async def not_found_exception_handler(request: Request, exc):
     
     # 如果是API请求返回JSON
     if path.startswith("/api/"):
-        return {"status": "error", "message": "API端点不存在", "path": path, "code": 404}
-    
-    # 否则返回前端应用(SPA路由)
-    if frontend_path.exists():
-        return StaticFiles(directory=str(frontend_path), html=True).get_response(
-            "index.html", 
-            scope=request.scope
+        return FastJSONResponse(
+            {"status": "error", "message": "API端点不存在", "path": path, "code": 404}, status_code=404
         )
     
+    # 否则返回前端应用(SPA路由)，带扩展名的路径视为缺失的资源文件
+    if static_assets is not None and "." not in path.rsplit("/", 1)[-1]:
+        response = static_assets.index_response(request.headers)
+        if response is not None:
+            return response
+    
     # 前端不存在时返回简单消息
-    return {"status": "error", "message": "资源不存在", "path": path}
+    return FastJSONResponse({"status": "error", "message": "资源不存在", "path": path}, status_code=404)
 
 if __name__ == "__main__":
-    import uvicorn
-    
-    # 可以通过环境变量覆盖端口和主机
-    port = int(os.environ.get("X2_PORT", 5000))
-    host = os.environ.get("X2_HOST", "127.0.0.1")
-    reload_enabled = os.environ.get("X2_RELOAD", "true").lower() == "true"
-    
-    # 检测是否在重载工作进程中
-    is_reload_worker = os.environ.get("PYTHONPATH") and reload_enabled
-    
-    if not is_reload_worker:
-        logger.info(f"启动服务器，监听地址: {host}:{port}")
-    
-    # 降低重载工作进程的日志级别，减少重复日志
-    if is_reload_worker:
-        logging.getLogger("x2-launcher").setLevel(logging.WARNING)
-    
-    uvicorn.run("main:app", host=host, port=port, reload=reload_enabled)
+    run_server(app)
@@ -5,12 +5,15 @@
 """
 import os
 import sys
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Request
 from pydantic import BaseModel
 
+from utils.single_flight import SingleFlight
+
 # 设置日志
 logger = logging.getLogger("x2-launcher.deploy")
 
@@ -33,22 +36,26 @@ except ImportError as e:
 # 创建路由
 router = APIRouter()
 
+# 版本列表查询的请求合并
+_versions_flight = SingleFlight("deploy.versions")
+
 class DeployRequest(BaseModel):
     instance_name: str
     version: Optional[str] = "latest"
     config: Optional[Dict[str, Any]] = None
 
 @router.post("")
-async def deploy_instance(request: DeployRequest = Body(...)):
+async def deploy_instance(http_request: Request, request: DeployRequest = Body(...)):
     """部署一个新的MaiBot实例"""
     logger.info(f"收到部署请求: {request.instance_name}, 版本: {request.version}")
     
     try:
-        # 初始化下载器
-        downloader = BotDownloader(project_root)
+        # 使用服务容器创建的下载器，未创建时临时初始化一个
+        downloader = getattr(http_request.app.state, "downloader", None) or BotDownloader(project_root)
         
-        # 执行下载
-        result = downloader.download(request.instance_name, request.version)
+        # 执行下载（同步下载和解压，放到线程池执行以免阻塞事件循环）
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, downloader.download, request.instance_name, request.version)
         
         if not result.get("success", False):
             logger.error(f"部署失败: {result.get('message', '未知错误')}")
@@ -66,6 +73,11 @@ async def deploy_instance(request: DeployRequest = Body(...)):
 @router.get("/versions")
 async def get_available_versions():
     """获取可用的MaiBot版本"""
+    # 并发请求共享同一次查询
+    return await _versions_flight.do("versions", _list_versions)
+
+async def _list_versions() -> Dict[str, Any]:
+    """查询版本列表"""
     # 这里可以从GitHub API获取实际版本列表
     # 简化示例实现
     return {
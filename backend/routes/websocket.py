@@ -2,49 +2,384 @@
 """
 WebSocket路由模块
 """
+import os
 import json
+import uuid
 import logging
 import asyncio
-from typing import List, Dict, Any
+from collections import deque
+from typing import Set, Dict, Any, Optional, List, Iterable
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from utils.settings import get_section
+from services.hub import HUB_EPOCH_ENV
+
 logger = logging.getLogger("x2-launcher.websocket")
 
+# msgpack为可选依赖，未安装时二进制编码请求会回退到JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 router = APIRouter(tags=["websocket"])
 
+_ws_settings = get_section("websocket")
+
+# 每个客户端发送队列的容量
+QUEUE_SIZE = int(_ws_settings.get("queue_size", 1000))
+# 队列满时的策略: drop_oldest 丢弃最旧消息; coalesce 丢弃新消息并合并为一条丢弃提示
+OVERFLOW_POLICY = _ws_settings.get("overflow_policy", "drop_oldest")
+# 批量模式: 每帧最多合并的消息数和最长等待时间（毫秒）
+MAX_BATCH = int(_ws_settings.get("max_batch", 200))
+FLUSH_INTERVAL_MS = float(_ws_settings.get("flush_interval_ms", 20))
+# 服务端保留的最近广播消息数，用于断线重连后补发
+BACKLOG_SIZE = int(_ws_settings.get("backlog_size", 5000))
+
+
+class EncodedMessage:
+    """广播消息及其各编码的缓存
+
+    同一条消息被多个客户端共享，每种编码最多只计算一次。
+    """
+
+    __slots__ = ("message", "_json", "_msgpack")
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self._json: Optional[str] = None
+        self._msgpack: Optional[bytes] = None
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = json.dumps(self.message, ensure_ascii=False, default=str)
+        return self._json
+
+    @property
+    def msgpack(self) -> bytes:
+        if self._msgpack is None:
+            self._msgpack = msgpack.packb(self.message, default=str)
+        return self._msgpack
+
+
+def _msgpack_array_header(length: int) -> bytes:
+    """msgpack数组头，用于直接拼接已编码的元素"""
+    if length < 16:
+        return bytes([0x90 | length])
+    if length < 0x10000:
+        return b"\xdc" + length.to_bytes(2, "big")
+    return b"\xdd" + length.to_bytes(4, "big")
+
+
+class ClientConnection:
+    """单个WebSocket客户端，拥有独立的有界发送队列和写任务
+
+    广播时只需把消息放入队列，慢客户端只会让自己的队列溢出，
+    不会阻塞其他客户端或日志产生方。
+
+    帧模式:
+        single: 每条消息一帧（默认，兼容旧客户端）
+        batch: 在flush_interval内最多合并max_batch条消息为一帧
+    编码:
+        json: 文本帧
+        msgpack: 二进制帧（需要安装msgpack）
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int = QUEUE_SIZE, policy: str = OVERFLOW_POLICY):
+        self.websocket = websocket
+        self.topics: Set[str] = set()
+        self.min_level = 0
+        self.policy = policy if policy in ("drop_oldest", "coalesce") else "drop_oldest"
+        self.queue_size = max(1, queue_size)
+        # drop_oldest 策略下由deque自动淘汰最旧的消息
+        self.queue: deque = deque(maxlen=self.queue_size if self.policy == "drop_oldest" else None)
+        self.framing = "single"
+        self.encoding = "json"
+        self.max_batch = MAX_BATCH
+        self.flush_interval = FLUSH_INTERVAL_MS / 1000
+        self.dropped = 0
+        self.sent = 0
+        self.frames = 0
+        self._pending_drops = 0
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def set_framing(self, framing: Optional[str] = None, encoding: Optional[str] = None,
+                    max_batch: Optional[int] = None, flush_interval_ms: Optional[float] = None) -> None:
+        """设置帧模式与编码，不支持的选项保持原值"""
+        if framing in ("single", "batch"):
+            self.framing = framing
+        if encoding == "json" or (encoding == "msgpack" and msgpack is not None):
+            self.encoding = encoding
+        elif encoding == "msgpack":
+            logger.warning("客户端请求msgpack编码，但未安装msgpack，继续使用JSON")
+        if max_batch:
+            self.max_batch = max(1, min(int(max_batch), self.queue_size))
+        if flush_interval_ms is not None:
+            self.flush_interval = max(0.0, min(float(flush_interval_ms), 1000.0)) / 1000
+
+    def wants(self, topics: List[str], level: int) -> bool:
+        """判断客户端是否订阅了消息，与SubscriptionIndex.match的规则一致"""
+        if level < self.min_level:
+            return False
+        if "*" in self.topics:
+            return True
+        for topic in topics:
+            if topic in self.topics:
+                return True
+            if ":" in topic and topic.split(":", 1)[0] + ":*" in self.topics:
+                return True
+        return False
+
+    def start(self) -> None:
+        """启动写任务"""
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, message: EncodedMessage) -> None:
+        """非阻塞地将消息放入发送队列"""
+        if self.closed:
+            return
+        if len(self.queue) >= self.queue_size:
+            self.dropped += 1
+            if self.policy == "coalesce":
+                self._pending_drops += 1
+                return
+        self.queue.append(message)
+        self._wakeup.set()
+
+    def _take(self) -> List[EncodedMessage]:
+        """从队列取出待发送的消息
+
+        有累计的丢弃时，合并后的丢弃提示放在下一帧的最前面发送，
+        持续过载、队列始终不为空时客户端也能及时知道丢失了消息。
+        """
+        messages: List[EncodedMessage] = []
+        if self._pending_drops:
+            messages.append(EncodedMessage({
+                "time": "now",
+                "level": "WARNING",
+                "message": f"发送过慢，已丢弃 {self._pending_drops} 条日志",
+                "source": "system",
+                "dropped": self._pending_drops
+            }))
+            self._pending_drops = 0
+            if self.framing == "single":
+                return messages
+        if self.framing == "single":
+            return [self.queue.popleft()]
+        count = min(len(self.queue), self.max_batch - len(messages))
+        messages.extend(self.queue.popleft() for _ in range(count))
+        return messages
+
+    async def _send(self, messages: List[EncodedMessage]) -> None:
+        if self.framing == "single":
+            if self.encoding == "msgpack":
+                await self.websocket.send_bytes(messages[0].msgpack)
+            else:
+                await self.websocket.send_text(messages[0].json)
+        elif self.encoding == "msgpack":
+            # 直接拼接每条消息已编码的字节，避免整批重新编码
+            await self.websocket.send_bytes(
+                b"\x82" + msgpack.packb("type") + msgpack.packb("batch") + msgpack.packb("messages")
+                + _msgpack_array_header(len(messages)) + b"".join(m.msgpack for m in messages)
+            )
+        else:
+            await self.websocket.send_text(
+                '{"type":"batch","messages":[' + ",".join(m.json for m in messages) + "]}"
+            )
+        self.sent += len(messages)
+        self.frames += 1
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                if not self.queue and not self._pending_drops:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                if self.framing == "batch" and len(self.queue) < self.max_batch and self.flush_interval:
+                    # 等待更多消息凑成一批
+                    await asyncio.sleep(self.flush_interval)
+
+                await self._send(self._take())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket写入失败，关闭连接: {e}")
+            self.closed = True
+            active_connections.discard(self)
+            subscriptions.remove_client(self)
+
+    async def close(self) -> None:
+        """停止写任务"""
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._writer = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "topics": sorted(self.topics),
+            "min_level": logging.getLevelName(self.min_level),
+            "framing": self.framing,
+            "encoding": self.encoding,
+            "queued": len(self.queue),
+            "sent": self.sent,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "policy": self.policy,
+        }
+
+
+def parse_level(level: Any) -> int:
+    """将日志级别名称或数字转换为数值，无法识别时返回0"""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).upper()) if level else 0
+    return value if isinstance(value, int) else 0
+
+
+def message_topics(message: Dict[str, Any]) -> List[str]:
+    """计算消息所属的主题
+
+    主题形如 system / alert / deploy:<任务> / instance:<实例名> / component:<组件名>，
+    消息可以通过topic字段直接指定，否则由source/job/instance/component字段推导。
+    """
+    topic = message.get("topic")
+    if topic:
+        return [topic] if isinstance(topic, str) else list(topic)
+
+    topics = [message.get("source") or "system"]
+    if message.get("job"):
+        topics.append(f"deploy:{message['job']}")
+    if message.get("instance"):
+        topics.append(f"instance:{message['instance']}")
+    if message.get("component"):
+        topics.append(f"component:{message['component']}")
+    return topics
+
+
+class SubscriptionIndex:
+    """主题到客户端的路由表
+
+    订阅变更时更新索引，广播时只需按消息主题查表，
+    不需要遍历所有连接逐个判断。支持 "*" 订阅全部及 "instance:*" 形式的前缀通配。
+    """
+
+    def __init__(self):
+        self._by_topic: Dict[str, Set[ClientConnection]] = {}
+
+    def subscribe(self, client: ClientConnection, topics: Iterable[str]) -> None:
+        for topic in topics:
+            topic = str(topic).strip()
+            if not topic:
+                continue
+            client.topics.add(topic)
+            self._by_topic.setdefault(topic, set()).add(client)
+
+    def unsubscribe(self, client: ClientConnection, topics: Iterable[str]) -> None:
+        for topic in topics:
+            client.topics.discard(topic)
+            clients = self._by_topic.get(topic)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self._by_topic[topic]
+
+    def remove_client(self, client: ClientConnection) -> None:
+        self.unsubscribe(client, list(client.topics))
+
+    def match(self, topics: List[str], level: int) -> Set[ClientConnection]:
+        """返回订阅了任一主题且级别满足要求的客户端"""
+        matched: Set[ClientConnection] = set()
+        by_topic = self._by_topic
+        for key in ["*"] + topics + [t.split(":", 1)[0] + ":*" for t in topics if ":" in t]:
+            clients = by_topic.get(key)
+            if clients:
+                matched.update(clients)
+        return {client for client in matched if level >= client.min_level}
+
+    def __len__(self) -> int:
+        return len(self._by_topic)
+
+
 # 存储活动的WebSocket连接
-active_connections: List[WebSocket] = []
+active_connections: Set[ClientConnection] = set()
+# 主题订阅索引
+subscriptions = SubscriptionIndex()
+# 已关闭连接累计丢弃的消息数
+_dropped_closed = 0
+
+# 广播序号与最近消息缓存；epoch在每次启动时变化，序号单调递增。
+# 多进程模式下epoch和序号由状态中心统一分配，各工作进程相同，客户端可以重连到任一工作进程继续补发
+EPOCH = os.environ.get(HUB_EPOCH_ENV) or uuid.uuid4().hex[:12]
+_last_seq = 0
+backlog: deque = deque(maxlen=BACKLOG_SIZE)
+
 
-@router.websocket("/api/logs/ws")
+@router.websocket("/logs/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket日志端点"""
+    """WebSocket日志端点
+
+    连接参数 topics（逗号分隔）和 level 可设置初始订阅，默认订阅全部主题；
+    framing（single/batch）和 encoding（json/msgpack）可设置帧模式。
+    """
+    global _dropped_closed
     await websocket.accept()
-    active_connections.append(websocket)
+    client = ClientConnection(websocket)
+    params = websocket.query_params
+    topics = params.get("topics")
+    # 未指定时订阅全部主题；指定为空（topics=）时不订阅任何主题
+    subscriptions.subscribe(client, [t for t in topics.split(",") if t] if topics is not None else ["*"])
+    client.min_level = parse_level(params.get("level"))
+    client.set_framing(params.get("framing"), params.get("encoding"))
+
+    # 发送连接成功消息
+    client.enqueue(EncodedMessage({
+        "type": "welcome",
+        "time": "now",
+        "level": "INFO",
+        "message": "WebSocket连接已建立",
+        "source": "system",
+        "framing": client.framing,
+        "encoding": client.encoding,
+        "epoch": EPOCH,
+        "seq": _last_seq
+    }))
+    # 补发断线期间的消息；在加入广播集合之前同步完成，保证与实时消息的顺序
+    if params.get("resume_from") is not None:
+        replay_backlog(client, params.get("resume_from"), params.get("epoch"))
+
+    active_connections.add(client)
+    client.start()
     logger.info(f"WebSocket连接已建立，当前连接数: {len(active_connections)}")
-    
+
     try:
-        # 发送连接成功消息
-        await websocket.send_json({
-            "time": "now",
-            "level": "INFO",
-            "message": "WebSocket连接已建立",
-            "source": "system"
-        })
-        
+
         # 等待消息
         while True:
             # 接收客户端消息
             data = await websocket.receive_text()
-            
+
             try:
                 msg = json.loads(data)
-                logger.info(f"收到WebSocket消息: {msg}")
-                # 处理消息
-                # ...
             except json.JSONDecodeError:
                 logger.warning(f"收到无效的WebSocket消息: {data}")
-    
+                continue
+
+            if isinstance(msg, dict) and msg.get("action"):
+                handle_client_action(client, msg)
+            else:
+                logger.info(f"收到WebSocket消息: {msg}")
+
     except WebSocketDisconnect:
         # 客户端断开连接
         logger.info("WebSocket连接已关闭")
@@ -53,33 +388,189 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error(f"WebSocket错误: {e}", exc_info=True)
     finally:
         # 移除连接
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        active_connections.discard(client)
+        subscriptions.remove_client(client)
+        await client.close()
+        _dropped_closed += client.dropped
         logger.info(f"WebSocket连接已关闭，剩余连接数: {len(active_connections)}")
 
+
+def replay_backlog(client: ClientConnection, resume_from: Any, epoch: Optional[str] = None) -> int:
+    """将序号大于resume_from的缓存消息放入客户端队列
+
+    缺口超出缓存范围、超出客户端队列容量或服务端已重启时，
+    发送 {"type": "gap"} 标记，客户端应改用HTTP接口重新拉取。
+
+    Returns:
+        int: 补发的消息数
+    """
+    try:
+        resume_from = int(resume_from)
+    except (TypeError, ValueError):
+        return 0
+
+    oldest = backlog[0].message["seq"] if backlog else _last_seq + 1
+    missed = _last_seq - resume_from
+    reason = None
+    if epoch and epoch != EPOCH:
+        reason = "restart"
+    elif resume_from > _last_seq or resume_from < 0:
+        reason = "invalid"
+    elif resume_from + 1 < oldest or missed > client.queue_size:
+        reason = "gap_too_large"
+
+    if reason is not None:
+        client.enqueue(EncodedMessage({
+            "type": "gap",
+            "reason": reason,
+            "resume_from": resume_from,
+            "oldest_seq": oldest,
+            "seq": _last_seq,
+            "epoch": EPOCH
+        }))
+        return 0
+
+    replayed = 0
+    # 序号连续，可以直接定位起始位置
+    for index in range(len(backlog) - missed, len(backlog)):
+        encoded = backlog[index]
+        message = encoded.message
+        level = parse_level(message.get("level")) or logging.INFO
+        if client.wants(message_topics(message), level):
+            client.enqueue(encoded)
+            replayed += 1
+    return replayed
+
+
+def handle_client_action(client: ClientConnection, msg: Dict[str, Any]) -> None:
+    """处理客户端的订阅控制消息
+
+    支持的消息:
+        {"action": "subscribe", "topics": ["instance:bot1"], "level": "WARNING"}
+        {"action": "unsubscribe", "topics": ["system"]}
+        {"action": "set_level", "level": "INFO"}
+        {"action": "set_framing", "framing": "batch", "encoding": "msgpack",
+         "max_batch": 200, "flush_interval_ms": 20}
+    """
+    action = msg.get("action")
+    topics = msg.get("topics") or []
+    if isinstance(topics, str):
+        topics = [topics]
+
+    if action == "subscribe":
+        subscriptions.subscribe(client, topics)
+    elif action == "unsubscribe":
+        subscriptions.unsubscribe(client, topics)
+    elif action == "set_framing":
+        client.set_framing(msg.get("framing"), msg.get("encoding"),
+                           msg.get("max_batch"), msg.get("flush_interval_ms"))
+        client.enqueue(EncodedMessage({
+            "type": "framing",
+            "framing": client.framing,
+            "encoding": client.encoding,
+            "max_batch": client.max_batch,
+            "flush_interval_ms": client.flush_interval * 1000
+        }))
+        return
+    elif action != "set_level":
+        logger.warning(f"未知的WebSocket操作: {action}")
+        return
+
+    if "level" in msg:
+        client.min_level = parse_level(msg.get("level"))
+
+    client.enqueue(EncodedMessage({
+        "type": "subscription",
+        "topics": sorted(client.topics),
+        "level": logging.getLevelName(client.min_level)
+    }))
+
+
+@router.get("/logs/ws/stats")
+async def websocket_stats():
+    """获取WebSocket广播统计信息"""
+    return get_broadcast_stats()
+
+
+def publish_log(message: Dict[str, Any]) -> None:
+    """向订阅了该消息主题的客户端广播日志消息（非阻塞，可在事件循环中直接调用）
+
+    每条消息会被分配单调递增的seq并保存到backlog中，供断线重连补发。
+    多进程模式下消息交给状态中心编号，中心广播给所有工作进程（包括本进程）后由deliver_relayed发送。
+    """
+    global _last_seq
+    if relay is not None:
+        relay(message)
+        return
+    _last_seq += 1
+    _deliver(dict(message, seq=_last_seq))
+
+
+def deliver_relayed(message: Dict[str, Any]) -> None:
+    """发送状态中心编号后广播的消息
+
+    与中心断开期间漏收的消息无法补发，收到的序号不连续时清空backlog，
+    之后请求补发这段消息的客户端会收到gap标记。
+    """
+    global _last_seq
+    seq = message.get("seq")
+    if not isinstance(seq, int) or seq <= _last_seq:
+        return
+    if seq != _last_seq + 1:
+        backlog.clear()
+    _last_seq = seq
+    _deliver(message)
+
+
+def sync_sequence(seq: int) -> None:
+    """连接（或重连）状态中心时同步中心当前的序号"""
+    global _last_seq
+    if seq != _last_seq:
+        backlog.clear()
+        _last_seq = seq
+
+
+def _deliver(message: Dict[str, Any]) -> None:
+    # 所有客户端共享同一个编码缓存，每种编码只序列化一次
+    encoded = EncodedMessage(message)
+    backlog.append(encoded)
+
+    if not active_connections:
+        return
+    # 无法识别的级别（例如前端使用的SUCCESS）按INFO处理
+    level = parse_level(message.get("level")) or logging.INFO
+    clients = subscriptions.match(message_topics(message), level)
+    for client in clients:
+        client.enqueue(encoded)
+
+
 # 广播消息的函数
 async def broadcast_log(message: Dict[str, Any]):
     """向所有连接的客户端广播日志消息"""
-    disconnected = []
-    for connection in active_connections:
-        try:
-            await connection.send_json(message)
-        except Exception:
-            disconnected.append(connection)
-    
-    # 移除已断开的连接
-    for conn in disconnected:
-        if conn in active_connections:
-            active_connections.remove(conn)
-
-# 模拟日志发送示例
-async def send_test_logs():
-    """定期发送测试日志"""
-    while True:
-        await broadcast_log({
-            "time": "2023-06-01 12:30:45",
-            "level": "INFO",
-            "message": "测试日志消息",
-            "source": "system"
-        })
-        await asyncio.sleep(5)  # 每5秒发送一条
+    publish_log(message)
+
+
+# 日志桥接器，由应用启动时注册
+log_bridge = None
+# 多进程模式下将广播交给状态中心编号的函数，由应用启动时注册
+relay = None
+
+
+def get_broadcast_stats() -> Dict[str, Any]:
+    """返回连接数和各客户端的队列统计"""
+    clients = [client.get_stats() for client in active_connections]
+    return {
+        "bridge": log_bridge.get_stats() if log_bridge is not None else None,
+        "relay": relay is not None,
+        "connections": len(clients),
+        "topics": len(subscriptions),
+        "queue_size": QUEUE_SIZE,
+        "overflow_policy": OVERFLOW_POLICY,
+        "msgpack_available": msgpack is not None,
+        "epoch": EPOCH,
+        "seq": _last_seq,
+        "backlog": len(backlog),
+        "backlog_size": BACKLOG_SIZE,
+        "dropped_total": _dropped_closed + sum(c["dropped"] for c in clients),
+        "clients": clients
+    }
@@ -1,30 +1,49 @@
 import os
 import sys
 import re
+import copy
 import json
-import shutil
+import time
+import hashlib
 import logging
 import random
+import uuid
+import threading
 import subprocess
 import platform  # 添加platform模块的导入
 from pathlib import Path
-from typing import Dict, List, Optional, Union
-
-# 使用 tomli/tomli_w 代替 toml
-try:
-    import tomli as toml_reader  # 用于读取TOML
-    import tomli_w as toml_writer  # 用于写入TOML
-except ImportError:
-    print("尝试安装缺少的TOML处理库...")
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# TOML读写库按需导入：只有配置适配器时才需要，避免导入本模块时的开销；
+# 缺少依赖时在使用处报错，而不是在导入时自动pip安装
+def _toml_reader():
+    try:
+        import tomllib  # Python 3.11+
+        return tomllib
+    except ImportError:
+        pass
+    try:
+        import tomli
+        return tomli
+    except ImportError:
+        raise ImportError("缺少TOML读取库，请手动安装: pip install tomli")
+
+def _toml_writer():
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "tomli", "tomli_w", "--quiet"])
-        print("安装成功，正在导入...")
-        import tomli as toml_reader
-        import tomli_w as toml_writer
-    except Exception as e:
-        print(f"错误: 无法自动安装TOML处理库: {e}")
-        print("请手动安装所需依赖: pip install tomli tomli_w")
-        sys.exit(1)
+        import tomli_w
+        return tomli_w
+    except ImportError:
+        raise ImportError("缺少TOML写入库，请手动安装: pip install tomli_w")
+
+def _toml_editor():
+    """保留注释和格式的TOML编辑库（可选），未安装时为None"""
+    try:
+        import tomlkit
+        return tomlkit
+    except ImportError:
+        return None
 
 # 配置日志
 logging.basicConfig(
@@ -36,18 +55,286 @@ logging.basicConfig(
 )
 logger = logging.getLogger("MaiBot-Configurator")
 
+# 适配器仓库地址，可通过环境变量 X2_ADAPTER_REPO 替换（例如本地镜像或 file:// 测试仓库）
+DEFAULT_ADAPTER_REPO_URL = "https://github.com/MaiM-with-u/MaiBot-NapCat-Adapter.git"
+ADAPTER_REPO_URL_ENV = "X2_ADAPTER_REPO"
+
+class TemplateCache:
+    """模板解析缓存
+
+    按路径记录文件的 (mtime, 大小, 内容哈希)，文件未修改时不重新读取；
+    解析结果按内容哈希缓存，各实例目录中内容相同的模板只解析一次。
+    """
+
+    def __init__(self):
+        # (路径, 类型) -> (mtime_ns, 大小, 内容哈希)
+        self._files: Dict[Tuple[str, str], Tuple[int, int, str]] = {}
+        # (内容哈希, 类型) -> 解析结果
+        self._parsed: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reads = 0
+        self.parses = 0
+
+    def _load(self, path: str, kind: str) -> Optional[Any]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, kind)
+        known = self._files.get(key)
+        if known is not None and known[0] == stat.st_mtime_ns and known[1] == stat.st_size:
+            parsed = self._parsed.get((known[2], kind))
+            if parsed is not None:
+                self.hits += 1
+                return parsed
+
+        with open(path, "rb") as f:
+            data = f.read()
+        self.reads += 1
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            # 在锁内解析，并发配置多个实例时同一版本的模板只解析一次
+            parsed = self._parsed.get((digest, kind))
+            if parsed is None:
+                parsed = data.decode("utf-8") if kind == "text" else _toml_reader().loads(data.decode("utf-8"))
+                self._parsed[(digest, kind)] = parsed
+                self.parses += 1
+            self._files[key] = (stat.st_mtime_ns, stat.st_size, digest)
+        return parsed
+
+    def text(self, path: str) -> Optional[str]:
+        """模板文本，文件不存在时返回None"""
+        return self._load(path, "text")
+
+    def toml(self, path: str) -> Optional[Dict[str, Any]]:
+        """解析后的TOML模板（副本，可直接修改），文件不存在时返回None"""
+        parsed = self._load(path, "toml")
+        return copy.deepcopy(parsed) if parsed is not None else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._files.clear()
+            self._parsed.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "files": len(self._files),
+            "parsed": len(self._parsed),
+            "hits": self.hits,
+            "reads": self.reads,
+            "parses": self.parses,
+        }
+
+
+# 全局模板缓存，同一进程内的所有配置器共用
+template_cache = TemplateCache()
+
+
+# 实例内的配置文件（相对实例目录），键为读取/修改配置接口中的分区名
+CONFIG_SECTIONS = {
+    "env": os.path.join("MaiBot", ".env"),
+    "bot_config": os.path.join("MaiBot", "config", "bot_config.toml"),
+    "adapter": os.path.join("MaiBot-Napcat-Adapter", "config.toml"),
+}
+
+# 各配置文件所属的组件，配置变化时只需重启对应组件
+CONFIG_COMPONENTS = {
+    CONFIG_SECTIONS["env"]: "maibot",
+    CONFIG_SECTIONS["bot_config"]: "maibot",
+    CONFIG_SECTIONS["adapter"]: "adapter",
+}
+
+
+class ConfigConflictError(Exception):
+    """配置修改与实例当前状态冲突（组件未部署、重写会丢失注释等）"""
+
+
+_ENV_LINE = re.compile(r'^\s*(?:export\s+)?([A-Za-z_][A-Za-z0-9_.]*)\s*=\s*(.*?)\s*$')
+
+
+def parse_env(content: str) -> Dict[str, str]:
+    """解析.env内容为 {变量名: 值}，忽略注释和空行，去掉值两端的引号"""
+    values = {}
+    for line in content.splitlines():
+        if line.lstrip().startswith("#"):
+            continue
+        match = _ENV_LINE.match(line)
+        if match:
+            value = match.group(2)
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            values[match.group(1)] = value
+    return values
+
+
+def parse_toml(content: str) -> Dict[str, Any]:
+    """解析TOML内容"""
+    return _toml_reader().loads(content)
+
+
+def _env_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        raise ValueError(".env的值只能是字符串、数字或布尔值")
+    text = str(value)
+    return f'"{text}"' if any(ch in text for ch in " #\t") else text
+
+
+def render_env_values(content: str, updates: Dict[str, Any]) -> str:
+    """按updates修改.env内容: 已有变量就地修改，值为None的变量删除，新变量追加到末尾；保留注释和其他行"""
+    lines = []
+    remaining = dict(updates)
+    for line in content.splitlines():
+        match = None if line.lstrip().startswith("#") else _ENV_LINE.match(line)
+        if match and match.group(1) in updates:
+            key = match.group(1)
+            value = remaining.pop(key, updates[key])
+            if value is None:
+                continue
+            line = f"{key}={_env_value(value)}"
+        lines.append(line)
+    lines.extend(f"{key}={_env_value(value)}" for key, value in remaining.items() if value is not None)
+    return "\n".join(lines) + "\n"
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """JSON Merge Patch (RFC 7386): patch中值为null的键删除，对象逐层合并，其他值直接替换"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def toml_has_comments(content: str) -> bool:
+    """TOML内容中是否有注释（粗略判断：引号外的#，多行字符串中的#也会被当作注释）"""
+    for line in content.splitlines():
+        quote = None
+        for index, ch in enumerate(line):
+            if quote is not None:
+                if ch == quote and (quote == "'" or line[index - 1] != "\\"):
+                    quote = None
+            elif ch in "\"'":
+                quote = ch
+            elif ch == "#":
+                return True
+    return False
+
+
+def _patch_toml_document(document: MutableMapping, patch: Dict[str, Any]) -> None:
+    """在tomlkit文档上就地应用JSON Merge Patch，保留未修改部分的注释和格式"""
+    for key, value in patch.items():
+        if value is None:
+            if key in document:
+                del document[key]
+        elif isinstance(value, dict) and isinstance(document.get(key), MutableMapping):
+            _patch_toml_document(document[key], value)
+        else:
+            document[key] = value
+
+
+def check_patch_components(base_install_dir: str, patch: Dict[str, Any]) -> None:
+    """确认要修改的配置分区所属的组件已部署，避免修改配置时创建出不完整的实例目录"""
+    for section in patch:
+        relative = CONFIG_SECTIONS.get(section)
+        if relative is None:
+            continue
+        component_dir = os.path.join(base_install_dir, relative.split(os.sep, 1)[0])
+        if not os.path.isdir(component_dir):
+            raise ConfigConflictError(f"组件目录不存在，实例可能尚未部署: {component_dir}")
+
+def _fsync_dir(directory: str) -> None:
+    """同步目录项，保证rename在断电后仍然有效（Windows不支持）"""
+    if platform.system() == "Windows":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_text(path: str, content: str, executable: bool = False) -> bool:
+    """写入配置或脚本文件
+
+    内容与现有文件相同时不写入；否则先写入同目录的临时文件并fsync，再用os.replace替换，
+    中途失败或断电时不会留下写了一半的配置。
+
+    Returns:
+        bool: 是否实际写入
+    """
+    if os.linesep != "\n":
+        # 与文本模式写入的换行一致
+        content = content.replace("\n", os.linesep)
+    data = content.encode("utf-8")
+    # 已有文件保留原权限；新文件与open()创建时一样由系统按umask确定权限（不调用线程不安全的os.umask）
+    mode = None
+    try:
+        stat = os.stat(path)
+        mode = stat.st_mode & 0o777
+        if stat.st_size == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    if executable and platform.system() != "Windows" and not mode & 0o100:
+                        os.chmod(path, 0o755)
+                    return False
+    except OSError:
+        pass
+
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:12]}.tmp")
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    fd = os.open(tmp_path, flags, 0o777 if executable else 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if platform.system() != "Windows":
+            if executable:
+                os.chmod(tmp_path, 0o755)
+            elif mode is not None:
+                os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+    return True
+
+
+def _fill_missing(target: Dict[str, Any], defaults: Dict[str, Any]) -> None:
+    """把defaults中target没有的键（逐层）补充到target"""
+    for key, value in defaults.items():
+        if key not in target:
+            target[key] = copy.deepcopy(value)
+        elif isinstance(target[key], dict) and isinstance(value, dict):
+            _fill_missing(target[key], value)
+
+
 class BotConfigurator:
     """MaiBot配置器，负责配置MaiBot和Adapter"""
     
-    def __init__(self, base_install_dir: str, instance_name: str = "default"):
+    def __init__(self, base_install_dir: str, instance_name: str = "default", adapter_repo_url: Optional[str] = None):
         """初始化配置器
         
         Args:
             base_install_dir: 基础安装目录 (e.g., MaiM-with-u/{instance_name})
             instance_name: 实例名称
+            adapter_repo_url: 适配器仓库地址，默认取环境变量 X2_ADAPTER_REPO，未设置时为GitHub仓库
         """
         self.base_install_dir = base_install_dir # This is MaiM-with-u/{instance_name}
         self.instance_name = instance_name
+        self.adapter_repo_url = adapter_repo_url or os.environ.get(ADAPTER_REPO_URL_ENV) or DEFAULT_ADAPTER_REPO_URL
         # MaiBot program files are inside MaiBot subdirectory
         self.maibot_program_dir = os.path.join(self.base_install_dir, "MaiBot")
         
@@ -57,6 +344,8 @@ class BotConfigurator:
         
         self.config_dir = os.path.join(self.maibot_program_dir, "config") # MaiBot's own config dir
         self.venv_path = os.path.join(self.base_install_dir, "venv") # venv is in the instance root
+        # 本次配置实际改动的文件: 路径 -> 所属组件（启动脚本等不属于组件的文件为None）
+        self.changed: Dict[str, Optional[str]] = {}
 
         # 确保MaiBot程序目录存在
         if not os.path.exists(self.maibot_program_dir):
@@ -77,7 +366,7 @@ class BotConfigurator:
         """如果适配器目录不存在，则尝试克隆。"""
         if not os.path.exists(self.adapter_full_path):
             logger.info(f"适配器目录 {self.adapter_full_path} 不存在，尝试克隆...")
-            git_url = "https://github.com/MaiM-with-u/MaiBot-NapCat-Adapter.git"
+            git_url = self.adapter_repo_url
             # Clone into self.adapter_full_path
             git_cmd = ["git", "clone", git_url, self.adapter_full_path, "--depth", "1"]
             try:
@@ -118,45 +407,31 @@ class BotConfigurator:
             env_template_path = os.path.join(self.maibot_program_dir, "template", "template.env")
             env_path = os.path.join(self.maibot_program_dir, ".env")
             
-            if os.path.exists(env_template_path):
-                logger.info(f"找到模板.env文件: {env_template_path}")
-                with open(env_template_path, "r", encoding="utf-8") as f:
-                    env_content = f.read()
-                
-                # 替换端口
-                env_content = re.sub(r'PORT=\d+', f'PORT={maibot_port}', env_content)
-                # 确保有HOST字段
-                if not re.search(r'HOST=', env_content):
-                    env_content += "\nHOST=0.0.0.0\n"
-                else:
-                    env_content = re.sub(r'HOST=.*', 'HOST=0.0.0.0', env_content)
-                
-                with open(env_path, "w", encoding="utf-8") as f:
-                    f.write(env_content)
+            # 已有.env时在其基础上修改，保留用户添加的其他变量
+            env_template = self._read_existing(env_path)
+            if env_template is None:
+                env_template = template_cache.text(env_template_path)
+            if env_template is not None:
+                self._write(env_path, self.render_env(env_template, maibot_port))
                 logger.info(f"已配置MaiBot .env文件，设置端口为 {maibot_port}")
             else:
                 logger.error(f"模板.env文件不存在: {env_template_path}")
                 # 创建一个基本的.env文件
-                basic_env = f"PORT={maibot_port}\nHOST=0.0.0.0\n"
-                with open(env_path, "w", encoding="utf-8") as f:
-                    f.write(basic_env)
+                self._write(env_path, f"PORT={maibot_port}\nHOST=0.0.0.0\n")
                 logger.info(f"没有找到模板，创建了基本的.env文件，设置端口为 {maibot_port}")
             
             # 2. 配置bot_config.toml
             config_template_path = os.path.join(self.maibot_program_dir, "template", "bot_config_template.toml")
             config_path = os.path.join(self.config_dir, "bot_config.toml")
             
-            if os.path.exists(config_template_path):
-                logger.info(f"找到模板配置文件: {config_template_path}")
-                with open(config_template_path, "r", encoding="utf-8") as f:
-                    config_content = f.read()
-                
-                # 添加模型配置
-                if model_type == "chatglm":
-                    config_content = self._add_chatglm_config(config_content)
-                
-                with open(config_path, "w", encoding="utf-8") as f:
-                    f.write(config_content)
+            # 已有bot_config.toml时在其基础上修改，不覆盖用户的配置
+            config_template = self._read_existing(config_path)
+            if config_template is None:
+                config_template = template_cache.text(config_template_path)
+            if config_template is not None:
+                # 添加或修改模型配置
+                config_content = self._set_model_type(config_template, model_type)
+                self._write(config_path, config_content)
                 logger.info("已配置MaiBot bot_config.toml文件")
             else:
                 logger.error(f"模板bot_config_template.toml文件不存在: {config_template_path}")
@@ -168,6 +443,144 @@ class BotConfigurator:
             logger.error(f"配置MaiBot时出错：{e}")
             return False
     
+    def _write(self, path: str, content: str, executable: bool = False) -> bool:
+        """写入实例内的文件并记录改动"""
+        written = write_text(path, content, executable)
+        if written:
+            relative = os.path.relpath(path, self.base_install_dir)
+            self.changed[path] = CONFIG_COMPONENTS.get(relative)
+        else:
+            logger.info(f"内容未变化，跳过写入: {path}")
+        return written
+
+    @staticmethod
+    def _read_existing(path: str) -> Optional[str]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def apply_patch(self, patch: Dict[str, Any], allow_lossy: bool = False) -> Dict[str, Any]:
+        """按JSON Merge Patch修改实例配置，只写入内容有变化的文件
+
+        安装了tomlkit时在原文档上修改，保留TOML文件的注释和格式；未安装时整个文件按解析结果重写，
+        会丢失注释，因此文件含有注释时需要 allow_lossy=True 才会重写。
+        所有分区都检查通过后才写入，不会只修改一部分文件。
+
+        Args:
+            patch: {"env": {...}, "bot_config": {...}, "adapter": {...}}，分区可省略
+            allow_lossy: 未安装tomlkit时是否允许重写含有注释的TOML文件
+
+        Returns:
+            dict: changed_files 与 changed_components
+
+        Raises:
+            ValueError: 未知的分区或无法写入的值
+            ConfigConflictError: 组件未部署，或重写会丢失注释而未允许
+        """
+        unknown = set(patch) - set(CONFIG_SECTIONS)
+        if unknown:
+            raise ValueError(f"未知的配置分区: {', '.join(sorted(unknown))}")
+        check_patch_components(self.base_install_dir, patch)
+        tomlkit = _toml_editor()
+        writes: List[Tuple[str, str]] = []
+        for section, section_patch in patch.items():
+            if not isinstance(section_patch, dict):
+                raise ValueError(f"配置分区 {section} 的修改内容必须是对象")
+            if not section_patch:
+                continue
+            path = os.path.join(self.base_install_dir, CONFIG_SECTIONS[section])
+            existing = self._read_existing(path)
+            if section == "env":
+                # .env只有一层，嵌套对象没有意义
+                writes.append((path, render_env_values(existing or "", section_patch)))
+                continue
+            if tomlkit is not None:
+                document = tomlkit.parse(existing or "")
+                try:
+                    _patch_toml_document(document, section_patch)
+                    writes.append((path, tomlkit.dumps(document)))
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"配置分区 {section} 包含无法写入TOML的值: {e}")
+                continue
+            current = parse_toml(existing) if existing is not None else {}
+            updated = merge_patch(current, section_patch)
+            if updated == current and existing is not None:
+                continue
+            if existing is not None and not allow_lossy and toml_has_comments(existing):
+                raise ConfigConflictError(
+                    f"{path} 含有注释，未安装tomlkit时修改会重写整个文件并丢失注释；"
+                    f"安装tomlkit，或确认后使用 allow_lossy 重写"
+                )
+            try:
+                writes.append((path, _toml_writer().dumps(updated)))
+            except TypeError as e:
+                raise ValueError(f"配置分区 {section} 包含无法写入TOML的值: {e}")
+
+        self.changed = {}
+        for path, content in writes:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, content)
+        logger.info(f"实例 {self.instance_name} 配置已修改，改动的文件: {sorted(self.changed) or '无'}")
+        return {"changed_files": sorted(self.changed), "changed_components": self.changed_components}
+
+    @property
+    def changed_components(self) -> List[str]:
+        """本次配置中配置文件有改动的组件"""
+        return sorted({component for component in self.changed.values() if component})
+
+    @staticmethod
+    def render_env(template: str, maibot_port: int) -> str:
+        """由.env模板生成实例的.env内容: 替换端口，HOST固定为0.0.0.0"""
+        env_content = re.sub(r'PORT=\d+', f'PORT={maibot_port}', template)
+        # 确保有HOST字段
+        if not re.search(r'HOST=', env_content):
+            env_content += "\nHOST=0.0.0.0\n"
+        else:
+            env_content = re.sub(r'HOST=.*', 'HOST=0.0.0.0', env_content)
+        return env_content
+
+    def _set_model_type(self, config_content: str, model_type: str) -> str:
+        """设置 [model] 表的 type
+
+        没有 [model] 表时添加（chatglm使用完整的默认配置）；已有时只改写该表中的 type 一行，
+        保留其他内容和注释。改写后解析校验，无法设置时抛出ValueError，不会报告成功却未生效。
+        """
+        if not re.search(r'^\s*\[model\]\s*(#.*)?$', config_content, re.MULTILINE):
+            if model_type == "chatglm":
+                content = self._add_chatglm_config(config_content)
+            else:
+                content = config_content.rstrip("\n") + f'\n\n[model]\ntype = {json.dumps(model_type, ensure_ascii=False)}\n'
+        else:
+            lines = config_content.split("\n")
+            type_line = f"type = {json.dumps(model_type, ensure_ascii=False)}"
+            in_model, header_index, replaced = False, None, False
+            for index, line in enumerate(lines):
+                stripped = line.strip()
+                if stripped.startswith("["):
+                    in_model = re.match(r'^\[model\]\s*(#.*)?$', stripped) is not None
+                    if in_model:
+                        header_index = index
+                    continue
+                match = re.match(r"""^(\s*)type\s*=\s*(?:"(?:[^"\\]|\\.)*"|'[^']*'|[^#]*?)(\s*#.*)?$""", line)
+                if in_model and match:
+                    # 保留缩进和行尾注释
+                    lines[index] = match.group(1) + type_line + (match.group(2) or "")
+                    replaced = True
+                    break
+            if not replaced:
+                lines.insert(header_index + 1, type_line)
+            content = "\n".join(lines)
+
+        try:
+            applied = parse_toml(content).get("model", {}).get("type")
+        except ValueError as e:
+            raise ValueError(f"设置模型类型后bot_config.toml无法解析: {e}")
+        if applied != model_type:
+            raise ValueError(f"无法在bot_config.toml中设置模型类型 {model_type}")
+        return content
+
     def _add_chatglm_config(self, config_content: str) -> str:
         """添加ChatGLM模型配置
         
@@ -211,28 +624,27 @@ default = "{prompt}"
             adapter_config_path = os.path.join(self.adapter_full_path, "config.toml")
             adapter_template_path = os.path.join(self.adapter_full_path, "template", "template_config.toml")
 
-            adapter_config = {}
-            if os.path.exists(adapter_template_path):
-                logger.info(f"找到适配器模板配置: {adapter_template_path}")
-                shutil.copy(adapter_template_path, adapter_config_path)
-                logger.info(f"已复制模板配置到: {adapter_config_path}")
+            # 已有config.toml时在其基础上修改（保留用户修改），模板中新增的配置项补充进来
+            existing_config = None
+            if os.path.exists(adapter_config_path):
                 try:
                     with open(adapter_config_path, "rb") as f:
-                        adapter_config = toml_reader.load(f)
+                        existing_config = _toml_reader().load(f)
+                except Exception as e:
+                    logger.error(f"读取现有适配器配置出错: {e}, 将按模板重新生成。")
+
+            template_config = {}
+            if os.path.exists(adapter_template_path):
+                try:
+                    template_config = template_cache.toml(adapter_template_path) or {}
                 except Exception as e:
                     logger.error(f"读取适配器模板配置出错: {e}, 将使用默认值创建。")
-                    adapter_config = {} # Reset if loading fails
-            elif os.path.exists(adapter_config_path): # If no template, try to load existing
-                 logger.info(f"适配器模板未找到，尝试加载现有配置: {adapter_config_path}")
-                 try:
-                    with open(adapter_config_path, "rb") as f:
-                        adapter_config = toml_reader.load(f)
-                 except Exception as e:
-                    logger.error(f"读取现有适配器配置亦出错: {e}, 将使用默认值创建。")
-                    adapter_config = {}
-            else:
+            elif existing_config is None:
                 logger.warning(f"适配器模板和现有配置均不存在，将创建全新配置: {adapter_config_path}")
 
+            adapter_config = copy.deepcopy(existing_config) if existing_config is not None else {}
+            _fill_missing(adapter_config, template_config)
+
             # Ensure sections exist
             if "Napcat_Server" not in adapter_config: adapter_config["Napcat_Server"] = {}
             if "MaiBot_Server" not in adapter_config: adapter_config["MaiBot_Server"] = {}
@@ -260,8 +672,11 @@ default = "{prompt}"
             if "NoneBot" in adapter_config and "port" in adapter_config["NoneBot"]:
                 adapter_config["NoneBot"]["port"] = adapter_listen_port
             
-            with open(adapter_config_path, "wb") as f:
-                toml_writer.dump(adapter_config, f)
+            # 按解析结果比较，配置项不变时保留原文件（包括其中的注释和格式）
+            if adapter_config == existing_config:
+                logger.info(f"适配器配置未变化，跳过写入: {adapter_config_path}")
+            else:
+                self._write(adapter_config_path, _toml_writer().dumps(adapter_config))
             
             logger.info(f"已配置Adapter config.toml: {adapter_config_path}")
             return True
@@ -292,8 +707,7 @@ default = "{prompt}"
 Shell版: https://www.napcat.wiki/guide/boot/Shell
 Framework版: https://www.napcat.wiki/guide/boot/Framework
 """
-        with open(napcat_config_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        self._write(napcat_config_path, content)
         
         logger.info(f"已创建NapCat配置指南: {napcat_config_path}")
         return content
@@ -333,8 +747,7 @@ cd "{self.maibot_program_dir}"
 echo "正在启动MaiBot主程序 (app.py)..."
 "{python_in_venv}" app.py
 """
-            with open(maibot_script_path, "w", encoding="utf-8") as f: f.write(maibot_script_content)
-            if platform.system() != "Windows": os.chmod(maibot_script_path, 0o755)
+            self._write(maibot_script_path, maibot_script_content, executable=True)
             logger.info(f"已创建MaiBot启动脚本：{maibot_script_path}")
 
             # 2. Adapter 启动脚本 (main.py in adapter dir) - if adapter is installed
@@ -361,8 +774,7 @@ cd "{self.adapter_full_path}"
 echo "正在启动MaiBot-Napcat-Adapter (main.py)..."
 "{python_in_venv}" main.py
 """
-                with open(adapter_script_path, "w", encoding="utf-8") as f: f.write(adapter_script_content)
-                if platform.system() != "Windows": os.chmod(adapter_script_path, 0o755)
+                self._write(adapter_script_path, adapter_script_content, executable=True)
                 logger.info(f"已创建Adapter启动脚本：{adapter_script_path}")
             
             # 3. 创建启动顺序指南
@@ -385,7 +797,7 @@ echo "正在启动MaiBot-Napcat-Adapter (main.py)..."
 正确的启动顺序很重要，否则各组件之间可能无法正常通信。
 确保所有相关的端口没有被占用。
 """
-            with open(startup_guide_path, "w", encoding="utf-8") as f: f.write(guide_content)
+            self._write(startup_guide_path, guide_content)
             logger.info(f"已创建启动说明：{startup_guide_path}")
             
             return True
@@ -439,6 +851,7 @@ echo "正在启动MaiBot-Napcat-Adapter (main.py)..."
             dict: 配置结果
         """
         logger.info(f"开始配置实例 {self.instance_name} 使用参数: {config_params}")
+        self.changed = {}
 
         # 验证基础目录和 MaiBot 程序目录
         if not os.path.exists(self.base_install_dir) or not os.path.exists(self.maibot_program_dir):
@@ -497,6 +910,9 @@ echo "正在启动MaiBot-Napcat-Adapter (main.py)..."
             "base_dir": self.base_install_dir,
             "maibot_dir": self.maibot_program_dir,
             "adapter_dir": self.adapter_full_path if should_install_adapter else None,
+            # 实际改动的文件及需要重启的组件，内容未变化的文件不会重写
+            "changed_files": sorted(self.changed),
+            "changed_components": self.changed_components,
             "config_summary": {
                 "qq_number": qq_number,
                 "ports": {"maibot": maibot_port, "adapter": adapter_port, "napcat": napcat_port},
@@ -505,6 +921,79 @@ echo "正在启动MaiBot-Napcat-Adapter (main.py)..."
             }
         }
 
+def _merge_params(defaults: Optional[Dict[str, Any]], row: Dict[str, Any]) -> Dict[str, Any]:
+    params = dict(defaults or {})
+    params.update(row)
+    # ports 按键合并，参数表中只需写出与默认值不同的端口
+    params["ports"] = dict((defaults or {}).get("ports", {}), **row.get("ports", {}))
+    return params
+
+
+def configure_fleet(instances_dir: str, table: List[Dict[str, Any]], defaults: Optional[Dict[str, Any]] = None,
+                    max_workers: int = 8) -> Dict[str, Any]:
+    """按参数表批量配置多个实例
+
+    Args:
+        instances_dir: 实例根目录（MaiM-with-u）
+        table: 参数表，每行为一个实例的configure参数，必须包含 instance_name，且各行不能重复
+        defaults: 各行共用的默认参数，ports 按键合并
+        max_workers: 同时配置的实例数上限
+
+    Returns:
+        dict: 汇总及按参数表顺序排列的各行配置结果（results）；
+        有缺少或重复 instance_name 的行时不配置任何实例，errors 中列出这些行
+    """
+    started = time.perf_counter()
+    rows = [_merge_params(defaults, row) for row in table]
+
+    # 同名的行会并发修改同一组文件，先校验整个参数表
+    errors, seen = [], {}
+    for index, params in enumerate(rows):
+        name = params.get("instance_name")
+        if not name:
+            errors.append({"row": index, "message": "参数表中缺少 instance_name"})
+        elif name in seen:
+            errors.append({"row": index, "instance_name": name,
+                           "message": f"instance_name 与第 {seen[name]} 行重复"})
+        else:
+            seen[name] = index
+    if errors:
+        logger.error(f"批量配置的参数表有 {len(errors)} 行无效，未配置任何实例")
+        return {"success": False, "total": len(rows), "failed": [], "errors": errors, "results": [],
+                "changed_components": {}, "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "message": "参数表中有缺少或重复的 instance_name"}
+
+    def run(params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params["instance_name"]
+        instance_dir = os.path.join(instances_dir, name)
+        if not os.path.isdir(instance_dir):
+            return {"instance_name": name, "success": False, "message": f"实例目录不存在: {instance_dir}"}
+        try:
+            return dict(BotConfigurator(instance_dir, name).configure(params), instance_name=name)
+        except Exception as e:
+            logger.error(f"配置实例 {name} 出错: {e}", exc_info=True)
+            return {"instance_name": name, "success": False, "message": str(e)}
+
+    workers = max(1, min(max_workers, len(rows)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="x2-configure") as pool:
+        results = list(pool.map(run, rows))
+
+    failed = [result["instance_name"] for result in results if not result.get("success")]
+    duration = time.perf_counter() - started
+    logger.info(f"批量配置完成: {len(results) - len(failed)}/{len(results)} 个实例成功，耗时 {duration:.2f} 秒")
+    return {
+        "success": not failed,
+        "total": len(results),
+        "failed": failed,
+        "duration_ms": round(duration * 1000, 1),
+        "template_cache": template_cache.get_stats(),
+        # 配置文件有改动的实例及其需要重启的组件
+        "changed_components": {result["instance_name"]: result["changed_components"] for result in results
+                               if result.get("changed_components")},
+        "results": results,
+    }
+
+
 if __name__ == "__main__":
     # 命令行测试用
     import argparse
@@ -516,6 +1005,8 @@ if __name__ == "__main__":
     parser.add_argument("--adapter-port", type=int, default=18002, help="适配器端口")
     parser.add_argument("--maibot-port", type=int, default=8000, help="MaiBot端口")
     parser.add_argument("--debug", action="store_true", help="启用调试模式")
+    parser.add_argument("--fleet", help="批量配置的参数表JSON: {\"defaults\": {...}, \"instances\": [{\"instance_name\": ...}, ...]}，此时--dir为实例根目录")
+    parser.add_argument("--workers", type=int, default=8, help="批量配置时同时配置的实例数")
     args = parser.parse_args()
     
     # 启用调试日志
@@ -528,6 +1019,14 @@ if __name__ == "__main__":
         logging.getLogger("MaiBot-Configurator").addHandler(file_handler)
         logger.info(f"调试日志将保存至: {log_file}")
     
+    if args.fleet:
+        with open(args.fleet, "r", encoding="utf-8") as f:
+            fleet = json.load(f)
+        result = configure_fleet(args.dir, fleet.get("instances", []), fleet.get("defaults"), args.workers)
+        print("\nJSON结果:")
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        sys.exit(0 if result["success"] else 1)
+
     configurator = BotConfigurator(args.dir, args.instance)
     
     # 模拟前端传递的参数结构
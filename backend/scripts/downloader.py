@@ -19,12 +19,22 @@ logging.basicConfig(
 
 logger = logging.getLogger("bot-downloader")
 
+# MaiBot仓库地址，可通过环境变量 X2_MAIBOT_REPO 替换（例如本地镜像或 file:// 测试仓库）
+DEFAULT_REPO_URL = "https://github.com/MaiM-with-u/MaiBot.git"
+REPO_URL_ENV = "X2_MAIBOT_REPO"
+
 class BotDownloader:
     """MaiBot 下载器类"""
     
-    def __init__(self, project_root=None):
-        """初始化下载器"""
+    def __init__(self, project_root=None, repo_url=None):
+        """初始化下载器
+
+        Args:
+            project_root: 项目根目录，实例安装在其下的 MaiM-with-u 目录
+            repo_url: MaiBot仓库地址，默认取环境变量 X2_MAIBOT_REPO，未设置时为GitHub仓库
+        """
         self.base_dir = os.path.join(os.getcwd() if project_root is None else project_root, "MaiM-with-u")
+        self.repo_url = repo_url or os.environ.get(REPO_URL_ENV) or DEFAULT_REPO_URL
         
         # 确保基础目录存在
         os.makedirs(self.base_dir, exist_ok=True)
@@ -64,7 +74,7 @@ class BotDownloader:
                 logger.info(f"开始从GitHub克隆 MaiBot {version}")
                 print(f"【下载器】开始从GitHub克隆 MaiBot {version}")
                 
-                git_url = "https://github.com/MaiM-with-u/MaiBot.git"
+                git_url = self.repo_url
                 # 克隆到 instance_path 下的 MaiBot 子目录
                 maibot_target_path = os.path.join(instance_path, "MaiBot") 
                 git_cmd = ["git", "clone", git_url, maibot_target_path, "--branch", version, "--single-branch", "--depth", "1"]
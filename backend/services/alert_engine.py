@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+告警规则引擎
+在指标采样器中增量评估阈值/变化率规则，支持持续时间、滞回、去重与冷却
+"""
+import time
+import fnmatch
+import logging
+import operator
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+logger = logging.getLogger("x2-launcher.alerts")
+
+_OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+class AlertRule:
+    """单条告警规则
+
+    规则示例（settings.json -> alerts.rules）:
+        {"name": "instance_rss_high", "metric": "instance.*.rss", "op": ">",
+         "value": 1610612736, "for": 60, "clear": 1073741824, "cooldown": 300}
+        {"name": "instance_rss_growth", "metric": "instance.*.rss", "type": "rate",
+         "op": ">", "value": 10485760, "window": 60, "for": 30}
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.name = str(spec["name"])
+        self.metric = str(spec["metric"])
+        self.type = spec.get("type", "threshold")
+        if self.type not in ("threshold", "rate"):
+            raise ValueError(f"未知的规则类型: {self.type}")
+
+        self.op_symbol = spec.get("op", ">")
+        if self.op_symbol not in _OPERATORS:
+            raise ValueError(f"未知的比较运算符: {self.op_symbol}")
+        self.op = _OPERATORS[self.op_symbol]
+
+        self.value = float(spec["value"])
+        # 滞回：触发后需越过clear阈值才恢复，默认与触发阈值相同
+        self.clear = float(spec.get("clear", self.value))
+        self.duration = float(spec.get("for", 0))
+        self.cooldown = float(spec.get("cooldown", 300))
+        # 变化率规则的平滑窗口（秒）
+        self.window = float(spec.get("window", 60))
+
+        level = str(spec.get("level", "WARNING")).upper()
+        self.level = level if level in _LEVELS else "WARNING"
+        self.message = spec.get("message")
+        self.is_pattern = any(ch in self.metric for ch in "*?[")
+
+    def matches(self, series: str) -> bool:
+        """判断规则是否作用于指定序列"""
+        if self.is_pattern:
+            return fnmatch.fnmatchcase(series, self.metric)
+        return series == self.metric
+
+    def is_breaching(self, value: float) -> bool:
+        return self.op(value, self.value)
+
+    def is_cleared(self, value: float) -> bool:
+        """检查是否已越过恢复阈值"""
+        return not self.op(value, self.clear)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "metric": self.metric,
+            "type": self.type,
+            "op": self.op_symbol,
+            "value": self.value,
+            "clear": self.clear,
+            "for": self.duration,
+            "cooldown": self.cooldown,
+            "window": self.window,
+            "level": self.level,
+        }
+
+
+class _SeriesState:
+    """(规则, 序列) 的增量评估状态"""
+
+    __slots__ = ("breach_since", "active", "last_fired", "last_value", "last_ts", "rate")
+
+    def __init__(self):
+        self.breach_since: Optional[float] = None
+        self.active = False
+        self.last_fired = 0.0
+        self.last_value: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.rate: Optional[float] = None
+
+
+class AlertEngine:
+    """告警引擎
+
+    每个采样周期调用 evaluate()，只处理本周期出现的序列；
+    序列到规则的匹配结果会被缓存，新序列只在第一次出现时匹配一次。
+    """
+
+    def __init__(self, rules: Optional[List[AlertRule]] = None, history_size: int = 200):
+        self.rules: List[AlertRule] = list(rules or [])
+        self._route_cache: Dict[str, List[AlertRule]] = {}
+        self._states: Dict[Tuple[str, str], _SeriesState] = {}
+        self.active: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.history: deque = deque(maxlen=history_size)
+        self._listeners: List[Callable[[Dict[str, Any]], Any]] = []
+
+    @classmethod
+    def from_settings(cls, config: Dict[str, Any]) -> "AlertEngine":
+        """从settings.json的alerts分区创建引擎，忽略无效规则"""
+        rules = []
+        for spec in config.get("rules", []):
+            try:
+                rules.append(AlertRule(spec))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"忽略无效的告警规则 {spec}: {e}")
+        logger.info(f"已加载 {len(rules)} 条告警规则")
+        return cls(rules, history_size=int(config.get("history_size", 200)))
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], Any]) -> None:
+        """注册告警回调，回调接收告警事件字典"""
+        self._listeners.append(callback)
+
+    def _rules_for(self, series: str) -> List[AlertRule]:
+        rules = self._route_cache.get(series)
+        if rules is None:
+            rules = [rule for rule in self.rules if rule.matches(series)]
+            self._route_cache[series] = rules
+        return rules
+
+    def evaluate(self, samples: Dict[str, float], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """评估一批样本，返回本次产生的告警事件（触发或恢复）"""
+        now = time.time() if now is None else now
+        events = []
+
+        for series, value in samples.items():
+            if value is None:
+                continue
+            for rule in self._rules_for(series):
+                key = (rule.name, series)
+                state = self._states.get(key)
+                if state is None:
+                    state = self._states[key] = _SeriesState()
+
+                observed = self._observe(rule, state, float(value), now)
+                if observed is None:
+                    continue
+
+                event = self._step(rule, state, series, observed, now)
+                if event is not None:
+                    events.append(event)
+
+        for event in events:
+            self._emit(event)
+        return events
+
+    def _observe(self, rule: AlertRule, state: _SeriesState, value: float, now: float) -> Optional[float]:
+        """返回规则要比较的观测值；变化率规则返回平滑后的每秒变化量"""
+        if rule.type == "threshold":
+            return value
+
+        last_value, last_ts = state.last_value, state.last_ts
+        state.last_value, state.last_ts = value, now
+        if last_ts is None or now <= last_ts:
+            return None
+
+        dt = now - last_ts
+        instant = (value - last_value) / dt
+        # 指数滑动平均，窗口越长越平滑
+        alpha = min(1.0, dt / rule.window) if rule.window > 0 else 1.0
+        state.rate = instant if state.rate is None else state.rate + alpha * (instant - state.rate)
+        return state.rate
+
+    def _step(self, rule: AlertRule, state: _SeriesState, series: str, value: float, now: float) -> Optional[Dict[str, Any]]:
+        key = (rule.name, series)
+
+        if state.active:
+            if rule.is_cleared(value):
+                state.active = False
+                state.breach_since = None
+                self.active.pop(key, None)
+                return self._make_event(rule, series, value, now, "resolved")
+            # 去重：已触发的告警不重复发送
+            self.active[key]["value"] = value
+            return None
+
+        if not rule.is_breaching(value):
+            state.breach_since = None
+            return None
+
+        if state.breach_since is None:
+            state.breach_since = now
+        if now - state.breach_since < rule.duration:
+            return None
+        if state.last_fired and now - state.last_fired < rule.cooldown:
+            return None
+
+        state.active = True
+        state.last_fired = now
+        event = self._make_event(rule, series, value, now, "firing")
+        self.active[key] = event
+        return event
+
+    def _make_event(self, rule: AlertRule, series: str, value: float, now: float, state: str) -> Dict[str, Any]:
+        subject = "变化率" if rule.type == "rate" else "值"
+        if state == "firing":
+            message = rule.message or f"告警 {rule.name}: {series} {subject} {value:.2f} {rule.op_symbol} {rule.value:g}"
+        else:
+            message = f"告警恢复 {rule.name}: {series} {subject} {value:.2f}"
+        return {
+            "rule": rule.name,
+            "series": series,
+            "type": rule.type,
+            "state": state,
+            "level": rule.level if state == "firing" else "INFO",
+            "value": value,
+            "threshold": rule.value,
+            "since": now,
+            "message": message,
+        }
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        self.history.append(event)
+        logger.log(logging.getLevelName(event["level"]), event["message"])
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"告警回调执行失败: {e}", exc_info=True)
+
+    def forget_series(self, prefix: str, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """清理以prefix开头的序列状态（例如实例停止、序列不再产生后），其中的活跃告警记为恢复
+
+        Returns:
+            List[Dict[str, Any]]: 本次产生的恢复事件
+        """
+        now = time.time() if now is None else now
+        events = []
+        for key in [k for k in self._states if k[1].startswith(prefix)]:
+            self._states.pop(key, None)
+            alert = self.active.pop(key, None)
+            if alert is not None:
+                events.append({
+                    **alert,
+                    "state": "resolved",
+                    "level": "INFO",
+                    "since": now,
+                    "message": f"告警恢复 {alert['rule']}: {alert['series']} 已不再产生数据",
+                })
+        for series in [s for s in self._route_cache if s.startswith(prefix)]:
+            self._route_cache.pop(series, None)
+        for event in events:
+            self._emit(event)
+        return events
+
+    def get_status(self) -> Dict[str, Any]:
+        """返回规则、活跃告警和最近的告警历史"""
+        return {
+            "rules": [rule.to_dict() for rule in self.rules],
+            "active": list(self.active.values()),
+            "history": list(self.history),
+            "series_tracked": len(self._states),
+        }
+
+
+def alert_log_message(event: Dict[str, Any]) -> Dict[str, Any]:
+    """将告警事件转换为WebSocket日志通道的消息"""
+    return {
+        "time": datetime.fromtimestamp(event["since"]).strftime("%Y-%m-%d %H:%M:%S"),
+        "level": event["level"],
+        "message": event["message"],
+        "source": "alert",
+        "alert": event
+    }
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+实例配置文件监视
+监视各实例的 .env、bot_config.toml 与适配器 config.toml，手动或由其他工具修改后，
+只重启该实例中配置有变化的组件，不需要重启全部实例。
+
+安装了 watchfiles 时使用系统的文件事件（Linux为inotify），只监视配置文件所在的目录；
+未安装时退回为按间隔检查文件的修改时间。两种方式都会先等待修改停止（防抖），
+再比较文件内容的哈希，内容未变化（例如只是保存了一次）时不重启。
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional, Set, Tuple
+
+from scripts.configurator import CONFIG_COMPONENTS
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+WATCHFILES_AVAILABLE = watchfiles is not None
+
+logger = logging.getLogger("x2-launcher.config-watcher")
+
+# 保留的最近变更记录条数
+RECENT_CHANGES = 50
+
+
+def file_hash(path: str) -> Optional[str]:
+    """文件内容的哈希，文件不存在时为None"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class ConfigWatcher:
+    """配置文件监视器
+
+    Args:
+        instance_manager: 实例管理器（或状态中心），配置变化时调用其 restart_components
+        base_dir: 实例根目录，默认为实例管理器的 base_dir
+        debounce: 最后一次修改后等待的秒数，连续保存只触发一次重启
+        poll_interval: 未安装watchfiles时检查文件的间隔（秒）
+    """
+
+    def __init__(self, instance_manager, base_dir: Optional[str] = None, debounce: float = 1.0,
+                 poll_interval: float = 2.0):
+        self.instance_manager = instance_manager
+        self.base_dir = os.path.abspath(base_dir or instance_manager.base_dir)
+        self.debounce = max(0.05, float(debounce))
+        self.poll_interval = max(0.2, float(poll_interval))
+        self.backend = "watchfiles" if WATCHFILES_AVAILABLE else "polling"
+        # 配置文件路径 -> 内容哈希
+        self.hashes: Dict[str, Optional[str]] = {}
+        # 配置文件路径 -> (mtime_ns, 大小)，轮询时使用
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self.events = 0
+        self.reloads = 0
+        self.recent: deque = deque(maxlen=RECENT_CHANGES)
+        self._pending: Set[str] = set()
+        # 已知的实例目录，以及新出现或已删除的实例的配置文件（只通知回调，不重启）
+        self._instances: Set[str] = set()
+        self._discovered: Set[str] = set()
+        self._listeners: List[Callable[[List[str]], Any]] = []
+        self._wakeup = asyncio.Event()
+        self._stop_event = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def from_settings(cls, instance_manager, config: Dict[str, Any], base_dir: Optional[str] = None) -> "ConfigWatcher":
+        return cls(
+            instance_manager,
+            base_dir=base_dir,
+            debounce=config.get("debounce_ms", 1000) / 1000,
+            poll_interval=config.get("poll_interval", 2),
+        )
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._tasks = [
+            asyncio.create_task(self._watch()),
+            asyncio.create_task(self._dispatch()),
+        ]
+        logger.info(f"配置文件监视已启动（{self.backend}），防抖 {self.debounce * 1000:.0f} ms")
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"配置文件监视任务异常退出: {e}", exc_info=True)
+        self._tasks = []
+
+    # 配置文件
+
+    def _instance_dirs(self) -> List[str]:
+        try:
+            return [entry.path for entry in os.scandir(self.base_dir) if entry.is_dir()]
+        except OSError:
+            return []
+
+    def _locate(self, path: str) -> Optional[Tuple[str, str]]:
+        """配置文件所属的 (实例名, 组件)，不是受监视的配置文件时为None"""
+        relative = os.path.relpath(path, self.base_dir)
+        instance_name, _, inner = relative.partition(os.sep)
+        component = CONFIG_COMPONENTS.get(inner)
+        if not instance_name or component is None:
+            return None
+        return instance_name, component
+
+    def _snapshot(self) -> Set[str]:
+        """记录新出现的配置文件的哈希和修改时间，移除已删除实例的记录（同步）
+
+        Returns:
+            新出现的配置文件，以及已删除实例的配置文件
+        """
+        instance_dirs = set(self._instance_dirs())
+        discovered = set()
+        for instance_dir in instance_dirs:
+            for relative in CONFIG_COMPONENTS:
+                path = os.path.join(instance_dir, relative)
+                if path not in self._stats:
+                    self._stats[path] = self._stat(path)
+                    self.hashes[path] = file_hash(path)
+                    discovered.add(path)
+        for instance_dir in self._instances - instance_dirs:
+            for relative in CONFIG_COMPONENTS:
+                path = os.path.join(instance_dir, relative)
+                self._stats.pop(path, None)
+                self.hashes.pop(path, None)
+                discovered.add(path)
+        self._instances = instance_dirs
+        return discovered
+
+    @staticmethod
+    def _stat(path: str) -> Tuple[int, int]:
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return 0, -1
+
+    def add_listener(self, listener: Callable[[List[str]], Any]) -> None:
+        """登记配置文件内容确有变化、或新增/删除实例时的回调，参数为文件路径列表，在线程池中调用"""
+        self._listeners.append(listener)
+
+    def acknowledge(self, path: str) -> None:
+        """记录启动器自身写入后的内容，由写入方负责重启，监视器不再重复处理"""
+        self.hashes[path] = file_hash(path)
+        self._stats[path] = self._stat(path)
+
+    def _notify(self, paths: Set[str]) -> None:
+        paths = {path for path in paths if self._locate(path) is not None}
+        if paths:
+            self.events += len(paths)
+            self._pending |= paths
+            self._wakeup.set()
+
+    def _discover(self, paths: Set[str]) -> None:
+        if paths:
+            self._discovered |= paths
+            self._wakeup.set()
+
+    def _rescan(self) -> Tuple[Set[str], Set[str]]:
+        """重新扫描实例目录（同步），返回 (修改时间变化的文件, 新出现或已删除的文件)"""
+        discovered = self._snapshot()
+        changed = set()
+        for path, known in list(self._stats.items()):
+            if path in discovered:
+                continue
+            stat = self._stat(path)
+            if stat != known:
+                self._stats[path] = stat
+                changed.add(path)
+        return changed, discovered
+
+    async def _update(self) -> None:
+        loop = asyncio.get_running_loop()
+        changed, discovered = await loop.run_in_executor(None, self._rescan)
+        self._notify(changed)
+        self._discover(discovered)
+
+    # 监视
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        # 启动时的配置由各使用方自行读取，只记录基线
+        await loop.run_in_executor(None, self._snapshot)
+        if WATCHFILES_AVAILABLE:
+            await self._watch_events()
+        else:
+            await self._watch_polling()
+
+    async def _sleep(self, seconds: float) -> None:
+        """等待指定秒数，停止时立即返回"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def _watch_dirs(self) -> List[str]:
+        """需要监视的目录: 实例根目录（发现新实例）及实例内通往各配置文件的目录，只包括已存在的目录"""
+        if not os.path.isdir(self.base_dir):
+            return []
+        dirs = {self.base_dir}
+        for instance_dir in self._instance_dirs():
+            dirs.add(instance_dir)
+            for relative in CONFIG_COMPONENTS:
+                directory = os.path.dirname(os.path.join(instance_dir, relative))
+                while directory != instance_dir and os.path.isdir(directory):
+                    dirs.add(directory)
+                    directory = os.path.dirname(directory)
+        return sorted(dirs)
+
+    async def _watch_events(self) -> None:
+        loop = asyncio.get_running_loop()
+        missing = False
+        while not self._stop_event.is_set():
+            dirs = set(await loop.run_in_executor(None, self._watch_dirs))
+            if not dirs:
+                # 实例根目录尚未创建（首次部署前），等待其出现
+                missing = True
+                await self._sleep(self.poll_interval)
+                continue
+            if missing:
+                missing = False
+                await self._update()
+            rescan = False
+            try:
+                # 非递归监视，避免为各实例的虚拟环境等目录建立大量inotify监视；防抖由_dispatch统一处理
+                async for changes in watchfiles.awatch(*dirs, recursive=False, stop_event=self._stop_event,
+                                                       debounce=100, step=50):
+                    paths = set()
+                    for _, path in changes:
+                        # 新增或删除了实例、或部署时新建了配置目录，需要重新建立监视
+                        if os.path.dirname(path) == self.base_dir or (path not in dirs and os.path.isdir(path)):
+                            rescan = True
+                        else:
+                            paths.add(path)
+                    self._notify(paths)
+                    if rescan:
+                        break
+            except (OSError, RuntimeError) as e:
+                # 监视期间目录被删除等，稍后重新建立监视
+                logger.warning(f"监视配置目录失败，{self.poll_interval:g} 秒后重试: {e}")
+                await self._sleep(self.poll_interval)
+                rescan = True
+            if rescan:
+                # 重新建立监视前的修改不会产生事件，按修改时间补上
+                await self._update()
+
+    async def _watch_polling(self) -> None:
+        while not self._stop_event.is_set():
+            await self._update()
+            await self._sleep(self.poll_interval)
+
+    # 处理变更
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stop_event.is_set():
+            await self._wakeup.wait()
+            if self._stop_event.is_set():
+                return
+            # 防抖: 直到debounce时间内没有新的修改
+            while True:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.debounce)
+                except asyncio.TimeoutError:
+                    break
+                if self._stop_event.is_set():
+                    return
+            paths, self._pending = self._pending, set()
+            discovered, self._discovered = self._discovered, set()
+            changed = await loop.run_in_executor(None, self._changed_contents, paths)
+            updated = sorted(set(changed) | discovered)
+            if not updated:
+                continue
+            for listener in self._listeners:
+                try:
+                    await loop.run_in_executor(None, listener, updated)
+                except Exception as e:
+                    logger.error(f"配置变化回调出错: {e}", exc_info=True)
+            # 新增、删除的实例未在运行，只重启内容变化的组件
+            if changed:
+                await self._reload(changed)
+
+    def _changed_contents(self, paths: Set[str]) -> List[str]:
+        """内容哈希确实变化的文件（同步）"""
+        changed = []
+        for path in sorted(paths):
+            digest = file_hash(path)
+            if digest != self.hashes.get(path):
+                self.hashes[path] = digest
+                self._stats[path] = self._stat(path)
+                changed.append(path)
+        return changed
+
+    async def _reload(self, paths: List[str]) -> None:
+        components: Dict[str, Set[str]] = {}
+        for path in paths:
+            located = self._locate(path)
+            if located is not None:
+                components.setdefault(located[0], set()).add(located[1])
+        for instance_name, names in components.items():
+            try:
+                restarted = await self.instance_manager.restart_components(instance_name, sorted(names))
+            except Exception as e:
+                logger.error(f"实例 {instance_name} 配置变化后重启失败: {e}", exc_info=True)
+                restarted = []
+            self.reloads += len(restarted)
+            self.recent.append({
+                "time": time.time(),
+                "instance": instance_name,
+                "components": sorted(names),
+                "restarted": restarted,
+            })
+            logger.info(f"实例 {instance_name} 的配置已变化: {', '.join(sorted(names))}"
+                        + (f"，已重启 {', '.join(restarted)}" if restarted else "（实例未运行）"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            # 监视与处理两个任务都在运行
+            "running": bool(self._tasks) and all(not task.done() for task in self._tasks),
+            "files": len(self.hashes),
+            "debounce_ms": round(self.debounce * 1000, 3),
+            "events": self.events,
+            "reloads": self.reloads,
+            "recent": list(reversed(self.recent)),
+        }
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+服务容器
+在应用生命周期（lifespan）内统一创建各服务实例并挂到app.state上，
+启动后台任务，预热缓存后标记就绪，关闭时按创建的逆序停止。
+"""
+import time
+import asyncio
+import inspect
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+logger = logging.getLogger("x2-launcher.container")
+
+# 状态流转: created -> starting -> warming -> ready -> stopping -> stopped
+STATE_CREATED = "created"
+STATE_STARTING = "starting"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_STOPPING = "stopping"
+STATE_STOPPED = "stopped"
+
+
+class ServiceContainer:
+    """服务容器
+
+    Args:
+        app: FastAPI应用，服务实例以组件名挂到 app.state 上
+        warmup_timeout: 单个预热步骤的最长等待秒数
+        stop_timeout: 单个组件停止的最长等待秒数
+    """
+
+    def __init__(self, app, warmup_timeout: float = 15.0, stop_timeout: float = 5.0):
+        self.app = app
+        self.warmup_timeout = warmup_timeout
+        self.stop_timeout = stop_timeout
+        self.state = STATE_CREATED
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        # (组件名, 停止函数)，按注册顺序排列，关闭时逆序调用
+        self._stoppers: List[Tuple[str, Callable[[], Any]]] = []
+        self._warmups: List[Tuple[str, Callable[[], Any]]] = []
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def provide(self, name: str, factory: Callable[[], Any],
+                stop: Optional[Callable[[Any], Any]] = None) -> Optional[Any]:
+        """创建组件并挂到 app.state.<name>
+
+        创建失败时记录错误并将 app.state.<name> 置为None，不影响其他组件。
+
+        Args:
+            name: 组件名
+            factory: 创建（并启动）组件的函数
+            stop: 停止组件的函数，参数为组件实例，可以是协程函数
+        """
+        if self.state == STATE_CREATED:
+            self.state = STATE_STARTING
+        started = time.perf_counter()
+        try:
+            instance = factory()
+        except Exception as e:
+            logger.error(f"创建组件 {name} 失败: {e}", exc_info=True)
+            setattr(self.app.state, name, None)
+            self.components[name] = {"status": "failed", "error": str(e)}
+            return None
+
+        setattr(self.app.state, name, instance)
+        self.components[name] = {
+            "status": "running",
+            "init_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+        if stop is not None:
+            self._stoppers.append((name, lambda: stop(instance)))
+        return instance
+
+    def add_warmup(self, name: str, fn: Callable[[], Any]) -> None:
+        """登记预热步骤，fn可以返回协程；所有步骤完成后容器进入就绪状态"""
+        self._warmups.append((name, fn))
+
+    async def start(self) -> None:
+        """登记的组件创建完毕后调用，在后台开始预热"""
+        self.started_at = time.time()
+        self.state = STATE_WARMING
+        self.warmup = {name: {"status": "pending"} for name, _ in self._warmups}
+        self._warmup_task = asyncio.create_task(self._run_warmups())
+
+    async def _run_warmups(self) -> None:
+        started = time.perf_counter()
+        await asyncio.gather(*[self._warm(name, fn) for name, fn in self._warmups])
+        self.state = STATE_READY
+        self.ready_at = time.time()
+        failed = [name for name, step in self.warmup.items() if step["status"] != "done"]
+        if failed:
+            logger.warning(f"预热完成，部分步骤失败: {', '.join(failed)}")
+        logger.info(f"服务已就绪，预热耗时 {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    async def _warm(self, name: str, fn: Callable[[], Any]) -> None:
+        started = time.perf_counter()
+        try:
+            result = fn()
+            if inspect.isawaitable(result):
+                await asyncio.wait_for(result, timeout=self.warmup_timeout)
+            status = {"status": "done"}
+        except asyncio.TimeoutError:
+            status = {"status": "timeout"}
+        except Exception as e:
+            logger.warning(f"预热步骤 {name} 失败: {e}")
+            status = {"status": "failed", "error": str(e)}
+        status["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.warmup[name] = status
+
+    async def stop(self) -> None:
+        """按创建的逆序停止各组件"""
+        self.state = STATE_STOPPING
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except asyncio.CancelledError:
+                pass
+
+        for name, stop in reversed(self._stoppers):
+            try:
+                result = stop()
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, timeout=self.stop_timeout)
+                self.components[name]["status"] = "stopped"
+            except Exception as e:
+                logger.error(f"停止组件 {name} 失败: {e!r}")
+                self.components[name].update(status="stop_failed", error=repr(e))
+        self._stoppers.clear()
+        for component in self.components.values():
+            if component["status"] == "running":
+                component["status"] = "stopped"
+        self.state = STATE_STOPPED
+        logger.info("所有服务已停止")
+
+    @property
+    def ready(self) -> bool:
+        return self.state == STATE_READY
+
+    def readiness(self) -> Dict[str, Any]:
+        """就绪状态报告（/api/ready）"""
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "started_at": self.started_at,
+            "ready_at": self.ready_at,
+            "components": self.components,
+            "warmup": self.warmup,
+            "timestamp": datetime.now().isoformat(),
+        }
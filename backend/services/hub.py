@@ -0,0 +1,650 @@
+# -*- coding: utf-8 -*-
+"""
+多进程模式的状态中心
+以多个工作进程运行时，由主进程中的StateHub持有实例管理器、指标采样/告警和日志文件，
+工作进程通过本地TCP连接（127.0.0.1，带令牌校验）调用实例操作、写入日志，
+并经由StateHub互相转发WebSocket广播消息，保证各进程看到同一份实例状态。
+WebSocket消息的epoch和序号由StateHub统一分配，各工作进程的序号与补发缓存一致。
+
+协议为按行分隔的JSON帧:
+    {"op": "hello", "token": ..., "pid": ...}           工作进程 -> 中心
+    {"op": "welcome", "state": {...}}                    中心 -> 工作进程，state中包含当前的消息序号
+    {"op": "call", "id": 1, "method": "instances.get_instances", "args": []}
+    {"op": "result", "id": 1, "result": ...} / {"op": "error", "id": 1, "error": "...", "kind": "ValueError"}
+    {"op": "publish", "message": {...}}                  由中心编号后广播给所有工作进程
+    {"op": "message", "message": {...}}                  中心 -> 工作进程的广播消息（带seq）
+    {"op": "log", "record": {...}}                       工作进程的日志，由中心写入日志文件
+    {"op": "state", "state": {...}}                      实例运行状态变化
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import inspect
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Set
+
+from utils.single_flight import coalesce
+from services.instance_manager import DirectorySignature
+
+logger = logging.getLogger("x2-launcher.hub")
+
+HUB_ADDRESS_ENV = "X2_HUB_ADDRESS"
+HUB_TOKEN_ENV = "X2_HUB_TOKEN"
+HUB_EPOCH_ENV = "X2_HUB_EPOCH"
+
+# 单帧最大长度（实例列表、日志消息都不会超过）
+FRAME_LIMIT = 16 * 1024 * 1024
+# 断开连接期间缓存的待发送帧数
+OUTBOX_SIZE = 10000
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 5.0
+
+# 工作进程可以调用的方法，其中会改变运行状态的方法调用后广播新状态
+ALLOWED_METHODS = {
+    "instances": {"get_instances", "get_instance_stats", "start_instance", "stop_instance",
+                  "stop_all_instances", "get_instance_logs", "restart_components"},
+    "alerts": {"get_status"},
+    "configs": {"get_config", "find", "patch", "get_stats", "get_watcher_stats"},
+}
+STATE_CHANGING = {
+    "instances": {"start_instance", "stop_instance", "stop_all_instances", "restart_components"},
+    # 修改配置后会重启受影响的组件
+    "configs": {"patch"},
+}
+# 调用出错时在工作进程中按原类型重新抛出的异常（其余为RuntimeError），接口据此返回对应的状态码
+REMOTE_ERRORS = ("ValueError", "LookupError", "ConfigConflictError")
+
+
+def encode_frame(frame: Dict[str, Any]) -> bytes:
+    return json.dumps(frame, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+
+
+def error_kind(error: BaseException) -> Optional[str]:
+    """异常在REMOTE_ERRORS中最接近的类型名"""
+    for cls in type(error).__mro__:
+        if cls.__name__ in REMOTE_ERRORS:
+            return cls.__name__
+    return None
+
+
+def remote_error(kind: Optional[str], message: str) -> Exception:
+    """按中心返回的类型名重建异常"""
+    from scripts.configurator import ConfigConflictError
+
+    types = {"ValueError": ValueError, "LookupError": LookupError, "ConfigConflictError": ConfigConflictError}
+    return types.get(kind, RuntimeError)(message)
+
+
+def is_worker() -> bool:
+    """当前进程是否为多进程模式下的工作进程"""
+    return bool(os.environ.get(HUB_ADDRESS_ENV))
+
+
+def record_to_dict(record: logging.LogRecord) -> Dict[str, Any]:
+    """日志记录转换为可序列化的字典，异常信息合并到消息中"""
+    message = record.getMessage()
+    if record.exc_info:
+        message += "\n" + logging.Formatter().formatException(record.exc_info)
+    return {
+        "name": record.name,
+        "levelno": record.levelno,
+        "levelname": record.levelname,
+        "msg": message,
+        "created": record.created,
+        "process": record.process,
+        "threadName": record.threadName,
+    }
+
+
+class _WorkerConnection:
+    """中心一侧的工作进程连接"""
+
+    def __init__(self, writer: asyncio.StreamWriter, pid: Any):
+        self.writer = writer
+        self.pid = pid
+        self.connected_at = time.time()
+        self.calls = 0
+        self.published = 0
+
+    def send(self, frame: Dict[str, Any]) -> None:
+        if not self.writer.is_closing():
+            self.writer.write(encode_frame(frame))
+
+
+class StateHub:
+    """主进程中的状态中心
+
+    在独立线程的事件循环中运行，持有唯一的InstanceManager、实例配置缓存和配置文件监视器，
+    以及指标采样器、告警引擎、日志文件和日志桥接。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, token: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.token = token or uuid.uuid4().hex
+        # WebSocket消息的epoch和序号，所有工作进程共用
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.instance_manager = None
+        self.instance_config = None
+        self.config_watcher = None
+        self.config_load: Optional[asyncio.Future] = None
+        self.alert_engine = None
+        self.metrics_sampler = None
+        self.log_bridge = None
+        self.log_store = None
+        self.workers: Set[_WorkerConnection] = set()
+        self.relayed = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def environ(self) -> Dict[str, str]:
+        """工作进程连接中心所需的环境变量"""
+        return {HUB_ADDRESS_ENV: self.address, HUB_TOKEN_ENV: self.token, HUB_EPOCH_ENV: self.epoch}
+
+    async def start(self) -> None:
+        """创建服务并开始监听"""
+        from utils.settings import get_section
+        from services.instance_manager import InstanceManager
+        from services.system_info import SystemInfoService
+        from services.alert_engine import AlertEngine, alert_log_message
+        from services.metrics_sampler import MetricsSampler
+        from services.log_store import setup_file_logging
+        from services.log_bridge import LogBridge
+        from services.instance_config import InstanceConfigStore
+        from services.config_watcher import ConfigWatcher
+
+        # 只有中心写日志文件，工作进程的日志通过连接转交
+        logging_config = get_section("logging")
+        try:
+            self.log_store = setup_file_logging(logging_config)
+        except Exception as e:
+            logger.warning(f"初始化日志文件失败: {e}")
+        self.log_bridge = LogBridge.from_settings(self.broadcast, logging_config.get("bridge", {}))
+        self.log_bridge.start()
+
+        self.instance_manager = InstanceManager()
+        self.instance_config = InstanceConfigStore(self.instance_manager.base_dir, self.instance_manager)
+        # 在后台加载全部实例的配置，不推迟开始监听；结果在完成回调中记录
+        self.config_load = asyncio.get_running_loop().run_in_executor(None, self.instance_config.load_all)
+        self.config_load.add_done_callback(self._config_loaded)
+        # 配置文件监视只在中心运行一份，重启经由中心执行，工作进程随后收到新状态
+        watch_config = get_section("process").get("config_watch", {})
+        if watch_config.get("enabled", True):
+            self.config_watcher = ConfigWatcher.from_settings(self, watch_config, base_dir=self.instance_manager.base_dir)
+            self.instance_config.attach_watcher(self.config_watcher)
+            self.config_watcher.start()
+        else:
+            logger.info("配置文件监视未启用，手动修改实例配置后需要自行重启实例")
+        alerts_config = get_section("alerts")
+        self.alert_engine = AlertEngine.from_settings(alerts_config)
+        self.alert_engine.add_listener(lambda event: self.broadcast(alert_log_message(event)))
+        self.metrics_sampler = MetricsSampler(
+            system_info=SystemInfoService(),
+            instance_manager=self.instance_manager,
+            alert_engine=self.alert_engine,
+            interval=alerts_config.get("interval", 5)
+        )
+        if alerts_config.get("enabled", True):
+            self.metrics_sampler.start()
+
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=FRAME_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"状态中心已启动，监听地址: {self.address}")
+
+    async def stop(self) -> None:
+        """关闭连接并按启动的逆序停止服务"""
+        if self._server is not None:
+            self._server.close()
+            for worker in list(self.workers):
+                worker.writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.config_watcher is not None:
+            await self.config_watcher.stop()
+        if self.metrics_sampler is not None:
+            await self.metrics_sampler.stop()
+        if self.log_bridge is not None:
+            await self.log_bridge.stop()
+        logger.info("状态中心已停止")
+
+    def run_in_thread(self, timeout: float = 10.0) -> None:
+        """在后台线程中运行中心，监听成功后返回"""
+        started = threading.Event()
+        errors: List[BaseException] = []
+
+        async def main():
+            self._stopped = asyncio.Event()
+            try:
+                await self.start()
+            except BaseException as e:
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            await self._stopped.wait()
+            await self.stop()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(main())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="x2-state-hub", daemon=True)
+        self._thread.start()
+        if not started.wait(timeout):
+            raise RuntimeError("状态中心启动超时")
+        if errors:
+            raise errors[0]
+
+    def stop_thread(self, timeout: float = 10.0) -> None:
+        """通知后台线程停止并等待其结束"""
+        if self._loop is not None and self._stopped is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._stopped.set)
+            except RuntimeError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def state(self) -> Dict[str, Any]:
+        """推送给工作进程的实例状态"""
+        return {
+            "instances_version": self.instance_manager.version if self.instance_manager else 0,
+            "base_dir": self.instance_manager.base_dir if self.instance_manager else None,
+            "epoch": self.epoch,
+            "seq": self.seq,
+        }
+
+    @staticmethod
+    def _config_loaded(future: asyncio.Future) -> None:
+        """后台加载实例配置完成"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"加载实例配置失败，配置查询将缺少未读取过的实例: {error}",
+                         exc_info=(type(error), error, error.__traceback__))
+        else:
+            logger.info(f"已加载 {future.result()} 个实例的配置")
+
+    def push_state(self) -> None:
+        """向所有工作进程推送当前的实例状态"""
+        state_frame = {"op": "state", "state": self.state()}
+        for worker in self.workers:
+            worker.send(state_frame)
+
+    async def restart_components(self, instance_name: str, components: List[str]) -> List[str]:
+        """供配置文件监视器调用: 重启组件后向工作进程推送新的运行状态"""
+        restarted = await self.instance_manager.restart_components(instance_name, components)
+        self.push_state()
+        return restarted
+
+    def broadcast(self, message: Dict[str, Any]) -> None:
+        """为WebSocket消息分配序号，广播给所有工作进程（包括发出该消息的进程）"""
+        self.seq += 1
+        frame = {"op": "message", "message": dict(message, seq=self.seq)}
+        for worker in self.workers:
+            worker.send(frame)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        worker = None
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            if hello.get("op") != "hello" or hello.get("token") != self.token:
+                logger.warning("拒绝未通过校验的状态中心连接")
+                return
+            worker = _WorkerConnection(writer, hello.get("pid"))
+            self.workers.add(worker)
+            worker.send({"op": "welcome", "state": self.state()})
+            logger.info(f"工作进程已连接: pid={worker.pid}，当前 {len(self.workers)} 个")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                op = frame.get("op")
+                if op == "call":
+                    # 调用可能较慢（例如扫描目录），不阻塞后续帧的处理
+                    worker.calls += 1
+                    asyncio.create_task(self._call(worker, frame))
+                elif op == "publish":
+                    worker.published += 1
+                    self.relayed += 1
+                    self.broadcast(frame.get("message") or {})
+                elif op == "log":
+                    self._write_log(frame.get("record") or {})
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.info(f"工作进程连接中断: {e}")
+        finally:
+            if worker is not None:
+                self.workers.discard(worker)
+                logger.info(f"工作进程已断开: pid={worker.pid}，剩余 {len(self.workers)} 个")
+            writer.close()
+
+    async def _call(self, worker: _WorkerConnection, frame: Dict[str, Any]) -> None:
+        call_id = frame.get("id")
+        try:
+            target_name, _, method_name = str(frame.get("method", "")).partition(".")
+            if method_name not in ALLOWED_METHODS.get(target_name, ()):
+                raise ValueError(f"不支持的方法: {frame.get('method')}")
+            targets = {"instances": self.instance_manager, "alerts": self.alert_engine,
+                       "configs": self.instance_config}
+            result = getattr(targets[target_name], method_name)(*(frame.get("args") or []))
+            if inspect.isawaitable(result):
+                result = await result
+            worker.send({"op": "result", "id": call_id, "result": result})
+            if method_name in STATE_CHANGING.get(target_name, ()):
+                self.push_state()
+        except Exception as e:
+            kind = error_kind(e)
+            if kind is None:
+                logger.error(f"处理工作进程调用失败: {e}")
+            worker.send({"op": "error", "id": call_id, "error": str(e), "kind": kind})
+
+    def _write_log(self, data: Dict[str, Any]) -> None:
+        """将工作进程的日志写入日志文件（不再经过日志桥接，工作进程已自行广播）"""
+        if self.log_store is None or self.log_store.handler is None:
+            return
+        record = logging.makeLogRecord(data)
+        if record.levelno >= self.log_store.handler.level:
+            self.log_store.handler.handle(record)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "address": self.address,
+            "relayed": self.relayed,
+            "workers": [
+                {"pid": w.pid, "connected_at": w.connected_at, "calls": w.calls, "published": w.published}
+                for w in self.workers
+            ],
+        }
+
+
+class HubClient:
+    """工作进程一侧的连接
+
+    断开后自动重连；连接建立前发送的帧（日志、广播）暂存在有界队列中。
+    """
+
+    def __init__(self, address: str, token: str, on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_connect: Optional[Callable[[Dict[str, Any]], None]] = None):
+        host, _, port = address.rpartition(":")
+        self.host = host
+        self.port = int(port)
+        self.token = token
+        self.on_message = on_message
+        # 每次（重新）连接成功后以中心推送的状态调用
+        self.on_connect = on_connect
+        self.state: Dict[str, Any] = {}
+        self.connected = False
+        self.reconnects = 0
+        self._outbox: deque = deque(maxlen=OUTBOX_SIZE)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.log_handler: Optional[logging.Handler] = None
+
+    @classmethod
+    def from_env(cls, on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_connect: Optional[Callable[[Dict[str, Any]], None]] = None) -> "HubClient":
+        return cls(os.environ[HUB_ADDRESS_ENV], os.environ.get(HUB_TOKEN_ENV, ""), on_message, on_connect)
+
+    def start(self) -> "HubClient":
+        """在当前事件循环中启动连接任务"""
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._fail_pending(ConnectionError("状态中心连接已关闭"))
+
+    async def _run(self) -> None:
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port, limit=FRAME_LIMIT)
+                writer.write(encode_frame({"op": "hello", "token": self.token, "pid": os.getpid()}))
+                welcome = json.loads(await reader.readline() or b"{}")
+                if welcome.get("op") != "welcome":
+                    raise ConnectionError("状态中心拒绝连接")
+                self.state = welcome.get("state") or {}
+                if self.on_connect is not None:
+                    self.on_connect(self.state)
+                self._writer = writer
+                self.connected = True
+                self._ready.set()
+                delay = RECONNECT_DELAY
+                logger.info(f"已连接状态中心: {self.host}:{self.port}")
+
+                flusher = asyncio.create_task(self._flush_loop(writer))
+                try:
+                    await self._read_loop(reader)
+                finally:
+                    flusher.cancel()
+            except asyncio.CancelledError:
+                if self._writer is not None:
+                    self._writer.close()
+                raise
+            except (OSError, ValueError) as e:
+                logger.warning(f"状态中心连接失败: {e}")
+
+            if self.connected:
+                self.reconnects += 1
+            self.connected = False
+            self._writer = None
+            self._ready.clear()
+            self._fail_pending(ConnectionError("状态中心连接已断开"))
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            frame = json.loads(line)
+            op = frame.get("op")
+            if op in ("result", "error"):
+                future = self._pending.pop(frame.get("id"), None)
+                if future is not None and not future.done():
+                    if op == "result":
+                        future.set_result(frame.get("result"))
+                    else:
+                        future.set_exception(remote_error(frame.get("kind"), frame.get("error")))
+            elif op == "message":
+                if self.on_message is not None:
+                    try:
+                        self.on_message(frame.get("message") or {})
+                    except Exception as e:
+                        logger.error(f"处理转发消息失败: {e}")
+            elif op == "state":
+                self.state = frame.get("state") or {}
+
+    async def _flush_loop(self, writer: asyncio.StreamWriter) -> None:
+        while True:
+            if not self._outbox:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            while self._outbox:
+                writer.write(self._outbox.popleft())
+            await writer.drain()
+
+    def _fail_pending(self, error: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    def send(self, frame: Dict[str, Any]) -> None:
+        """非阻塞地发送一帧，可在任意线程调用"""
+        self._outbox.append(encode_frame(frame))
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass
+
+    def attach_logging(self, level: Any = logging.NOTSET, target: Optional[logging.Logger] = None) -> None:
+        """将本进程的日志交由中心写入日志文件"""
+        self.log_handler = HubLogHandler(self, level)
+        (target or logging.getLogger()).addHandler(self.log_handler)
+
+    def detach_logging(self, target: Optional[logging.Logger] = None) -> None:
+        if self.log_handler is not None:
+            (target or logging.getLogger()).removeHandler(self.log_handler)
+            self.log_handler = None
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        """将本进程的WebSocket广播交给中心编号，中心再广播给所有工作进程"""
+        self.send({"op": "publish", "message": message})
+
+    async def call(self, method: str, *args, timeout: float = 30.0) -> Any:
+        """调用中心的方法并等待结果"""
+        await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        self._next_id += 1
+        call_id = self._next_id
+        future = self._loop.create_future()
+        self._pending[call_id] = future
+        self.send({"op": "call", "id": call_id, "method": method, "args": list(args)})
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(call_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "address": f"{self.host}:{self.port}",
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "pending_calls": len(self._pending),
+            "outbox": len(self._outbox),
+            "state": self.state,
+        }
+
+
+class HubLogHandler(logging.Handler):
+    """将工作进程的日志记录转交中心写入日志文件"""
+
+    def __init__(self, client: HubClient, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.client = client
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.client.send({"op": "log", "record": record_to_dict(record)})
+        except Exception:
+            self.handleError(record)
+
+
+class RemoteInstanceManager:
+    """工作进程中的实例管理器代理，接口与InstanceManager一致，操作在中心执行"""
+
+    def __init__(self, client: HubClient):
+        self.client = client
+        self.dir_signature = DirectorySignature("remote_instance_manager.dir_signature")
+
+    @property
+    def base_dir(self) -> str:
+        return self.client.state.get("base_dir") or os.path.join(os.path.expanduser("~"), "MaiM-with-u")
+
+    async def state_version(self) -> tuple:
+        """运行状态版本号由中心推送，目录修改时间在本进程读取（各进程共享文件系统）"""
+        return (self.client.state.get("instances_version", 0),) + await self.dir_signature.get(self.base_dir)
+
+    @coalesce("remote_instance_manager.get_instances")
+    async def get_instances(self) -> List[Dict[str, Any]]:
+        return await self.client.call("instances.get_instances")
+
+    @coalesce("remote_instance_manager.get_instance_stats")
+    async def get_instance_stats(self) -> Dict[str, Any]:
+        return await self.client.call("instances.get_instance_stats")
+
+    async def start_instance(self, instance_name: str) -> bool:
+        return await self.client.call("instances.start_instance", instance_name)
+
+    async def stop_instance(self, instance_name: str) -> bool:
+        return await self.client.call("instances.stop_instance", instance_name)
+
+    async def stop_all_instances(self) -> bool:
+        return await self.client.call("instances.stop_all_instances")
+
+    async def get_instance_logs(self, instance_name: str) -> List[Dict[str, Any]]:
+        return await self.client.call("instances.get_instance_logs", instance_name)
+
+    async def restart_components(self, instance_name: str, components: List[str]) -> List[str]:
+        return await self.client.call("instances.restart_components", instance_name, components)
+
+
+class RemoteAlertEngine:
+    """工作进程中的告警引擎代理，告警在中心统一评估"""
+
+    def __init__(self, client: HubClient):
+        self.client = client
+
+    async def get_status(self) -> Dict[str, Any]:
+        return await self.client.call("alerts.get_status")
+
+
+class RemoteInstanceConfigStore:
+    """工作进程中的实例配置缓存代理，缓存只保存在中心，修改配置后各进程读到同一份结果"""
+
+    def __init__(self, client: HubClient):
+        self.client = client
+
+    @property
+    def base_dir(self) -> str:
+        return self.client.state.get("base_dir") or os.path.join(os.path.expanduser("~"), "MaiM-with-u")
+
+    async def get_config(self, instance_name: str) -> Dict[str, Any]:
+        return await self.client.call("configs.get_config", instance_name)
+
+    async def find(self, port: Optional[int] = None, qq_number: Optional[str] = None,
+                   model: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.client.call("configs.find", port, qq_number, model)
+
+    async def patch(self, instance_name: str, patch: Dict[str, Any], allow_lossy: bool = False) -> Dict[str, Any]:
+        return await self.client.call("configs.patch", instance_name, patch, allow_lossy)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return await self.client.call("configs.get_stats")
+
+    async def get_watcher_stats(self) -> Optional[Dict[str, Any]]:
+        return await self.client.call("configs.get_watcher_stats")
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+实例配置缓存
+缓存各实例 .env、bot_config.toml 与适配器 config.toml 的解析结果，文件的修改时间或大小变化时重新解析。
+读取单个实例时检查修改时间；按端口、QQ号等查询全部实例时直接使用缓存，不访问磁盘
+（缓存由读取、修改配置接口和配置文件监视器保持最新）。
+
+多进程模式下只有状态中心持有缓存，工作进程经由 RemoteInstanceConfigStore 调用下面的异步接口，
+各进程看到同一份缓存，修改配置后不会有进程读到旧的结果。
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from scripts.configurator import CONFIG_SECTIONS, parse_env, parse_toml, check_patch_components
+
+logger = logging.getLogger("x2-launcher.instance-config")
+
+
+def _get(data: Optional[Dict[str, Any]], *keys: str) -> Any:
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def effective_config(sections: Dict[str, Any]) -> Dict[str, Any]:
+    """从各配置文件中提取实例实际使用的端口、QQ号和模型"""
+    env, bot_config, adapter = sections.get("env"), sections.get("bot_config"), sections.get("adapter")
+    qq = _get(adapter, "Napcat", "QQ") or _get(bot_config, "bot", "qq")
+    return {
+        "ports": {
+            "maibot": _int(_get(env, "PORT")),
+            "adapter": _int(_get(adapter, "Adapter", "port") or _get(adapter, "NoneBot", "port")),
+            "napcat": _int(_get(adapter, "Napcat_Server", "port")),
+            # 适配器连接MaiBot使用的端口，应与 maibot 一致
+            "adapter_to_maibot": _int(_get(adapter, "MaiBot_Server", "port")),
+        },
+        "qq_number": str(qq) if qq not in (None, "", 0, "0") else None,
+        "model": _get(bot_config, "model", "type"),
+    }
+
+
+class InstanceConfigStore:
+    """实例配置解析缓存
+
+    Args:
+        base_dir: 实例根目录
+        instance_manager: 修改配置后用于重启受影响组件的实例管理器
+    """
+
+    def __init__(self, base_dir: str, instance_manager=None):
+        self.base_dir = base_dir
+        self.instance_manager = instance_manager
+        # 配置文件监视器，修改配置后告知其新内容，避免重复重启
+        self.watcher = None
+        # 文件路径 -> (mtime_ns, 大小, 解析结果或错误)
+        self._files: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+        # 实例名 -> 上次读取的结果
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.parses = 0
+        self.hits = 0
+
+    def _instance_dir(self, instance_name: str) -> str:
+        path = os.path.join(self.base_dir, instance_name)
+        # 实例名来自URL，不允许跳出实例根目录
+        if os.path.dirname(os.path.normpath(path)) != os.path.normpath(self.base_dir):
+            raise ValueError(f"无效的实例名: {instance_name}")
+        return path
+
+    def exists(self, instance_name: str) -> bool:
+        return os.path.isdir(self._instance_dir(instance_name))
+
+    def _parse(self, section: str, path: str) -> Dict[str, Any]:
+        """读取单个配置文件，返回 {"data": 解析结果} 或 {"error": 错误信息}，文件不存在时为 {"data": None}"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._files.pop(path, None)
+            return {"data": None}
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self.hits += 1
+            return cached[2]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            data = parse_env(content) if section == "env" else parse_toml(content)
+            result = {"data": data}
+        except Exception as e:
+            logger.warning(f"解析配置文件失败 {path}: {e}")
+            result = {"data": None, "error": str(e)}
+        self.parses += 1
+        with self._lock:
+            self._files[path] = (stat.st_mtime_ns, stat.st_size, result)
+        return result
+
+    def read(self, instance_name: str) -> Dict[str, Any]:
+        """读取实例配置（同步），只重新解析修改过的文件"""
+        instance_dir = self._instance_dir(instance_name)
+        sections, errors = {}, {}
+        for section, relative in CONFIG_SECTIONS.items():
+            parsed = self._parse(section, os.path.join(instance_dir, relative))
+            sections[section] = parsed["data"]
+            if "error" in parsed:
+                errors[section] = parsed["error"]
+        result = {
+            "name": instance_name,
+            "effective": effective_config(sections),
+            "sections": sections,
+            "errors": errors,
+            "loaded_at": time.time(),
+        }
+        with self._lock:
+            self.entries[instance_name] = result
+        return result
+
+    def load_all(self) -> int:
+        """读取全部实例的配置（同步），用于启动预热"""
+        try:
+            names = [entry.name for entry in os.scandir(self.base_dir) if entry.is_dir()]
+        except OSError:
+            return 0
+        for name in names:
+            self.read(name)
+        with self._lock:
+            for name in set(self.entries) - set(names):
+                self.entries.pop(name, None)
+        return len(names)
+
+    def invalidate(self, paths: List[str]) -> None:
+        """配置文件被修改后刷新所属实例的缓存"""
+        names = set()
+        for path in paths:
+            relative = os.path.relpath(path, self.base_dir)
+            name = relative.split(os.sep, 1)[0]
+            if name and name != os.pardir:
+                names.add(name)
+        for name in names:
+            if self.exists(name):
+                self.read(name)
+            else:
+                with self._lock:
+                    self.entries.pop(name, None)
+
+    def query(self, port: Optional[int] = None, qq_number: Optional[str] = None,
+              model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """在缓存中查找使用指定端口 / QQ号 / 模型的实例，不访问磁盘"""
+        matches = []
+        for name, entry in sorted(list(self.entries.items())):
+            effective = entry["effective"]
+            matched = []
+            if port is not None:
+                matched += [f"ports.{key}" for key, value in effective["ports"].items() if value == port]
+                if not matched:
+                    continue
+            if qq_number is not None:
+                if effective["qq_number"] != str(qq_number):
+                    continue
+                matched.append("qq_number")
+            if model is not None:
+                if effective["model"] != model:
+                    continue
+                matched.append("model")
+            matches.append({"name": name, "matched": matched, "effective": effective})
+        return matches
+
+    def attach_watcher(self, watcher) -> None:
+        """关联配置文件监视器: 监视器发现修改时刷新缓存"""
+        self.watcher = watcher
+        watcher.add_listener(self.invalidate)
+
+    # 异步接口，多进程模式下由工作进程经状态中心调用
+
+    def _read_existing_instance(self, instance_name: str) -> Dict[str, Any]:
+        if not self.exists(instance_name):
+            raise LookupError(f"实例 {instance_name} 不存在")
+        return self.read(instance_name)
+
+    async def get_config(self, instance_name: str) -> Dict[str, Any]:
+        """读取实例配置
+
+        Raises:
+            ValueError: 无效的实例名
+            LookupError: 实例不存在
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._read_existing_instance, instance_name)
+
+    async def get_watcher_stats(self) -> Optional[Dict[str, Any]]:
+        """关联的配置文件监视器的统计，未启用监视时为None"""
+        return self.watcher.get_stats() if self.watcher is not None else None
+
+    async def find(self, port: Optional[int] = None, qq_number: Optional[str] = None,
+                   model: Optional[str] = None) -> List[Dict[str, Any]]:
+        """在缓存中查找实例，见query"""
+        return self.query(port=port, qq_number=qq_number, model=model)
+
+    def _apply_patch(self, instance_name: str, patch: Dict[str, Any], allow_lossy: bool) -> Dict[str, Any]:
+        from scripts.configurator import BotConfigurator
+
+        if not self.exists(instance_name):
+            raise LookupError(f"实例 {instance_name} 不存在")
+        instance_dir = self._instance_dir(instance_name)
+        # 先检查组件目录，BotConfigurator初始化时会创建MaiBot目录
+        check_patch_components(instance_dir, patch)
+        return BotConfigurator(instance_dir, instance_name).apply_patch(patch, allow_lossy=allow_lossy)
+
+    async def patch(self, instance_name: str, patch: Dict[str, Any], allow_lossy: bool = False) -> Dict[str, Any]:
+        """按JSON Merge Patch修改实例配置，重启配置有改动的组件并刷新缓存
+
+        Raises:
+            ValueError: 无效的实例名、未知的分区或无法写入的值
+            LookupError: 实例不存在
+            ConfigConflictError: 组件未部署，或重写会丢失注释而未允许
+        """
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self._apply_patch, instance_name, patch, allow_lossy)
+        # 由本接口负责重启，配置文件监视器不再重复处理这次修改
+        if self.watcher is not None:
+            for path in result["changed_files"]:
+                self.watcher.acknowledge(path)
+        restarted = []
+        if result["changed_components"] and self.instance_manager is not None:
+            restarted = await self.instance_manager.restart_components(
+                instance_name, result["changed_components"]
+            )
+        config = await loop.run_in_executor(None, self.read, instance_name)
+        return {"success": True, **result, "restarted": restarted, "config": config}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "instances": len(self.entries),
+            "files": len(self._files),
+            "parses": self.parses,
+            "hits": self.hits,
+        }
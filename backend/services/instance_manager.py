@@ -13,21 +13,108 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 from pathlib import Path
 
+from utils.single_flight import coalesce, SingleFlight
+
 logger = logging.getLogger("x2-launcher.instance-manager")
 
+# 实例根目录，未设置时为 ~/MaiM-with-u（基准测试用于指向合成的实例目录）
+INSTANCES_DIR_ENV = "X2_INSTANCES_DIR"
+# 实例目录签名的有效期（秒），期间的请求直接使用上次扫描的结果
+SIGNATURE_TTL = 1.0
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def instances_dir_signature(base_dir: str) -> tuple:
+    """实例目录的修改时间签名
+
+    包括实例根目录、各实例目录和 maibot-vision 目录的修改时间。
+    部署时在已有的实例目录内新建 MaiBot / Adapter 目录只会改变该实例目录的修改时间，
+    因此需要逐个读取实例目录，而不只是实例根目录。
+    """
+    entries = []
+    try:
+        with os.scandir(base_dir) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        entries.append((entry.name, entry.stat().st_mtime_ns))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    vision_config_dir = os.path.join(os.path.dirname(base_dir), "maibot-vision")
+    return (_mtime(base_dir), hash(tuple(sorted(entries))), _mtime(vision_config_dir))
+
+
+class DirectorySignature:
+    """带短时缓存的实例目录签名
+
+    扫描实例目录在线程池中执行，并发请求共享同一次扫描，
+    SIGNATURE_TTL 内的请求直接返回上次的结果，不在事件循环中读取目录。
+    """
+
+    def __init__(self, name: str = "instance_manager.dir_signature", ttl: float = SIGNATURE_TTL):
+        self.ttl = ttl
+        self._cached: Dict[str, tuple] = {}
+        self._flight = SingleFlight(name)
+
+    async def get(self, base_dir: str) -> tuple:
+        cached = self._cached.get(base_dir)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        return await self._flight.do(base_dir, self._scan, base_dir)
+
+    async def _scan(self, base_dir: str) -> tuple:
+        loop = asyncio.get_running_loop()
+        signature = await loop.run_in_executor(None, instances_dir_signature, base_dir)
+        self._cached = {base_dir: (time.monotonic(), signature)}
+        return signature
+
+    def invalidate(self) -> None:
+        self._cached.clear()
+
+
 class InstanceManager:
     """实例管理器类"""
     
-    def __init__(self):
-        """初始化实例管理器"""
-        self.base_dir = os.path.join(os.path.expanduser("~"), "MaiM-with-u")
+    def __init__(self, base_dir: Optional[str] = None):
+        """初始化实例管理器
+
+        Args:
+            base_dir: 实例根目录，默认取环境变量 X2_INSTANCES_DIR，未设置时为 ~/MaiM-with-u
+        """
+        self.base_dir = base_dir or os.environ.get(INSTANCES_DIR_ENV) or os.path.join(os.path.expanduser("~"), "MaiM-with-u")
         self.running_instances = {}  # 存储运行中的实例信息
+        self.version = 0  # 运行状态版本号，实例启动/停止时递增
+        self.dir_signature = DirectorySignature()
         
         # 确保基础目录存在
         os.makedirs(self.base_dir, exist_ok=True)
     
+    async def state_version(self) -> tuple:
+        """实例列表的版本号
+
+        由运行状态版本号和实例目录的修改时间组成，新增/删除实例目录、
+        部署或删除实例组件、启动/停止实例都会改变版本号（目录的变化最多延迟 SIGNATURE_TTL 秒发现）。
+        """
+        return (self.version,) + await self.dir_signature.get(self.base_dir)
+
+    @coalesce("instance_manager.get_instances")
     async def get_instances(self) -> List[Dict[str, Any]]:
-        """获取所有实例"""
+        """获取所有实例
+
+        目录扫描放到线程池执行，并发调用共享同一次扫描。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._scan_instances)
+
+    def _scan_instances(self) -> List[Dict[str, Any]]:
+        """扫描实例目录（同步）"""
         instances = []
         
         try:
@@ -67,8 +154,14 @@ class InstanceManager:
         
         return instances
     
+    @coalesce("instance_manager.get_instance_stats")
     async def get_instance_stats(self) -> Dict[str, Any]:
         """获取实例统计数据，包括总数和运行中的数量"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._count_instances)
+
+    def _count_instances(self) -> Dict[str, Any]:
+        """统计实例数量（同步）"""
         total_instances = 0
         running_instances = 0
         
@@ -150,6 +243,7 @@ class InstanceManager:
                     "nonebot": "running"
                 }
             }
+            self.version += 1
             
             return True
         except Exception as e:
@@ -170,12 +264,41 @@ class InstanceManager:
             
             # 移除实例运行记录
             self.running_instances.pop(instance_name, None)
+            self.version += 1
             
             return True
         except Exception as e:
             logger.error(f"停止实例 {instance_name} 失败: {e}", exc_info=True)
             return False
     
+    async def restart_components(self, instance_name: str, components: List[str]) -> List[str]:
+        """配置变化后只重启受影响的组件（maibot / adapter），其他组件保持运行
+
+        Args:
+            instance_name: 实例名称
+            components: 配置有改动的组件，即配置结果中的 changed_components
+
+        Returns:
+            List[str]: 实际重启的组件，实例未运行时为空
+        """
+        info = self.running_instances.get(instance_name)
+        if info is None or not components:
+            return []
+        
+        restarted = []
+        for component in components:
+            try:
+                # 这里是模拟重启过程
+                # 实际实现应该停止并重新启动该组件的进程
+                logger.info(f"实例 {instance_name} 的 {component} 配置已变化，重启该组件")
+                info.setdefault("restarts", {})[component] = time.time()
+                restarted.append(component)
+            except Exception as e:
+                logger.error(f"重启实例 {instance_name} 的 {component} 失败: {e}", exc_info=True)
+        if restarted:
+            self.version += 1
+        return restarted
+    
     async def stop_all_instances(self) -> bool:
         """停止所有实例"""
         success = True
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+日志桥接服务
+将Python logging记录转发到WebSocket日志流
+"""
+import logging
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import QueueHandler
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger("x2-launcher.log-bridge")
+
+# 始终不转发的日志器: 告警事件已由告警回调直接推送到WebSocket，再转发日志会重复
+ALWAYS_EXCLUDE = ["x2-launcher.alerts"]
+
+
+class _NameFilter(logging.Filter):
+    """按日志器名称前缀过滤"""
+
+    def __init__(self, include: List[str], exclude: List[str]):
+        super().__init__()
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        name = record.name
+        if self.exclude and name.startswith(self.exclude):
+            return False
+        return not self.include or name.startswith(self.include)
+
+
+class LogBridgeHandler(QueueHandler):
+    """QueueHandler实现，emit只做一次入队，可以在任意线程中调用"""
+
+    def __init__(self, bridge: "LogBridge"):
+        super().__init__(None)
+        self.bridge = bridge
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.bridge.put(record)
+
+
+class LogBridge:
+    """日志桥接器
+
+    任意线程（包括部署使用的线程池）产生的日志记录只会被放入有界队列，
+    由事件循环中唯一的消费任务批量取出并交给广播层，日志调用不会等待网络IO。
+    """
+
+    def __init__(self, publish: Callable[[Dict[str, Any]], None], level: str = "INFO",
+                 include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                 max_queue: int = 10000, batch_size: int = 500):
+        self.publish = publish
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.handler = LogBridgeHandler(self)
+        self.handler.setLevel(logging.getLevelName(str(level).upper()) if level else logging.INFO)
+        self.handler.addFilter(_NameFilter(include or [], exclude or []))
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle = True
+        self._task: Optional[asyncio.Task] = None
+
+        # 背压统计
+        self.accepted = 0
+        self.dropped = 0
+        self.published = 0
+        self.high_water = 0
+
+    @classmethod
+    def from_settings(cls, publish: Callable[[Dict[str, Any]], None], config: Dict[str, Any]) -> "LogBridge":
+        """从settings.json的logging.bridge分区创建"""
+        return cls(
+            publish,
+            level=config.get("level", "INFO"),
+            include=config.get("include", ["x2-launcher", "bot-downloader", "MaiBot-Configurator"]),
+            exclude=list(config.get("exclude", [])) + ALWAYS_EXCLUDE,
+            max_queue=int(config.get("max_queue", 10000)),
+            batch_size=int(config.get("batch_size", 500)),
+        )
+
+    def put(self, record: logging.LogRecord) -> None:
+        """入队一条日志记录，队列满时丢弃并计数"""
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._queue.append(record)
+            self.accepted += 1
+            if len(self._queue) > self.high_water:
+                self.high_water = len(self._queue)
+            wake = self._idle
+            self._idle = False
+
+        # 只有消费者空闲时才需要唤醒
+        if wake and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def start(self, target: Optional[logging.Logger] = None) -> None:
+        """在当前事件循环中启动消费任务，并将处理器挂到目标日志器（默认根日志器）"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._consume())
+        (target or logging.getLogger()).addHandler(self.handler)
+        logger.info("日志桥接已启动")
+
+    async def stop(self, target: Optional[logging.Logger] = None) -> None:
+        """移除处理器并停止消费任务"""
+        (target or logging.getLogger()).removeHandler(self.handler)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    async def _consume(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            while True:
+                with self._lock:
+                    count = min(len(self._queue), self.batch_size)
+                    batch = [self._queue.popleft() for _ in range(count)]
+                    if not batch:
+                        self._idle = True
+                        break
+
+                for record in batch:
+                    try:
+                        self.publish(self.to_message(record))
+                        self.published += 1
+                    except Exception:
+                        # 不能在这里记录日志，否则可能形成循环
+                        self.dropped += 1
+                # 每批之间让出事件循环
+                await asyncio.sleep(0)
+
+    @staticmethod
+    def to_message(record: logging.LogRecord) -> Dict[str, Any]:
+        """将日志记录转换为WebSocket日志消息"""
+        # x2-launcher.deploy -> deploy
+        component = record.name.split(".", 1)[1] if "." in record.name else record.name
+        message = {
+            "time": datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S"),
+            "level": record.levelname,
+            "message": record.message if hasattr(record, "message") else record.getMessage(),
+            "source": "system",
+            "logger": record.name,
+            "component": component,
+        }
+        for key in ("instance", "job"):
+            value = getattr(record, key, None)
+            if value:
+                message[key] = value
+        return message
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "high_water": self.high_water,
+            "accepted": self.accepted,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+系统日志持久化存储
+按settings.json的logging配置写入日志文件并按大小轮转，
+每个日志分段带有一个定长记录的索引文件，查询时直接定位到所需字节范围。
+"""
+import os
+import struct
+import logging
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.settings import parse_size, resolve_path
+
+logger = logging.getLogger("x2-launcher.log-store")
+
+# 索引记录: 序号、日志字节偏移、时间戳、级别、消息正文在该条日志中的字节偏移
+_INDEX_RECORD = struct.Struct("<QQdBH")
+INDEX_RECORD_SIZE = _INDEX_RECORD.size
+INDEX_SUFFIX = ".idx"
+# 顺序扫描索引时每次读取的记录数
+_SCAN_CHUNK = 512
+
+
+class IndexedRotatingFileHandler(RotatingFileHandler):
+    """按大小轮转的日志处理器，写入日志的同时追加索引记录
+
+    日志文件 app.log 对应索引 app.log.idx，轮转后分别为 app.log.1 / app.log.1.idx。
+    序号在所有分段间单调递增，进程重启后从最新索引继续。
+    """
+
+    def __init__(self, filename: str, maxBytes: int = 0, backupCount: int = 0, encoding: str = "utf-8"):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self._index = None
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding, delay=True)
+        self._seq = self._load_last_seq()
+
+    def _open(self):
+        # 以二进制方式打开，便于精确记录字节偏移
+        return open(self.baseFilename, "ab")
+
+    def _open_index(self):
+        return open(self.baseFilename + INDEX_SUFFIX, "ab")
+
+    def _load_last_seq(self) -> int:
+        """从最新的非空索引分段读取最后一个序号"""
+        for path in segment_paths(self.baseFilename, self.backupCount, newest_first=True):
+            index_path = path + INDEX_SUFFIX
+            try:
+                size = os.path.getsize(index_path)
+            except OSError:
+                continue
+            count = size // INDEX_RECORD_SIZE
+            if count:
+                with open(index_path, "rb") as f:
+                    f.seek((count - 1) * INDEX_RECORD_SIZE)
+                    return _INDEX_RECORD.unpack(f.read(INDEX_RECORD_SIZE))[0]
+        return 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            text = self.format(record)
+            data = (text + self.terminator).encode(self.encoding or "utf-8", "replace")
+
+            if self.stream is None:
+                self.stream = self._open()
+            offset = self.stream.tell()
+            if self.maxBytes > 0 and offset and offset + len(data) > self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                offset = self.stream.tell()
+            if self._index is None:
+                self._index = self._open_index()
+
+            # 消息正文在格式化结果中的字节偏移，读取时可去掉时间/级别前缀
+            start = text.find(record.message) if record.message else -1
+            message_offset = len(text[:start].encode(self.encoding or "utf-8", "replace")) if start > 0 else 0
+
+            self._seq += 1
+            self.stream.write(data)
+            self.stream.flush()
+            self._index.write(_INDEX_RECORD.pack(
+                self._seq, offset, record.created, min(record.levelno, 255), min(message_offset, 0xFFFF)
+            ))
+            self._index.flush()
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self.backupCount > 0:
+            for i in range(self.backupCount - 1, 0, -1):
+                src = f"{self.baseFilename}.{i}{INDEX_SUFFIX}"
+                dst = f"{self.baseFilename}.{i + 1}{INDEX_SUFFIX}"
+                if os.path.exists(src):
+                    if os.path.exists(dst):
+                        os.remove(dst)
+                    os.rename(src, dst)
+            src = self.baseFilename + INDEX_SUFFIX
+            dst = f"{self.baseFilename}.1{INDEX_SUFFIX}"
+            if os.path.exists(src):
+                if os.path.exists(dst):
+                    os.remove(dst)
+                os.rename(src, dst)
+        super().doRollover()
+        if self.backupCount <= 0:
+            # 不保留备份时直接截断当前分段
+            if self.stream is not None:
+                self.stream.close()
+            self.stream = open(self.baseFilename, "wb")
+            open(self.baseFilename + INDEX_SUFFIX, "wb").close()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+        finally:
+            self.release()
+        super().close()
+
+
+def segment_paths(base: str, backup_count: int, newest_first: bool = False) -> List[str]:
+    """返回所有分段的日志文件路径，默认从最旧到最新"""
+    paths = [f"{base}.{i}" for i in range(backup_count, 0, -1)] + [base]
+    return paths[::-1] if newest_first else paths
+
+
+class _Segment:
+    """单个日志分段的只读视图"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index = open(path + INDEX_SUFFIX, "rb")
+        self.log = open(path, "rb")
+        self.count = os.fstat(self.index.fileno()).st_size // INDEX_RECORD_SIZE
+        self.log_size = os.fstat(self.log.fileno()).st_size
+
+    def close(self) -> None:
+        self.index.close()
+        self.log.close()
+
+    def record(self, i: int) -> Tuple[int, int, float, int, int]:
+        self.index.seek(i * INDEX_RECORD_SIZE)
+        return _INDEX_RECORD.unpack(self.index.read(INDEX_RECORD_SIZE))
+
+    def records(self, start: int, stop: int) -> List[Tuple[int, int, float, int, int]]:
+        """读取 [start, stop) 范围内的索引记录"""
+        self.index.seek(start * INDEX_RECORD_SIZE)
+        data = self.index.read((stop - start) * INDEX_RECORD_SIZE)
+        return [rec for rec in _INDEX_RECORD.iter_unpack(data[:len(data) - len(data) % INDEX_RECORD_SIZE])]
+
+    def bisect(self, field: int, value: float, right: bool = False) -> int:
+        """在索引中二分查找，field 0为序号，2为时间戳"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key = self.record(mid)[field]
+            if key < value or (right and key == value):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read_text(self, offset: int, end: int, message_offset: int) -> str:
+        self.log.seek(offset + message_offset)
+        data = self.log.read(max(0, min(end, self.log_size) - offset - message_offset))
+        return data.decode("utf-8", "replace").rstrip("\r\n")
+
+
+class LogStore:
+    """日志查询接口，基于各分段的索引定位记录"""
+
+    def __init__(self, path: str, backup_count: int = 0, handler: Optional[IndexedRotatingFileHandler] = None):
+        self.path = path
+        self.backup_count = backup_count
+        self.handler = handler
+
+    def query(self, level: Optional[int] = None, since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 200, cursor: Optional[int] = None) -> Dict[str, Any]:
+        """查询日志
+
+        Args:
+            level: 最低日志级别数值
+            since / until: 时间范围（Unix时间戳，闭区间）
+            limit: 最多返回的条数
+            cursor: 只返回序号小于cursor的记录，用于向更早的日志翻页
+
+        Returns:
+            Dict: logs按时间正序排列；next_cursor为继续向前翻页的游标，没有更多时为None
+        """
+        limit = max(1, min(int(limit), 5000))
+        results: List[Dict[str, Any]] = []
+        has_more = False
+
+        # 从最新的分段向前查找，凑够limit条即停止
+        for path in segment_paths(self.path, self.backup_count, newest_first=True):
+            if has_more:
+                break
+            try:
+                segment = _Segment(path)
+            except OSError:
+                continue
+            try:
+                if not segment.count:
+                    continue
+                hi = segment.count
+                if until is not None:
+                    hi = min(hi, segment.bisect(2, until, right=True))
+                if cursor is not None:
+                    hi = min(hi, segment.bisect(0, cursor))
+                lo = segment.bisect(2, since) if since is not None else 0
+
+                stop = hi
+                while stop > lo and not has_more:
+                    start = max(lo, stop - _SCAN_CHUNK)
+                    records = segment.records(start, min(stop + 1, segment.count))
+                    for i in range(stop - start - 1, -1, -1):
+                        seq, offset, created, levelno, message_offset = records[i]
+                        if level and levelno < level:
+                            continue
+                        if len(results) >= limit:
+                            has_more = True
+                            break
+                        end = records[i + 1][1] if i + 1 < len(records) else segment.log_size
+                        results.append({
+                            "seq": seq,
+                            "time": datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S"),
+                            "timestamp": created,
+                            "level": logging.getLevelName(levelno),
+                            "message": segment.read_text(offset, end, message_offset),
+                        })
+                    stop = start
+            finally:
+                segment.close()
+            # 起始时间落在本分段内时，更早的分段不会再有满足条件的记录
+            if since is not None and lo > 0:
+                break
+
+        results.reverse()
+        return {
+            "logs": results,
+            "next_cursor": results[0]["seq"] if has_more and results else None,
+        }
+
+
+def setup_file_logging(config: Dict[str, Any], target: Optional[logging.Logger] = None) -> Optional[LogStore]:
+    """按settings.json的logging分区配置持久化日志，返回对应的LogStore"""
+    file_path = config.get("file_path")
+    if not file_path:
+        return None
+
+    path = resolve_path(file_path)
+    backup_count = int(config.get("backup_count", 5))
+    handler = IndexedRotatingFileHandler(
+        path,
+        maxBytes=parse_size(config.get("max_size"), 10 * 1024 * 1024),
+        backupCount=backup_count,
+    )
+    handler.setLevel(str(config.get("level", "INFO")).upper())
+    handler.setFormatter(logging.Formatter(config.get("format", "[%(asctime)s][%(levelname)s] %(message)s")))
+    (target or logging.getLogger()).addHandler(handler)
+    logger.info(f"系统日志将写入: {path}")
+    return LogStore(path, backup_count, handler)
+
+
+def open_log_store(config: Dict[str, Any]) -> Optional[LogStore]:
+    """只读方式打开日志存储（多进程模式下由其他进程写入日志文件）"""
+    file_path = config.get("file_path")
+    if not file_path:
+        return None
+    return LogStore(resolve_path(file_path), int(config.get("backup_count", 5)))
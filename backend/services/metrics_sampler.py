@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+指标采样服务
+周期性采集主机与实例指标，并交给告警引擎评估
+"""
+import sys
+import time
+import logging
+import asyncio
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger("x2-launcher.metrics-sampler")
+
+# Linux PSI (Pressure Stall Information) 文件
+_PSI_RESOURCES = ("cpu", "memory", "io")
+# 序列连续这么多次采样未出现后，清理其告警状态（活跃告警记为恢复）
+FORGET_AFTER = 3
+
+
+def read_psi(resource: str) -> Dict[str, float]:
+    """读取 /proc/pressure/<resource> 的 some/full avg10 数值，非Linux返回空字典"""
+    if not sys.platform.startswith("linux"):
+        return {}
+    result = {}
+    try:
+        with open(f"/proc/pressure/{resource}", "r") as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                kind = parts[0]
+                for field in parts[1:]:
+                    if field.startswith("avg10="):
+                        result[kind] = float(field[6:])
+    except (OSError, ValueError):
+        pass
+    return result
+
+
+class MetricsSampler:
+    """指标采样器
+
+    采样结果是扁平的 {序列名: 数值} 字典，例如:
+        host.cpu.percent, host.memory.percent, host.psi.memory.some,
+        instance.<name>.rss, instance.<name>.cpu.percent,
+        backend.loop.lag_ms, backend.loop.lag_p99_ms（近一分钟的事件循环延迟，毫秒）
+    """
+
+    def __init__(self, system_info=None, instance_manager=None, alert_engine=None, interval: float = 5.0,
+                 loop_monitor=None):
+        self.system_info = system_info
+        self.instance_manager = instance_manager
+        self.alert_engine = alert_engine
+        self.loop_monitor = loop_monitor
+        self.interval = max(0.5, float(interval))
+        self.latest: Dict[str, float] = {}
+        self.latest_time = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._processes: Dict[int, Any] = {}
+        # 序列名 -> 连续未出现的采样次数
+        self._missing: Dict[str, int] = {}
+
+    @property
+    def psutil(self):
+        return getattr(self.system_info, "psutil", None)
+
+    def start(self) -> None:
+        """启动后台采样任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"指标采样器已启动，间隔 {self.interval} 秒")
+
+    async def stop(self) -> None:
+        """停止后台采样任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("指标采样器已停止")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # psutil 调用可能阻塞，放到线程池中执行
+                samples = await loop.run_in_executor(None, self.collect)
+                self.latest = samples
+                self.latest_time = time.time()
+                if self.alert_engine is not None:
+                    self.alert_engine.evaluate(samples, self.latest_time)
+                    self._forget_missing(samples)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"指标采样失败: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def _forget_missing(self, samples: Dict[str, float]) -> None:
+        """实例停止等原因导致序列不再产生时，通知告警引擎清理该序列"""
+        for series in list(self._missing):
+            if series in samples:
+                del self._missing[series]
+        for series in samples:
+            self._missing.setdefault(series, 0)
+        for series, count in list(self._missing.items()):
+            if series in samples:
+                continue
+            count += 1
+            if count >= FORGET_AFTER:
+                del self._missing[series]
+                self.alert_engine.forget_series(series, self.latest_time)
+            else:
+                self._missing[series] = count
+
+    def collect(self) -> Dict[str, float]:
+        """采集一次所有指标"""
+        samples: Dict[str, float] = {}
+        psutil = self.psutil
+
+        if psutil is not None:
+            # interval=None 返回自上次调用以来的CPU占用，不会阻塞
+            samples["host.cpu.percent"] = psutil.cpu_percent(interval=None)
+            mem = psutil.virtual_memory()
+            samples["host.memory.percent"] = mem.percent
+            samples["host.memory.available"] = mem.available
+
+        for resource in _PSI_RESOURCES:
+            for kind, value in read_psi(resource).items():
+                samples[f"host.psi.{resource}.{kind}"] = value
+
+        if psutil is not None and self.instance_manager is not None:
+            self._collect_instances(psutil, samples)
+
+        if self.loop_monitor is not None:
+            samples.update(self.loop_monitor.metrics())
+
+        return samples
+
+    def _collect_instances(self, psutil, samples: Dict[str, float]) -> None:
+        seen = set()
+        for name, info in list(self.instance_manager.running_instances.items()):
+            pids = info.get("pids") or ([info["pid"]] if info.get("pid") else [])
+            rss = 0
+            cpu = 0.0
+            for pid in pids:
+                proc = self._processes.get(pid)
+                try:
+                    if proc is None:
+                        proc = self._processes[pid] = psutil.Process(pid)
+                        # 第一次调用cpu_percent只建立基准
+                        proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    cpu += proc.cpu_percent(None)
+                    seen.add(pid)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    self._processes.pop(pid, None)
+            if pids:
+                samples[f"instance.{name}.rss"] = rss
+                samples[f"instance.{name}.cpu.percent"] = cpu
+
+        # 清理已退出进程的缓存
+        for pid in [p for p in self._processes if p not in seen]:
+            self._processes.pop(pid, None)
@@ -10,6 +10,8 @@ import logging
 import asyncio
 from typing import Dict, Any
 
+from utils.single_flight import coalesce
+
 logger = logging.getLogger("x2-launcher.system-info")
 
 class SystemInfoService:
@@ -18,17 +20,31 @@ class SystemInfoService:
     def __init__(self):
         """初始化系统信息服务"""
         self.last_metrics = {}
-        self.missing_psutil = False
-        
-        # 尝试导入psutil
-        try:
-            import psutil
-            self.psutil = psutil
-        except ImportError:
-            logger.warning("psutil模块未安装，将使用模拟数据")
-            self.psutil = None
-            self.missing_psutil = True
+        self._psutil = None
+        self._psutil_checked = False
+
+    @property
+    def psutil(self):
+        """psutil模块，首次使用时才导入，不占用启动时间"""
+        if not self._psutil_checked:
+            try:
+                import psutil
+                self._psutil = psutil
+            except ImportError:
+                logger.warning("psutil模块未安装，将使用模拟数据")
+            self._psutil_checked = True
+        return self._psutil
+
+    @psutil.setter
+    def psutil(self, module) -> None:
+        self._psutil = module
+        self._psutil_checked = True
+
+    @property
+    def missing_psutil(self) -> bool:
+        return self.psutil is None
     
+    @coalesce("system_info.get_service_status")
     async def get_service_status(self) -> Dict[str, Any]:
         """获取服务状态"""
         # 这里可以实现实际检查服务状态的逻辑
@@ -42,8 +58,17 @@ class SystemInfoService:
             "maibot": {"status": "stopped", "info": ""}
         }
     
+    @coalesce("system_info.get_system_metrics")
     async def get_system_metrics(self) -> Dict[str, Any]:
-        """获取系统性能指标"""
+        """获取系统性能指标
+
+        采样会阻塞约0.5秒，放到线程池执行；并发调用共享同一次采样。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._collect_metrics)
+
+    def _collect_metrics(self) -> Dict[str, Any]:
+        """采集系统性能指标（同步）"""
         if self.psutil is None:
             # 返回模拟数据
             return {
@@ -157,17 +182,17 @@ class SystemInfoService:
         try:
             # 使用pip安装psutil
             import subprocess
-            result = subprocess.run(
+            # pip安装耗时较长，放到线程池执行
+            result = await asyncio.get_running_loop().run_in_executor(None, lambda: subprocess.run(
                 [sys.executable, "-m", "pip", "install", "psutil"],
                 capture_output=True,
                 text=True,
                 check=True
-            )
+            ))
             
             # 尝试导入psutil
             import psutil
             self.psutil = psutil
-            self.missing_psutil = False
             
             return {
                 "success": True,
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""实例配置缓存与配置文件监视器: 启动后部署、删除的实例能被查询到 / 不再被查询到"""
+import asyncio
+import os
+import shutil
+import time
+
+import pytest
+
+from services import config_watcher
+from services.config_watcher import ConfigWatcher
+from services.instance_config import InstanceConfigStore
+
+BACKENDS = ["polling"] + (["watchfiles"] if config_watcher.WATCHFILES_AVAILABLE else [])
+
+
+class FakeInstanceManager:
+    def __init__(self):
+        self.restarts = []
+
+    async def restart_components(self, instance_name, components):
+        self.restarts.append((instance_name, components))
+        return components
+
+
+def deploy(base_dir, name, port):
+    maibot = os.path.join(base_dir, name, "MaiBot")
+    os.makedirs(os.path.join(maibot, "config"))
+    with open(os.path.join(maibot, ".env"), "w", encoding="utf-8") as f:
+        f.write(f"HOST=127.0.0.1\nPORT={port}\n")
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        assert time.monotonic() < deadline, "等待超时"
+        await asyncio.sleep(0.05)
+
+
+async def found(store, port):
+    return [match["name"] for match in await store.find(port=port)]
+
+
+def start(monkeypatch, backend, base_dir):
+    monkeypatch.setattr(config_watcher, "WATCHFILES_AVAILABLE", backend == "watchfiles")
+    manager = FakeInstanceManager()
+    store = InstanceConfigStore(base_dir, manager)
+    watcher = ConfigWatcher(manager, base_dir=base_dir, debounce=0.05, poll_interval=0.2)
+    store.attach_watcher(watcher)
+    store.load_all()
+    watcher.start()
+    return manager, store, watcher
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_query_sees_instances_deployed_and_removed_after_start(monkeypatch, tmp_path, backend):
+    base_dir = str(tmp_path / "instances")
+    deploy(base_dir, "first", 8000)
+
+    async def run():
+        manager, store, watcher = start(monkeypatch, backend, base_dir)
+        try:
+            assert await found(store, 8000) == ["first"]
+            await asyncio.sleep(0.3)
+            deploy(base_dir, "second", 9000)
+
+            async def deployed():
+                return await found(store, 9000) == ["second"]
+            await wait_for(deployed)
+
+            shutil.rmtree(os.path.join(base_dir, "second"))
+
+            async def removed():
+                return await found(store, 9000) == []
+            await wait_for(removed)
+            assert await found(store, 8000) == ["first"]
+            # 新增、删除实例只刷新缓存，不重启
+            assert manager.restarts == []
+        finally:
+            await watcher.stop()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_watcher_waits_for_missing_base_dir(monkeypatch, tmp_path, backend):
+    base_dir = str(tmp_path / "instances")
+
+    async def run():
+        _, store, watcher = start(monkeypatch, backend, base_dir)
+        try:
+            await asyncio.sleep(0.3)
+            assert (await store.get_watcher_stats())["running"]
+            deploy(base_dir, "first", 8000)
+
+            async def deployed():
+                return await found(store, 8000) == ["first"]
+            await wait_for(deployed)
+            assert (await store.get_watcher_stats())["running"]
+        finally:
+            await watcher.stop()
+
+    asyncio.run(run())
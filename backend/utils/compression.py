@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP响应压缩中间件
+响应体超过阈值时按客户端的Accept-Encoding使用brotli（已安装时）或gzip压缩
+"""
+import gzip
+import asyncio
+from typing import Dict, Any, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.request_metrics import timed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BROTLI_AVAILABLE = brotli is not None
+
+# 已经压缩过或不适合压缩的内容类型
+EXCLUDED_CONTENT_TYPES = (
+    "image/", "video/", "audio/", "font/woff",
+    "application/zip", "application/gzip", "application/x-gzip",
+    "application/octet-stream", "text/event-stream",
+)
+# 超过该大小时在线程池中压缩，避免阻塞事件循环
+THREAD_MINIMUM_SIZE = 256 * 1024
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """解析Accept-Encoding，返回 {编码: q值}"""
+    result: Dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        result[name] = q
+    return result
+
+
+class CompressionMiddleware:
+    """压缩完整的响应体
+
+    只处理一次性发送的响应体；流式响应（如静态文件）原样透传。
+    压缩后的强ETag会转为弱ETag，条件请求按弱比较处理。
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, enable_brotli: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enable_brotli = enable_brotli and BROTLI_AVAILABLE
+
+    @classmethod
+    def settings_kwargs(cls, config: Dict[str, Any]) -> Dict[str, Any]:
+        """将settings.json的http.compression配置转换为构造参数"""
+        return {
+            "minimum_size": int(config.get("minimum_size", 1024)),
+            "gzip_level": int(config.get("gzip_level", 6)),
+            "brotli_quality": int(config.get("brotli_quality", 4)),
+            "enable_brotli": bool(config.get("brotli", True)),
+        }
+
+    def choose_encoding(self, header: str) -> Optional[str]:
+        accepted = parse_accept_encoding(header)
+        if self.enable_brotli and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self, encoding)(scope, receive, send)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.middleware.app(scope, receive, self.send_with_compression)
+
+    def _should_skip(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers or message["status"] in (204, 206, 304):
+            return True
+        content_type = headers.get("content-type", "").lower()
+        return any(content_type.startswith(excluded) for excluded in EXCLUDED_CONTENT_TYPES)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            if self._should_skip(message):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                # 等到响应体确定后再发送响应头
+                self.start_message = message
+            return
+
+        if self.passthrough or message_type != "http.response.body" or self.start_message is None:
+            await self.send(message)
+            return
+
+        start, self.start_message = self.start_message, None
+        body = message.get("body", b"")
+        headers = MutableHeaders(raw=start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+
+        if message.get("more_body", False) or len(body) < self.middleware.minimum_size:
+            # 流式响应或响应体过小，不压缩
+            self.passthrough = True
+            await self.send(start)
+            await self.send(message)
+            return
+
+        with timed("compress"):
+            compressed = await self._compress(body)
+        if len(compressed) < len(body):
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(compressed))
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            message = dict(message, body=compressed)
+        await self.send(start)
+        await self.send(message)
+
+    async def _compress(self, body: bytes) -> bytes:
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.middleware.compress, body, self.encoding)
+        return self.middleware.compress(body, self.encoding)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """
 处理Python编码问题，确保正确支持中文
+导入本模块不会产生副作用，需要时显式调用 fix_encoding()
 """
 import os
 import sys
@@ -18,11 +19,16 @@ def fix_encoding():
         # 强制设置环境变量
         os.environ["PYTHONIOENCODING"] = "utf-8"
         
-        # 标准输出/错误流重定向为UTF-8
-        if sys.stdout.encoding != 'utf-8':
-            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-        if sys.stderr.encoding != 'utf-8':
-            sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+        # 标准输出/错误流切换为UTF-8
+        # 优先原地reconfigure，已经持有sys.stdout/sys.stderr的日志处理器不会失效
+        for name in ("stdout", "stderr"):
+            stream = getattr(sys, name)
+            if stream is None or (stream.encoding or "").lower() == 'utf-8':
+                continue
+            if hasattr(stream, "reconfigure"):
+                stream.reconfigure(encoding='utf-8')
+            else:
+                setattr(sys, name, io.TextIOWrapper(stream.buffer, encoding='utf-8'))
             
         # Windows平台特殊处理
         if sys.platform == "win32":
@@ -67,6 +73,3 @@ def fix_encoding():
         traceback.print_exc()
     
     return encoding_fixed
-
-# 自动应用编码修复
-is_fixed = fix_encoding()
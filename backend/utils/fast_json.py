@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+快速JSON序列化
+安装了orjson时使用orjson，否则回退到标准库json（紧凑格式）
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_AVAILABLE = orjson is not None
+
+
+def _default(obj: Any) -> Any:
+    """无法直接序列化的对象：pydantic模型转为字典，其余转为字符串"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为UTF-8编码的JSON字节串"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用快速序列化的JSON响应
+
+    作为应用的默认响应类；接口直接返回该类实例时，FastAPI不再对返回值
+    执行jsonable_encoder遍历，适用于数据量较大的接口。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
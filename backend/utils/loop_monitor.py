@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+事件循环延迟监控
+事件循环中的心跳任务按固定间隔休眠，实际唤醒时间与预期的差值即调度延迟；
+看门狗线程在心跳超时未更新时（事件循环被同步调用阻塞）读取事件循环线程的调用栈，
+记录阻塞发生时正在执行的任务和代码位置，阻塞结束后补记阻塞时长。
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+from utils.request_metrics import Histogram
+from utils.sampling_profiler import short_path, BACKEND_DIR
+
+logger = logging.getLogger("x2-launcher.loop-monitor")
+
+# 调用栈最多保留的帧数（保留最内层）
+MAX_STACK_FRAMES = 40
+# 计算近期延迟分位数的窗口（秒）
+RECENT_WINDOW = 60.0
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def _format_frame(filename: str, lineno: int, name: str) -> str:
+    return f"{short_path(filename)}:{lineno} {name}"
+
+
+def _callback_frames(frames: List[tuple]) -> List[tuple]:
+    """去掉事件循环本身的帧，返回正在执行的回调（Handle._run之后）的调用栈"""
+    start = 0
+    for index, (filename, _, name) in enumerate(frames):
+        if name == "_run" and filename.startswith(_ASYNCIO_DIR):
+            start = index + 1
+    return frames[start:] or frames
+
+
+def _culprit(frames: List[tuple]) -> Optional[str]:
+    """阻塞位置: 回调中最内层的后端代码，没有时取最内层的帧"""
+    for filename, lineno, name in reversed(frames):
+        if filename.startswith(BACKEND_DIR):
+            return _format_frame(filename, lineno, name)
+    return _format_frame(*frames[-1]) if frames else None
+
+
+class LoopMonitor:
+    """事件循环延迟监控
+
+    Args:
+        interval: 心跳间隔（秒）
+        threshold: 延迟超过该值时记为一次阻塞并抓取调用栈（秒）
+        stall_log_size: 保留的阻塞记录条数
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.2, stall_log_size: int = 50):
+        self.interval = max(0.01, float(interval))
+        self.threshold = max(0.01, float(threshold))
+        self.lag = Histogram()  # 微秒
+        self.stalls: deque = deque(maxlen=stall_log_size)
+        self.stall_count = 0
+        self.since = time.time()
+        # (单调时钟, 延迟秒)，用于计算近期分位数
+        self._recent: deque = deque(maxlen=max(10, int(RECENT_WINDOW / self.interval)))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._beat = 0
+        self._beat_at = 0.0
+        # 看门狗在当前心跳周期内抓取的阻塞记录，心跳恢复后补记时长
+        self._pending: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_settings(cls, config: Dict[str, Any]) -> "LoopMonitor":
+        return cls(
+            interval=config.get("interval_ms", 100) / 1000,
+            threshold=config.get("threshold_ms", 200) / 1000,
+            stall_log_size=int(config.get("stall_log_size", 50)),
+        )
+
+    def start(self) -> None:
+        """在当前事件循环中启动心跳任务和看门狗线程"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat_at = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="x2-loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"事件循环延迟监控已启动，心跳间隔 {self.interval * 1000:.0f} ms，阻塞阈值 {self.threshold * 1000:.0f} ms")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._watchdog.join, 1)
+            self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.interval
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - expected)
+            now = time.monotonic()
+            with self._lock:
+                pending = self._pending
+                self._pending = None
+                self._beat += 1
+                self._beat_at = now
+            self.lag.record(lag * 1_000_000)
+            self._recent.append((now, lag))
+            if lag >= self.threshold:
+                self._record_stall(lag, pending)
+
+    def _record_stall(self, lag: float, pending: Optional[Dict[str, Any]]) -> None:
+        entry = pending or {"time": time.time(), "task": None, "callback": None, "culprit": None, "leaf": None,
+                            "stack": []}
+        entry["lag_ms"] = round(lag * 1000, 3)
+        self.stalls.append(entry)
+        self.stall_count += 1
+        location = entry["culprit"] or "未知（阻塞短于看门狗检查间隔）"
+        logger.warning(f"事件循环阻塞 {entry['lag_ms']:.0f} ms，位置: {location}")
+
+    def _watch(self) -> None:
+        check = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(check):
+            with self._lock:
+                beat, beat_at, pending = self._beat, self._beat_at, self._pending
+            # 心跳周期为interval，超出interval + threshold仍未更新说明事件循环被阻塞
+            if pending is not None or time.monotonic() - beat_at < self.interval + self.threshold:
+                continue
+            entry = self._capture()
+            with self._lock:
+                # 抓取期间心跳已恢复则丢弃
+                if self._beat == beat:
+                    self._pending = entry
+
+    def _capture(self) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread)
+        frames = []
+        while frame is not None:
+            frames.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+            frame = frame.f_back
+        frames.reverse()
+        task_name = None
+        try:
+            task = asyncio.current_task(self._loop)
+            if task is not None:
+                coro = task.get_coro()
+                task_name = f"{task.get_name()} ({getattr(coro, '__qualname__', type(coro).__name__)})"
+        except Exception:
+            pass
+        callback = _callback_frames(frames)
+        return {
+            "time": time.time(),
+            "task": task_name,
+            # 正在执行的回调入口及其中的阻塞位置
+            "callback": _format_frame(*callback[0]) if callback else None,
+            "culprit": _culprit(callback),
+            "leaf": _format_frame(*frames[-1]) if frames else None,
+            "stack": [_format_frame(*f) for f in frames[-MAX_STACK_FRAMES:]],
+        }
+
+    def _recent_lags(self) -> List[float]:
+        cutoff = time.monotonic() - RECENT_WINDOW
+        return sorted(lag for at, lag in list(self._recent) if at >= cutoff)
+
+    def metrics(self) -> Dict[str, float]:
+        """近期延迟指标，供指标采样器和告警规则使用（毫秒）"""
+        lags = self._recent_lags()
+        if not lags:
+            return {}
+        return {
+            "backend.loop.lag_ms": round(lags[-1] * 1000, 3),
+            "backend.loop.lag_p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 3),
+        }
+
+    def reset(self) -> None:
+        self.lag = Histogram()
+        self.stalls.clear()
+        self.stall_count = 0
+        self.since = time.time()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lags = self._recent_lags()
+        recent = {}
+        if lags:
+            for name, pct in (("p50", 50), ("p95", 95), ("p99", 99)):
+                recent[name] = round(lags[min(len(lags) - 1, int(len(lags) * pct / 100))] * 1000, 3)
+            recent["max"] = round(lags[-1] * 1000, 3)
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": round(self.interval * 1000, 3),
+            "threshold_ms": round(self.threshold * 1000, 3),
+            "since": self.since,
+            "lag_ms": self.lag.summary(scale=0.001),
+            "recent_lag_ms": recent,
+            "stall_count": self.stall_count,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        return dict(self.get_stats(), stalls=list(reversed(self.stalls)))
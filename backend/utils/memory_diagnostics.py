@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+内存诊断
+按需开启tracemalloc，保存命名快照并按 文件:行号 对比两次快照间的内存分配变化；
+同时汇总GC各代统计、进程内存以及启动器自身各缓存、缓冲区的大小，
+不需要重启进程即可定位内存增长的来源。
+
+缓存和缓冲区的大小由各组件登记的探针提供（add_probe），探针返回描述大小的字典。
+"""
+import gc
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Callable, Optional
+
+from utils.sampling_profiler import short_path
+
+logger = logging.getLogger("x2-launcher.memory")
+
+# 保留的快照数量上限，超出时淘汰最早的快照
+MAX_SNAPSHOTS = 10
+GROUP_BY = ("lineno", "filename", "traceback")
+# 估算对象大小时最多遍历的对象数
+SIZE_ESTIMATE_LIMIT = 100000
+
+# 快照中排除的分配位置: 导入机制和tracemalloc自身
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+]
+
+
+def estimate_size(obj: Any, limit: int = SIZE_ESTIMATE_LIMIT) -> int:
+    """估算容器及其包含对象占用的字节数（遍历dict/list/tuple/set/deque及带__dict__/__slots__的对象）"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        try:
+            total += sys.getsizeof(item)
+        except TypeError:
+            continue
+        if isinstance(item, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)) or type(item).__name__ == "deque":
+            stack.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(item.__dict__)
+            for slot in getattr(type(item), "__slots__", ()):
+                value = getattr(item, slot, None)
+                if value is not None:
+                    stack.append(value)
+    return total
+
+
+def _frame_location(frame) -> str:
+    return f"{short_path(frame.filename)}:{frame.lineno}"
+
+
+class MemoryDiagnostics:
+    """内存诊断数据
+
+    Args:
+        max_snapshots: 保留的快照数量上限
+    """
+
+    def __init__(self, max_snapshots: int = MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self.snapshots: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._probes: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """应用settings.json的perf.memory配置"""
+        self.max_snapshots = max(2, int(config.get("max_snapshots", self.max_snapshots)))
+
+    # tracemalloc
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self, frames: int = 1) -> None:
+        """开启tracemalloc，frames为每次分配记录的调用栈深度"""
+        if tracemalloc.is_tracing():
+            if tracemalloc.get_traceback_limit() == frames:
+                return
+            tracemalloc.stop()
+            self.snapshots.clear()
+        tracemalloc.start(max(1, min(int(frames), 64)))
+        logger.info(f"tracemalloc已开启，记录 {frames} 层调用栈")
+
+    def stop_tracing(self) -> None:
+        """关闭tracemalloc并丢弃所有快照"""
+        tracemalloc.stop()
+        self.snapshots.clear()
+        logger.info("tracemalloc已关闭")
+
+    def _take(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc未开启")
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def take_snapshot(self, name: str) -> Dict[str, Any]:
+        """保存命名快照，同名快照会被覆盖"""
+        snapshot = self._take()
+        info = {
+            "name": name,
+            "time": time.time(),
+            "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+            "traceback_limit": snapshot.traceback_limit,
+        }
+        with self._lock:
+            self.snapshots.pop(name, None)
+            self.snapshots[name] = dict(info, snapshot=snapshot)
+            while len(self.snapshots) > self.max_snapshots:
+                dropped, _ = self.snapshots.popitem(last=False)
+                logger.info(f"快照数量超出上限，已丢弃最早的快照 {dropped}")
+        return info
+
+    def delete_snapshot(self, name: str) -> bool:
+        with self._lock:
+            return self.snapshots.pop(name, None) is not None
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        return [{key: value for key, value in entry.items() if key != "snapshot"}
+                for entry in list(self.snapshots.values())]
+
+    def _get(self, name: Optional[str]) -> tracemalloc.Snapshot:
+        """按名称取快照，未指定名称时即时拍摄一份（不保存）"""
+        if not name:
+            return self._take()
+        entry = self.snapshots.get(name)
+        if entry is None:
+            raise KeyError(name)
+        return entry["snapshot"]
+
+    @staticmethod
+    def _stat_dict(stat, group_by: str) -> Dict[str, Any]:
+        frames = list(stat.traceback)
+        result = {"location": _frame_location(frames[-1]) if frames else "<unknown>"}
+        if group_by == "filename" and frames:
+            result["location"] = short_path(frames[-1].filename)
+        if group_by == "traceback":
+            result["traceback"] = [_frame_location(frame) for frame in frames]
+        result["size"] = stat.size
+        result["count"] = stat.count
+        if hasattr(stat, "size_diff"):
+            result["size_diff"] = stat.size_diff
+            result["count_diff"] = stat.count_diff
+        return result
+
+    def top(self, name: Optional[str] = None, top: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """单个快照中占用最多的分配位置"""
+        stats = self._get(name).statistics(group_by)
+        return {
+            "snapshot": name or "current",
+            "group_by": group_by,
+            "total_bytes": sum(stat.size for stat in stats),
+            "top": [self._stat_dict(stat, group_by) for stat in stats[:top]],
+        }
+
+    def diff(self, old: str, new: Optional[str] = None, top: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """两次快照间按分配位置的内存变化，按增长量从大到小排列；new为空时与当前状态对比"""
+        old_snapshot = self._get(old)
+        new_snapshot = self._get(new)
+        stats = new_snapshot.compare_to(old_snapshot, group_by)
+        return {
+            "old": old,
+            "new": new or "current",
+            "group_by": group_by,
+            "size_diff": sum(stat.size_diff for stat in stats),
+            "count_diff": sum(stat.count_diff for stat in stats),
+            "top": [self._stat_dict(stat, group_by) for stat in stats[:top]],
+        }
+
+    def tracemalloc_status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "traceback_limit": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            # tracemalloc自身记录分配信息占用的内存
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+            "snapshots": self.list_snapshots(),
+            "max_snapshots": self.max_snapshots,
+        }
+
+    # GC与对象
+
+    @staticmethod
+    def gc_stats() -> Dict[str, Any]:
+        return {
+            "enabled": gc.isenabled(),
+            "count": list(gc.get_count()),
+            "threshold": list(gc.get_threshold()),
+            "generations": gc.get_stats(),
+            "garbage": len(gc.garbage),
+            "frozen": gc.get_freeze_count(),
+        }
+
+    @staticmethod
+    def collect() -> Dict[str, Any]:
+        """执行一次完整回收，返回回收的对象数和耗时"""
+        started = time.perf_counter()
+        collected = gc.collect()
+        return {
+            "collected": collected,
+            "uncollectable": len(gc.garbage),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    @staticmethod
+    def object_types(top: int = 30) -> List[Dict[str, Any]]:
+        """GC跟踪的对象按类型计数，用于发现数量持续增长的类型"""
+        counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+        return [{"type": name, "count": count} for name, count in counts.most_common(top)]
+
+    # 进程内存与组件缓冲区
+
+    @staticmethod
+    def process_memory() -> Optional[Dict[str, Any]]:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return {"rss": info.rss, "vms": info.vms}
+
+    def add_probe(self, name: str, probe: Callable[[], Dict[str, Any]]) -> None:
+        """登记缓存/缓冲区大小探针，同名探针会被替换"""
+        self._probes[name] = probe
+
+    def buffer_sizes(self) -> Dict[str, Any]:
+        result = {}
+        for name, probe in list(self._probes.items()):
+            try:
+                result[name] = probe()
+            except Exception as e:
+                result[name] = {"error": str(e)}
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "process": self.process_memory(),
+            "tracemalloc": self.tracemalloc_status(),
+            "gc": self.gc_stats(),
+            "buffers": self.buffer_sizes(),
+            "timestamp": time.time(),
+        }
+
+
+# 全局内存诊断实例
+memory_diagnostics = MemoryDiagnostics()
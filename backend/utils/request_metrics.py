@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+请求耗时统计中间件
+按路由记录延迟直方图（HDR风格的对数线性分桶，内存固定）、状态码、响应大小和并发请求数，
+超过阈值的慢请求连同耗时分解保存在有界队列中，通过 /api/debug/perf 查看。
+
+处理请求的代码可以用 timed("阶段名") 记录分阶段耗时，慢请求日志中会一并列出。
+"""
+import time
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("x2-launcher.perf")
+
+# 每个2的幂区间划分的子桶数（2^SUB_BUCKET_BITS），相对误差约 1/16
+SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_LINEAR_LIMIT = _SUB_BUCKETS * 2
+# 最大记录值（超出的计入最后一个桶）：延迟为微秒约 1.2 小时，大小为字节约 4GB
+MAX_TRACKABLE_BITS = 32
+
+# 没有匹配到路由的请求（静态文件、404）归为一类，保证路由数量有界
+UNMATCHED_ROUTE = "<unmatched>"
+
+# 当前请求的分阶段耗时 {阶段名: 秒}
+_current_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "x2_request_timings", default=None
+)
+
+
+def route_template(scope: Scope) -> Optional[str]:
+    """请求匹配到的路由模板，例如 /api/start/{instance_name}；未匹配到路由时返回None
+
+    由请求路径和路径参数还原，不依赖路由对象的path（被包含的子路由中不带前缀）。
+    """
+    if scope.get("route") is None:
+        return None
+    path = scope["path"]
+    params = scope.get("path_params")
+    if params:
+        names = {str(value): name for name, value in params.items()}
+        path = "/".join("{" + names[segment] + "}" if segment in names else segment for segment in path.split("/"))
+    return path
+
+
+def _bucket_index(value: int) -> int:
+    if value < _LINEAR_LIMIT:
+        return max(0, value)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return _LINEAR_LIMIT + (shift - 1) * _SUB_BUCKETS + (value >> shift) - _SUB_BUCKETS
+
+
+def _bucket_upper(index: int) -> int:
+    """桶内的最大值"""
+    if index < _LINEAR_LIMIT:
+        return index
+    shift, sub = divmod(index - _LINEAR_LIMIT, _SUB_BUCKETS)
+    shift += 1
+    return ((sub + _SUB_BUCKETS + 1) << shift) - 1
+
+
+_BUCKET_COUNT = _bucket_index((1 << MAX_TRACKABLE_BITS) - 1) + 1
+
+
+class Histogram:
+    """对数线性分桶直方图，记录非负整数，内存固定"""
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        value = int(value)
+        self.counts[min(_bucket_index(value), _BUCKET_COUNT - 1)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct: float) -> int:
+        """返回分位数所在桶的上界（不超过记录到的最大值）"""
+        if not self.count:
+            return 0
+        rank = max(1, int(round(pct / 100 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max)
+        return self.max
+
+    def summary(self, scale: float = 1.0, digits: int = 3) -> Dict[str, Any]:
+        """分位数摘要，scale用于单位换算（例如微秒换算为毫秒传入0.001）"""
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count * scale, digits) if self.count else 0,
+            "min": round((self.min or 0) * scale, digits),
+            "p50": round(self.percentile(50) * scale, digits),
+            "p95": round(self.percentile(95) * scale, digits),
+            "p99": round(self.percentile(99) * scale, digits),
+            "max": round(self.max * scale, digits),
+        }
+
+
+class RouteStats:
+    """单个路由的统计"""
+
+    __slots__ = ("latency", "sizes", "status", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()  # 微秒
+        self.sizes = Histogram()  # 字节
+        self.status: Dict[int, int] = {}
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": self.latency.summary(scale=0.001),
+            "response_bytes": dict(self.sizes.summary(digits=0), total=self.sizes.total),
+            "status": {str(code): count for code, count in sorted(self.status.items())},
+            "errors": self.errors,
+        }
+
+
+@contextmanager
+def timed(name: str):
+    """记录当前请求中一个阶段的耗时（不在请求中时不记录）"""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+class RequestMetrics:
+    """请求统计数据
+
+    Args:
+        slow_request_ms: 超过该耗时的请求记入慢请求日志
+        slow_log_size: 慢请求日志保留的条数
+        max_routes: 最多统计的路由数，超出的归入 <unmatched>
+    """
+
+    def __init__(self, slow_request_ms: float = 500, slow_log_size: int = 100, max_routes: int = 500):
+        self.slow_request_ms = slow_request_ms
+        self.max_routes = max_routes
+        self.routes: Dict[str, RouteStats] = {}
+        self.slow_requests: deque = deque(maxlen=slow_log_size)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.since = time.time()
+
+    def configure(self, config: Dict[str, Any]) -> None:
+        """应用settings.json的perf配置"""
+        self.slow_request_ms = float(config.get("slow_request_ms", self.slow_request_ms))
+        size = int(config.get("slow_log_size", self.slow_requests.maxlen))
+        if size != self.slow_requests.maxlen:
+            self.slow_requests = deque(self.slow_requests, maxlen=size)
+
+    def route_stats(self, key: str) -> RouteStats:
+        stats = self.routes.get(key)
+        if stats is None:
+            if len(self.routes) >= self.max_routes:
+                key = UNMATCHED_ROUTE
+                stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+        return stats
+
+    def observe(self, scope: Scope, status: int, size: int, started: float, first_byte: Optional[float],
+                finished: float, timings: Dict[str, float], error: bool) -> None:
+        template = route_template(scope)
+        key = f"{scope['method']} {template}" if template else UNMATCHED_ROUTE
+        stats = self.route_stats(key)
+        elapsed = finished - started
+        stats.latency.record(elapsed * 1_000_000)
+        stats.sizes.record(size)
+        stats.status[status] = stats.status.get(status, 0) + 1
+        if error:
+            stats.errors += 1
+
+        if elapsed * 1000 >= self.slow_request_ms:
+            entry = {
+                "time": time.time(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "route": key,
+                "status": status,
+                "bytes": size,
+                "total_ms": round(elapsed * 1000, 3),
+                # 从开始处理到发送响应头，以及发送响应体的耗时
+                "ttfb_ms": round((first_byte - started) * 1000, 3) if first_byte else None,
+                "send_ms": round((finished - first_byte) * 1000, 3) if first_byte else None,
+                "phases_ms": {name: round(value * 1000, 3) for name, value in timings.items()},
+            }
+            self.slow_requests.append(entry)
+            logger.warning(f"慢请求: {key} {scope['path']} 耗时 {entry['total_ms']:.0f} ms，状态码 {status}")
+
+    def reset(self) -> None:
+        self.routes.clear()
+        self.slow_requests.clear()
+        self.peak_in_flight = self.in_flight
+        self.since = time.time()
+
+    def report(self, sort: str = "p99") -> Dict[str, Any]:
+        routes = {key: stats.to_dict() for key, stats in self.routes.items()}
+        ordered = sorted(routes.items(), key=lambda item: item[1]["latency_ms"].get(sort, 0), reverse=True)
+        return {
+            "since": self.since,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "slow_request_ms": self.slow_request_ms,
+            "routes": dict(ordered),
+            "slow_requests": list(reversed(self.slow_requests)),
+        }
+
+
+# 全局统计实例
+request_metrics = RequestMetrics()
+
+
+class RequestMetricsMiddleware:
+    """记录每个HTTP请求的耗时、状态码和响应大小"""
+
+    def __init__(self, app: ASGIApp, metrics: Optional[RequestMetrics] = None):
+        self.app = app
+        self.metrics = metrics or request_metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = _current_timings.set(timings)
+        status = 500
+        size = 0
+        first_byte: Optional[float] = None
+        error = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                first_byte = time.perf_counter()
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        if metrics.in_flight > metrics.peak_in_flight:
+            metrics.peak_in_flight = metrics.in_flight
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.in_flight -= 1
+            _current_timings.reset(token)
+            try:
+                metrics.observe(scope, status, size, started, first_byte, time.perf_counter(), timings, error)
+            except Exception as e:
+                logger.error(f"记录请求耗时失败: {e}")
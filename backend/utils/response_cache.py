@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+轮询接口的响应缓存
+按底层状态的版本号缓存序列化后的JSON响应，生成强ETag并处理If-None-Match条件请求
+"""
+import time
+import hashlib
+import logging
+from typing import Dict, Any, Callable, Awaitable, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from utils.fast_json import dumps
+from utils.single_flight import SingleFlight
+from utils.request_metrics import timed
+
+logger = logging.getLogger("x2-launcher.response-cache")
+
+
+class _CachedBody:
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version: Hashable, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match使用弱比较，压缩中间件会把强ETag转为弱ETag
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in header.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+class TTLMemo:
+    """短时记忆化，适用于没有版本号的数据
+
+    同一个键在TTL内直接返回缓存值；过期后并发的请求通过SingleFlight
+    只触发一次计算，其余请求等待同一个结果。
+    """
+
+    def __init__(self):
+        self._values: Dict[Hashable, Tuple[float, int, Any]] = {}
+        self._flight = SingleFlight("response_cache.memo")
+        self._generation = 0
+
+    async def get(self, key: Hashable, compute: Callable[[], Awaitable[Any]], ttl: float) -> Tuple[int, Any]:
+        """返回 (代数, 值)，代数在每次重新计算后递增，可作为版本号使用"""
+        entry = self._values.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1], entry[2]
+        return await self._flight.do(key, self._refresh, key, compute)
+
+    async def _refresh(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[int, Any]:
+        value = await compute()
+        self._generation += 1
+        self._values[key] = (time.monotonic(), self._generation, value)
+        return self._generation, value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+
+class ResponseCache:
+    """按版本号缓存JSON响应体
+
+    版本号未变化时直接复用已序列化的响应体与ETag，不会重新计算或序列化；
+    客户端携带匹配的If-None-Match时返回304。
+    """
+
+    def __init__(self):
+        self._bodies: Dict[Hashable, _CachedBody] = {}
+        self.memo = TTLMemo()
+        self._flight = SingleFlight("response_cache.respond")
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def respond(self, request: Request, key: Hashable, version: Hashable,
+                      compute: Callable[[], Awaitable[Any]]) -> Response:
+        """返回版本化缓存的JSON响应
+
+        Args:
+            key: 缓存键，通常为接口名称
+            version: 底层状态的版本号，变化时重新计算
+            compute: 计算响应内容的协程函数
+        """
+        cached = self._bodies.get(key)
+        if cached is None or cached.version != version:
+            self.misses += 1
+            # 同一版本的并发未命中只计算和序列化一次
+            cached = await self._flight.do((key, version), self._build, key, version, compute)
+        else:
+            self.hits += 1
+        return self._to_response(request, cached)
+
+    async def _build(self, key: Hashable, version: Hashable, compute: Callable[[], Awaitable[Any]]) -> _CachedBody:
+        with timed("compute"):
+            content = await compute()
+        with timed("serialize"):
+            cached = _CachedBody(version, self.serialize(content))
+        self._bodies[key] = cached
+        return cached
+
+    async def respond_ttl(self, request: Request, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                          ttl: float = 2.0) -> Response:
+        """没有版本号的数据：TTL内复用结果，并发请求共享同一次计算"""
+        with timed("compute"):
+            generation, content = await self.memo.get(key, compute, ttl)
+        cached = self._bodies.get(key)
+        if cached is None or cached.version != generation:
+            self.misses += 1
+            with timed("serialize"):
+                cached = _CachedBody(generation, self.serialize(content))
+            self._bodies[key] = cached
+        else:
+            self.hits += 1
+        return self._to_response(request, cached)
+
+    @staticmethod
+    def serialize(content: Any) -> bytes:
+        return dumps(content)
+
+    def _to_response(self, request: Request, cached: _CachedBody) -> Response:
+        headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request, cached.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._bodies.clear()
+        else:
+            self._bodies.pop(key, None)
+        self.memo.invalidate(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._bodies),
+            "body_bytes": sum(len(cached.body) for cached in list(self._bodies.values())),
+            "memo_entries": len(self.memo),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+        }
+
+
+# 全局响应缓存
+response_cache = ResponseCache()
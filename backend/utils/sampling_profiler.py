@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+采样式CPU分析器
+由后台线程按固定间隔读取 sys._current_frames() 获取所有线程（事件循环线程、线程池线程等）的调用栈，
+统计各调用栈出现的次数。不使用信号，Windows下同样可用；单次分析有最长时长和调用栈种类上限，
+可以在正式环境中按需开启。
+
+结果可导出为:
+  - collapsed: 每行 "线程;函数1;函数2... 次数"，可直接用于flamegraph.pl / speedscope
+  - pstats: 与cProfile相同的统计文件格式，可用 pstats.Stats / snakeviz 查看
+"""
+import os
+import sys
+import time
+import marshal
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger("x2-launcher.profiler")
+
+DEFAULT_INTERVAL = 0.01
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 0.1
+DEFAULT_DURATION = 30.0
+# 单次分析记录的不同调用栈数量上限，超出后只计数不记录
+MAX_STACKS = 50000
+MAX_DEPTH = 128
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def short_path(path: str) -> str:
+    """缩短文件路径: 后端代码相对于backend目录，第三方库相对于site-packages"""
+    if path.startswith(BACKEND_DIR):
+        return os.path.relpath(path, BACKEND_DIR).replace(os.sep, "/")
+    marker = "site-packages" + os.sep
+    index = path.rfind(marker)
+    if index >= 0:
+        return path[index + len(marker):].replace(os.sep, "/")
+    return os.path.basename(path)
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """采样式分析器，同一时间只能进行一次分析"""
+
+    def __init__(self):
+        self.interval = DEFAULT_INTERVAL
+        self.duration = DEFAULT_DURATION
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.samples = 0
+        self.dropped = 0
+        # (线程名, 由根到叶的代码对象元组) -> 次数
+        self.stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sampling_time = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = DEFAULT_INTERVAL, duration: float = DEFAULT_DURATION) -> None:
+        """开始分析，到达duration秒后自动停止；上一次的结果会被清空"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("分析器已在运行")
+            self.interval = min(max(float(interval), MIN_INTERVAL), MAX_INTERVAL)
+            self.duration = max(0.1, float(duration))
+            self.stacks = Counter()
+            self.samples = 0
+            self.dropped = 0
+            self._sampling_time = 0.0
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="x2-sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"CPU分析已开始，采样间隔 {self.interval * 1000:.1f} ms，最长 {self.duration:.0f} 秒")
+
+    def stop(self) -> None:
+        """停止分析并等待采样线程结束"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        deadline = time.perf_counter() + self.duration
+        next_sample = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                self._sample(own_ident)
+                self._sampling_time += time.perf_counter() - now
+                next_sample += self.interval
+                delay = next_sample - time.perf_counter()
+                if delay < 0:
+                    # 采样跟不上时不追赶，避免连续采样占满CPU
+                    next_sample = time.perf_counter()
+                    delay = 0
+                self._stop.wait(delay)
+        finally:
+            self.stopped_at = time.time()
+            logger.info(f"CPU分析已停止，共 {self.samples} 次采样")
+
+    def _sample(self, own_ident: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        stacks = self.stacks
+        for ident, frame in frames.items():
+            if ident == own_ident:
+                continue
+            codes: List[Any] = []
+            while frame is not None and len(codes) < MAX_DEPTH:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            key = (names.get(ident, f"thread-{ident}"), tuple(codes))
+            if key in stacks or len(stacks) < MAX_STACKS:
+                stacks[key] += 1
+            else:
+                self.dropped += 1
+        self.samples += 1
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = ((self.stopped_at or time.time()) - self.started_at) if self.started_at else 0
+        return {
+            "running": self.running,
+            "interval_ms": round(self.interval * 1000, 3),
+            "duration": self.duration,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+            "elapsed": round(elapsed, 3),
+            "samples": self.samples,
+            "unique_stacks": len(self.stacks),
+            "dropped_stacks": self.dropped,
+            # 采样本身占用的时间比例
+            "overhead": round(self._sampling_time / elapsed, 4) if elapsed else 0,
+        }
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, Tuple[Any, ...]], int]]:
+        # 采样线程运行中也可以导出，复制一份避免迭代时被修改
+        for _ in range(3):
+            try:
+                return list(self.stacks.items())
+            except RuntimeError:
+                continue
+        return []
+
+    def collapsed(self, by_thread: bool = True) -> str:
+        """导出collapsed格式: 每行一个调用栈及其采样次数"""
+        lines: Counter = Counter()
+        for (thread_name, codes), count in self._snapshot():
+            frames = [_label(code) for code in codes]
+            if by_thread:
+                frames.insert(0, thread_name)
+            lines[";".join(frames)] += count
+        return "".join(f"{stack} {count}\n" for stack, count in lines.most_common())
+
+    def pstats_data(self) -> bytes:
+        """导出cProfile格式的统计数据（marshal序列化的字典）
+
+        采样没有调用次数，调用次数记为出现的采样次数；耗时 = 采样次数 * 采样间隔。
+        """
+        interval = self.interval
+        # 函数 -> [自身采样数, 累计采样数]；(调用者, 被调用者) -> 累计采样数
+        own: Dict[Tuple[str, int, str], List[int]] = {}
+        edges: Counter = Counter()
+        for (_, codes), count in self._snapshot():
+            keys = [(code.co_filename, code.co_firstlineno, code.co_name) for code in codes]
+            seen = set()
+            for i, key in enumerate(keys):
+                entry = own.setdefault(key, [0, 0])
+                # 递归调用只计一次累计时间
+                if key not in seen:
+                    entry[1] += count
+                    seen.add(key)
+                if i:
+                    edges[(keys[i - 1], key)] += count
+            if keys:
+                own[keys[-1]][0] += count
+
+        stats = {}
+        for key, (self_count, total_count) in own.items():
+            stats[key] = (total_count, total_count, self_count * interval, total_count * interval, {})
+        for (caller, callee), count in edges.items():
+            callee_self = own[callee][0]
+            stats[callee][4][caller] = (count, count, min(callee_self, count) * interval, count * interval)
+        return marshal.dumps(stats)
+
+
+# 全局分析器
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+读取项目根目录下的settings.json配置
+"""
+import os
+import json
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger("x2-launcher.settings")
+
+# 项目根目录（backend的上一级），settings.json 位于此目录
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SETTINGS_PATH = os.path.join(PROJECT_ROOT, "settings.json")
+
+_settings_cache: Optional[Dict[str, Any]] = None
+
+
+def load_settings(reload: bool = False) -> Dict[str, Any]:
+    """加载settings.json，结果会被缓存
+
+    Args:
+        reload: 是否忽略缓存重新读取
+
+    Returns:
+        Dict: 配置字典，读取失败时返回空字典
+    """
+    global _settings_cache
+    if _settings_cache is not None and not reload:
+        return _settings_cache
+
+    path = os.environ.get("X2_SETTINGS", SETTINGS_PATH)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            _settings_cache = json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"配置文件不存在: {path}")
+        _settings_cache = {}
+    except Exception as e:
+        logger.error(f"读取配置文件失败: {e}")
+        _settings_cache = {}
+    return _settings_cache
+
+
+def get_section(name: str) -> Dict[str, Any]:
+    """获取配置中的某个分区，不存在时返回空字典"""
+    section = load_settings().get(name)
+    return section if isinstance(section, dict) else {}
+
+
+_SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+
+def parse_size(value: Any, default: int = 0) -> int:
+    """解析 "10MB"、"2GB" 或数字形式的大小配置，返回字节数"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not value:
+        return default
+    text = str(value).strip().upper().replace(" ", "")
+    for unit in ("TB", "GB", "MB", "KB", "B"):
+        if text.endswith(unit):
+            try:
+                return int(float(text[:-len(unit)]) * _SIZE_UNITS[unit])
+            except ValueError:
+                return default
+    try:
+        return int(float(text))
+    except ValueError:
+        return default
+
+
+def resolve_path(path: str) -> str:
+    """将配置中的相对路径解析为相对于项目根目录的绝对路径"""
+    path = os.path.expanduser(path)
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
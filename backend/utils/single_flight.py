@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）工具
+相同键的并发调用共享同一次进行中的计算及其结果
+"""
+import asyncio
+import functools
+from typing import Dict, Any, Callable, Awaitable, Hashable, List
+
+# 所有SingleFlight实例，用于汇总统计
+_registry: List["SingleFlight"] = []
+
+
+class SingleFlight:
+    """合并相同键的并发调用
+
+    第一个调用者启动计算，计算完成前到达的相同键调用直接等待同一个结果，
+    计算完成后不保留结果（缓存由调用方决定）。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        _registry.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """执行fn，若相同键的调用正在进行则等待其结果
+
+        计算在独立的任务中执行，第一个调用者与其他等待者一样通过shield等待，
+        任何一个调用者（包括第一个）被取消都不会取消计算本身或影响其他等待者。
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finished, key))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        """计算结束后移出进行中的调用"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有调用者都已取消时，避免出现未获取异常的警告
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        shared = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": shared,
+            "inflight": len(self._inflight),
+            # 合并比例：被合并掉的调用占全部调用的比例
+            "coalescing_ratio": round(shared / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+def coalesce(name: str = None):
+    """装饰异步方法，使同一对象上参数相同的并发调用合并为一次执行"""
+
+    def decorator(fn):
+        group = SingleFlight(name or fn.__qualname__)
+
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            key = (id(self), args, tuple(sorted(kwargs.items())))
+            return await group.do(key, fn, self, *args, **kwargs)
+
+        wrapper.single_flight = group
+        return wrapper
+
+    return decorator
+
+
+def get_all_stats() -> Dict[str, Dict[str, Any]]:
+    """返回所有single-flight分组的统计"""
+    return {group.name: group.get_stats() for group in _registry}
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+后端启动耗时分析
+始终记录各初始化阶段的耗时；设置环境变量 X2_STARTUP_PROFILE=1 时，
+额外记录每个模块的导入耗时（累计及自身耗时），结果通过 /api/debug/startup 查看。
+
+本模块只依赖标准库，需要在main.py中先于其他模块导入。
+"""
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+PROFILE_ENV = "X2_STARTUP_PROFILE"
+
+
+class _ImportTimer:
+    """sys.meta_path中的查找器，为找到的模块包装exec_module以记录导入耗时"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        # 委托给其余查找器，防止查找过程中递归进入自身
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+
+        loader = spec.loader
+        # 内置/冻结模块的加载器是类本身，导入很快，不做包装
+        if loader is None or isinstance(loader, type) or not hasattr(loader, "exec_module"):
+            return spec
+        exec_module = loader.exec_module
+        profiler = self.profiler
+
+        def timed_exec_module(module):
+            profiler._enter(fullname)
+            try:
+                exec_module(module)
+            finally:
+                profiler._exit(fullname)
+
+        loader.exec_module = timed_exec_module
+        return spec
+
+
+class StartupProfiler:
+    """启动耗时记录器"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.enabled = False
+        self.phases: List[Dict[str, Any]] = []
+        self.modules: Dict[str, Dict[str, float]] = {}
+        self.ready_ms: Optional[float] = None
+        # 每个线程各自的导入栈
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._timer: Optional[_ImportTimer] = None
+
+    def enable(self) -> None:
+        """开启模块导入耗时记录"""
+        if self._timer is None:
+            self.enabled = True
+            self._timer = _ImportTimer(self)
+            sys.meta_path.insert(0, self._timer)
+
+    def disable(self) -> None:
+        """停止记录模块导入耗时（启动完成后调用）"""
+        if self._timer is not None:
+            try:
+                sys.meta_path.remove(self._timer)
+            except ValueError:
+                pass
+            self._timer = None
+
+    def _elapsed_ms(self, since: Optional[float] = None) -> float:
+        return round((time.perf_counter() - (self.started if since is None else since)) * 1000, 3)
+
+    def _import_stack(self) -> List[List[Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name: str) -> None:
+        # [模块名, 开始时间, 子模块累计耗时]
+        self._import_stack().append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name: str) -> None:
+        stack = self._import_stack()
+        if not stack or stack[-1][0] != name:
+            return
+        _, start, children = stack.pop()
+        cumulative = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += cumulative
+        with self._lock:
+            self.modules[name] = {
+                "cumulative_ms": round(cumulative * 1000, 3),
+                "self_ms": round((cumulative - children) * 1000, 3),
+            }
+
+    @contextmanager
+    def phase(self, name: str):
+        """记录一个初始化阶段的耗时"""
+        start_ms = self._elapsed_ms()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "start_ms": start_ms, "duration_ms": self._elapsed_ms(start)})
+
+    def mark_ready(self) -> None:
+        """应用启动完成（即将开始接受请求）"""
+        if self.ready_ms is None:
+            self.ready_ms = self._elapsed_ms()
+            self.disable()
+
+    def report(self, top: int = 50, sort: str = "self_ms") -> Dict[str, Any]:
+        modules = sorted(
+            ({"module": name, **timing} for name, timing in self.modules.items()),
+            key=lambda item: item.get(sort, 0),
+            reverse=True,
+        )
+        return {
+            "profiling": self.enabled,
+            "started_at": self.started_at,
+            "ready_ms": self.ready_ms,
+            "phases": self.phases,
+            "modules_total": len(modules),
+            "modules": modules[:top],
+        }
+
+
+startup_profiler = StartupProfiler()
+if os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes"):
+    startup_profiler.enable()
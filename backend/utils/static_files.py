@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+前端静态文件服务
+启动时（或在后台）为frontend/dist生成资源清单（内容哈希、类型、预压缩版本），
+按Accept-Encoding提供.br/.gz预压缩文件；带内容哈希的资源使用immutable长缓存，
+index.html常驻内存用于SPA回退。
+清单的生成和重新扫描在线程池中执行，清单就绪前直接按文件提供（不压缩、不长缓存）。
+"""
+import os
+import re
+import gzip
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import mimetypes
+from typing import Dict, Any, Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import Response, FileResponse
+from starlette.types import Receive, Scope, Send
+
+from utils.compression import parse_accept_encoding, EXCLUDED_CONTENT_TYPES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("x2-launcher.static")
+
+# Windows注册表中的类型映射可能不正确（例如.js为text/plain），显式指定
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/javascript", ".mjs")
+mimetypes.add_type("text/css", ".css")
+mimetypes.add_type("image/svg+xml", ".svg")
+
+# Vite构建产物位于assets目录，文件名形如 index-BX3k9aQz.js
+HASHED_DIR = "assets/"
+HASHED_NAME = re.compile(r"[.-][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# 预压缩文件的扩展名，按优先级排列
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# 各编码版本的ETag后缀：强ETag必须区分不同的表示（原始内容与各压缩版本）
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+# 资源目录被替换（重新构建）后，最多间隔多久发现
+RESCAN_INTERVAL = 1.0
+
+
+class StaticAsset:
+    """清单中的单个资源"""
+
+    __slots__ = ("path", "size", "media_type", "etag", "immutable", "variants", "memory")
+
+    def __init__(self, path: str, data: bytes, media_type: str, immutable: bool):
+        self.path = path
+        self.size = len(data)
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        self.immutable = immutable
+        # 编码 -> 磁盘上的预压缩文件路径或内存中的压缩数据
+        self.variants: Dict[str, Any] = {}
+        self.memory: Optional[bytes] = None
+
+    @property
+    def cache_control(self) -> str:
+        return IMMUTABLE_CACHE if self.immutable else REVALIDATE_CACHE
+
+
+class StaticAssets:
+    """带资源清单的静态文件ASGI应用
+
+    Args:
+        directory: 前端构建目录
+        compress_min_size: 没有预压缩文件时，超过该大小的资源在内存中压缩
+        defer: 为True时不在构造时生成清单，由ensure_manifest（或首个请求在线程池中）生成
+    """
+
+    def __init__(self, directory: str, compress_min_size: int = 1024, defer: bool = False):
+        self.directory = os.path.abspath(directory)
+        self.compress_min_size = compress_min_size
+        self.manifest: Dict[str, StaticAsset] = {}
+        self.index: Optional[StaticAsset] = None
+        self.ready = False
+        self._dir_mtime = 0
+        self._checked_at = 0.0
+        self._build_lock = threading.Lock()
+        self._building: Optional[asyncio.Future] = None
+        if not defer:
+            self.ensure_manifest()
+
+    def ensure_manifest(self) -> None:
+        """清单尚未生成时生成清单（可在后台线程中调用）"""
+        if self.ready:
+            return
+        with self._build_lock:
+            if not self.ready:
+                self.build_manifest()
+                self.ready = True
+
+    def build_manifest(self) -> None:
+        """扫描构建目录，生成资源清单"""
+        started = time.perf_counter()
+        manifest: Dict[str, StaticAsset] = {}
+        memory_bytes = 0
+        for root, _, files in os.walk(self.directory):
+            names = set(files)
+            for name in files:
+                if any(name.endswith(suffix) and name[:-len(suffix)] in names for suffix in VARIANT_SUFFIXES.values()):
+                    continue
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                try:
+                    with open(full_path, "rb") as f:
+                        data = f.read()
+                except OSError as e:
+                    logger.warning(f"读取静态文件失败: {full_path}: {e}")
+                    continue
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                immutable = rel_path.startswith(HASHED_DIR) and bool(HASHED_NAME.search(name))
+                asset = StaticAsset(full_path, data, media_type, immutable)
+                if rel_path == "index.html":
+                    asset.memory = data
+                memory_bytes += self._attach_variants(asset, data, names, name)
+                manifest[rel_path] = asset
+
+        self.manifest = manifest
+        self.index = manifest.get("index.html")
+        self._dir_mtime = self._mtime()
+        logger.info(f"静态资源清单已生成: {len(manifest)} 个文件，内存压缩 {memory_bytes} 字节，"
+                    f"耗时 {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def _attach_variants(self, asset: StaticAsset, data: bytes, names: set, name: str) -> int:
+        """登记预压缩版本，返回在内存中压缩的字节数"""
+        for encoding, suffix in VARIANT_SUFFIXES.items():
+            if name + suffix in names:
+                asset.variants[encoding] = asset.path + suffix
+        if asset.variants or len(data) < self.compress_min_size:
+            return 0
+        if any(asset.media_type.startswith(excluded) for excluded in EXCLUDED_CONTENT_TYPES):
+            return 0
+
+        # 构建时没有生成预压缩文件，在内存中压缩一次（使用较快的压缩级别）
+        size = 0
+        if brotli is not None:
+            asset.variants["br"] = brotli.compress(data, quality=5)
+            size += len(asset.variants["br"])
+        asset.variants["gzip"] = gzip.compress(data, compresslevel=6, mtime=0)
+        size += len(asset.variants["gzip"])
+        return size
+
+    def _mtime(self) -> int:
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _rebuild(self) -> None:
+        """在线程池中生成或重新生成清单（同步）"""
+        with self._build_lock:
+            if self.ready and self._mtime() == self._dir_mtime:
+                # 等待锁期间清单已由预热步骤生成
+                return
+            self.build_manifest()
+            self.ready = True
+
+    def _maybe_rescan(self) -> None:
+        """清单未生成或构建目录变化（前端重新构建）时，在线程池中生成清单
+
+        不等待生成完成：生成期间继续使用旧清单，尚无清单时直接按文件提供。
+        """
+        if self.ready:
+            now = time.monotonic()
+            if now - self._checked_at < RESCAN_INTERVAL:
+                return
+            self._checked_at = now
+            if self._mtime() == self._dir_mtime:
+                return
+        if self._building is None or self._building.done():
+            self._building = asyncio.get_running_loop().run_in_executor(None, self._rebuild)
+            self._building.add_done_callback(self._build_done)
+
+    @staticmethod
+    def _build_done(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"生成静态资源清单失败: {future.exception()}")
+
+    def _plain_response(self, path: str) -> Optional[Response]:
+        """清单就绪前直接返回磁盘上的文件"""
+        path = path.lstrip("/")
+        if path == "" or path.endswith("/"):
+            path += "index.html"
+        full_path = os.path.normpath(os.path.join(self.directory, path))
+        if not full_path.startswith(self.directory + os.sep) or not os.path.isfile(full_path):
+            return None
+        return FileResponse(full_path, headers={"Cache-Control": REVALIDATE_CACHE})
+
+    def lookup(self, path: str) -> Optional[StaticAsset]:
+        path = path.lstrip("/")
+        if path == "" or path.endswith("/"):
+            path += "index.html"
+        return self.manifest.get(path)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            raise HTTPException(status_code=404)
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405)
+
+        self._maybe_rescan()
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+
+        if not self.ready:
+            response = self._plain_response(path)
+        else:
+            asset = self.lookup(path)
+            response = None if asset is None else self.file_response(asset, Headers(scope=scope))
+        if response is None:
+            # 带扩展名的路径视为缺失的文件，其余交给SPA回退（由404处理器返回index.html）
+            raise HTTPException(status_code=404)
+        await response(scope, receive, send)
+
+    def file_response(self, asset: StaticAsset, request_headers: Headers) -> Response:
+        accepted = parse_accept_encoding(request_headers.get("accept-encoding", ""))
+        encoding = next(
+            (name for name in VARIANT_SUFFIXES if name in asset.variants and accepted.get(name, 0) > 0), None
+        )
+        etag = asset.etag if encoding is None else asset.etag[:-1] + ETAG_SUFFIXES[encoding] + '"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        # 按选中的表示比较（弱比较，忽略W/前缀）
+        if_none_match = request_headers.get("if-none-match", "")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [
+            tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")
+        ]):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            variant = asset.variants[encoding]
+            headers["Content-Encoding"] = encoding
+            if isinstance(variant, bytes):
+                return Response(variant, media_type=asset.media_type, headers=headers)
+            return FileResponse(variant, media_type=asset.media_type, headers=headers)
+
+        if asset.memory is not None:
+            return Response(asset.memory, media_type=asset.media_type, headers=headers)
+        return FileResponse(asset.path, media_type=asset.media_type, headers=headers)
+
+    def index_response(self, request_headers: Headers) -> Optional[Response]:
+        """SPA回退：返回内存中的index.html"""
+        self._maybe_rescan()
+        if not self.ready:
+            return self._plain_response("index.html")
+        if self.index is None:
+            return None
+        return self.file_response(self.index, request_headers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "ready": self.ready,
+            "files": len(self.manifest),
+            "immutable": sum(1 for asset in self.manifest.values() if asset.immutable),
+            "precompressed": sum(1 for asset in self.manifest.values() if asset.variants),
+            # 内存中保存的资源及压缩数据的字节数
+            "memory_bytes": sum(
+                len(asset.memory or b"") + sum(len(v) for v in asset.variants.values() if isinstance(v, bytes))
+                for asset in self.manifest.values()
+            ),
+        }
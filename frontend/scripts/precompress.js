@@ -0,0 +1,57 @@
+/**
+ * 构建后预压缩脚本
+ * 为dist中的文本资源生成 .br 和 .gz 文件，后端按Accept-Encoding直接发送，
+ * 无需在每次请求时压缩
+ */
+import fs from "fs";
+import path from "path";
+import zlib from "zlib";
+import { fileURLToPath } from "url";
+
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+const distDir = path.join(__dirname, "..", "dist");
+
+// 需要预压缩的文件类型及最小大小
+const COMPRESSIBLE = new Set([".js", ".mjs", ".css", ".html", ".json", ".svg", ".txt", ".map", ".wasm"]);
+const MIN_SIZE = 1024;
+
+const walk = (dir) =>
+  fs.readdirSync(dir, { withFileTypes: true }).flatMap((entry) => {
+    const full = path.join(dir, entry.name);
+    return entry.isDirectory() ? walk(full) : [full];
+  });
+
+if (!fs.existsSync(distDir)) {
+  console.error(`构建目录不存在: ${distDir}`);
+  process.exit(1);
+}
+
+let count = 0;
+let originalBytes = 0;
+let brotliBytes = 0;
+
+for (const file of walk(distDir)) {
+  if (!COMPRESSIBLE.has(path.extname(file))) continue;
+  const data = fs.readFileSync(file);
+  if (data.length < MIN_SIZE) continue;
+
+  const br = zlib.brotliCompressSync(data, {
+    params: {
+      [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+      [zlib.constants.BROTLI_PARAM_SIZE_HINT]: data.length,
+    },
+  });
+  const gz = zlib.gzipSync(data, { level: 9 });
+
+  // 压缩后没有变小的文件不生成对应版本
+  if (br.length < data.length) fs.writeFileSync(`${file}.br`, br);
+  if (gz.length < data.length) fs.writeFileSync(`${file}.gz`, gz);
+
+  count += 1;
+  originalBytes += data.length;
+  brotliBytes += Math.min(br.length, data.length);
+}
+
+console.log(
+  `预压缩完成: ${count} 个文件，${(originalBytes / 1024).toFixed(1)} KB -> ${(brotliBytes / 1024).toFixed(1)} KB (brotli)`
+);
@@ -87,6 +87,12 @@ export const systemApi = {
 
   // 获取系统日志
   getLogs: () => axios.get(createUrl("/logs/system")),
+
+  // 一次获取仪表盘的多个数据分区，例如 ["stats", "status"]
+  getDashboard: (sections) =>
+    axios.get(createUrl("/dashboard"), {
+      params: sections ? { sections: sections.join(",") } : undefined,
+    }),
 };
 
 // 实例统计 - 修改为使用旧API
@@ -23,14 +23,24 @@ export class WebSocketService {
     this.reconnectDelay = options.reconnectDelay || 3000;
     this.maxReconnectAttempts = options.maxReconnectAttempts || 5;
     this.autoReconnect = options.autoReconnect !== false;
+    // 帧模式: framing 为 'single' 或 'batch'；encoding 为 'msgpack' 时需同时提供 decoder
+    this.framing = options.framing || null;
+    this.encoding = options.encoding || null;
+    this.decoder = options.decoder || null;
+    // 已收到的最后一条广播序号及服务端epoch，用于重连后只补发缺失的消息
+    this.lastSeq = null;
+    this.epoch = null;
     
     this.ws = null;
     this.reconnectAttempts = 0;
+    // 服务端订阅状态，重连后自动恢复；null 表示使用默认（全部主题）
+    this.subscription = options.topics ? { topics: [...options.topics], level: options.level || null } : null;
     this.listeners = {
       open: [],
       message: [],
       close: [],
-      error: []
+      error: [],
+      gap: []
     };
     
     if (this.url) {
@@ -49,22 +59,37 @@ export class WebSocketService {
     
     try {
       console.log('正在连接WebSocket:', this.url);
-      this.ws = new WebSocket(this.url);
+      this.ws = new WebSocket(this._buildUrl());
       
       this.ws.onopen = (event) => {
         console.log('WebSocket连接已建立');
         this.reconnectAttempts = 0;
+        this._restoreSubscription();
         this._trigger('open', event);
       };
       
+      this.ws.binaryType = 'arraybuffer';
+      
       this.ws.onmessage = (event) => {
         let data = event.data;
-        try {
-          data = JSON.parse(event.data);
-        } catch (e) {
-          // 如果不是JSON，保持原样
+        if (data instanceof ArrayBuffer) {
+          // 二进制帧（msgpack），需要通过 options.decoder 提供解码函数
+          if (!this.decoder) return;
+          data = this.decoder(new Uint8Array(data));
+        } else {
+          try {
+            data = JSON.parse(event.data);
+          } catch (e) {
+            // 如果不是JSON，保持原样
+          }
+        }
+        
+        // 批量帧拆分为单条消息分发
+        if (data && data.type === 'batch' && Array.isArray(data.messages)) {
+          data.messages.forEach(message => this._dispatch(message));
+          return;
         }
-        this._trigger('message', data);
+        this._dispatch(data);
       };
       
       this.ws.onclose = (event) => {
@@ -88,6 +113,51 @@ export class WebSocketService {
     }
   }
   
+  /**
+   * 记录序号并分发消息
+   * @private
+   */
+  _dispatch(data) {
+    if (data && typeof data === 'object') {
+      if (data.type === 'welcome') {
+        if (this.epoch !== data.epoch) this.lastSeq = null;
+        this.epoch = data.epoch;
+        if (this.lastSeq === null) this.lastSeq = data.seq;
+      } else if (data.type === 'gap') {
+        // 缺口过大或服务端已重启，需要通过HTTP重新拉取日志
+        this.epoch = data.epoch;
+        this.lastSeq = data.seq;
+        this._trigger('gap', data);
+        return;
+      } else if (typeof data.seq === 'number' && (this.lastSeq === null || data.seq > this.lastSeq)) {
+        this.lastSeq = data.seq;
+      }
+    }
+    this._trigger('message', data);
+  }
+  
+  /**
+   * 在URL上附加订阅、帧模式与断线续传参数
+   * 订阅随连接一起发送，服务端补发断线期间的消息时已按订阅过滤
+   * @private
+   */
+  _buildUrl() {
+    const params = [];
+    if (this.subscription) {
+      params.push(`topics=${this.subscription.topics.map(encodeURIComponent).join(',')}`);
+      if (this.subscription.level) params.push(`level=${encodeURIComponent(this.subscription.level)}`);
+    }
+    if (this.lastSeq !== null && this.epoch) {
+      params.push(`resume_from=${this.lastSeq}`, `epoch=${encodeURIComponent(this.epoch)}`);
+    }
+    if (this.framing) params.push(`framing=${encodeURIComponent(this.framing)}`);
+    if (this.encoding && (this.encoding !== 'msgpack' || this.decoder)) {
+      params.push(`encoding=${encodeURIComponent(this.encoding)}`);
+    }
+    if (!params.length) return this.url;
+    return `${this.url}${this.url.includes('?') ? '&' : '?'}${params.join('&')}`;
+  }
+  
   /**
    * 安排重新连接
    * @private
@@ -125,6 +195,62 @@ export class WebSocketService {
     }
   }
   
+  /**
+   * 订阅服务端日志主题，只接收感兴趣的消息
+   * 主题示例: 'system'、'alert'、'deploy:<任务>'、'instance:<实例名>'、'instance:*'、'component:<组件名>'
+   * @param {string|string[]} topics 主题列表
+   * @param {string} [level] 最低日志级别，例如 'WARNING'
+   */
+  subscribe(topics, level) {
+    const list = Array.isArray(topics) ? topics : [topics];
+    if (!this.subscription) {
+      // 首次显式订阅时取消默认的全部订阅
+      this.subscription = { topics: [], level: null };
+      this.send({ action: 'unsubscribe', topics: ['*'] });
+    }
+    list.forEach(topic => {
+      if (!this.subscription.topics.includes(topic)) this.subscription.topics.push(topic);
+    });
+    if (level) this.subscription.level = level;
+    return this.send({ action: 'subscribe', topics: list, ...(level ? { level } : {}) });
+  }
+
+  /**
+   * 取消订阅服务端日志主题
+   * @param {string|string[]} topics 主题列表
+   */
+  unsubscribe(topics) {
+    const list = Array.isArray(topics) ? topics : [topics];
+    if (this.subscription) {
+      this.subscription.topics = this.subscription.topics.filter(topic => !list.includes(topic));
+    }
+    return this.send({ action: 'unsubscribe', topics: list });
+  }
+
+  /**
+   * 设置服务端过滤的最低日志级别
+   * @param {string} level 日志级别
+   */
+  setLevel(level) {
+    if (!this.subscription) this.subscription = { topics: ['*'], level: null };
+    this.subscription.level = level;
+    return this.send({ action: 'set_level', level });
+  }
+
+  /**
+   * 重连后恢复订阅状态
+   * @private
+   */
+  _restoreSubscription() {
+    if (!this.subscription) return;
+    this.send({ action: 'unsubscribe', topics: ['*'] });
+    this.send({
+      action: 'subscribe',
+      topics: this.subscription.topics,
+      ...(this.subscription.level ? { level: this.subscription.level } : {})
+    });
+  }
+
   /**
    * 关闭连接
    */
@@ -195,7 +321,8 @@ export const getLogWebSocketService = () => {
       url: getWebSocketUrl('/api/logs/ws'),
       reconnectDelay: 3000,
       maxReconnectAttempts: 3, // 减少重连尝试次数，更快进入模拟模式
-      autoReconnect: true
+      autoReconnect: true,
+      framing: 'batch' // 高频日志合并为批量帧
     });
   }
   return logWebSocketInstance;
@@ -7,8 +7,11 @@ import { ElMessage } from 'element-plus';
 
 // 全局变量定义
 const TIMEOUT = 5000; // 5秒超时
-const CHECK_INTERVAL = 5000; // 5秒重试间隔
-const MAX_RETRIES = 12; // 最多重试12次
+// 重试间隔从250毫秒开始逐次翻倍，最长5秒；后端刚启动时能尽快连上，
+// 总等待时间与原先固定5秒间隔重试12次相近（约1分钟）
+const INITIAL_RETRY_DELAY = 250;
+const MAX_RETRY_DELAY = 5000;
+const MAX_RETRIES = 16; // 最多重试16次
 
 let isChecking = false;
 let wasEverConnected = false;
@@ -120,7 +123,8 @@ const enableMockMode = (reason) => {
 export const startConnectionRetry = (onConnected = null) => {
   // 清除已有的重试计时器
   if (checkTimer) {
-    clearInterval(checkTimer);
+    clearTimeout(checkTimer);
+    checkTimer = null;
   }
   
   // 存储回调
@@ -128,23 +132,24 @@ export const startConnectionRetry = (onConnected = null) => {
     onConnectedCallback = onConnected;
   }
   
-  // 立即执行一次检查
-  checkBackendConnection();
+  let delay = INITIAL_RETRY_DELAY;
+  
+  const scheduleRetry = () => {
+    checkTimer = setTimeout(retry, delay);
+    delay = Math.min(delay * 2, MAX_RETRY_DELAY);
+  };
   
-  // 设置重试计时器
-  checkTimer = setInterval(async () => {
+  const retry = async () => {
+    checkTimer = null;
+    
     // 如果已连接，不需要重试
     if (!window._useMockData) {
-      clearInterval(checkTimer);
-      checkTimer = null;
       return;
     }
     
     // 达到最大重试次数，停止重试
     if (retryCount >= MAX_RETRIES) {
       console.warn('后端连接重试次数已达上限，不再尝试连接');
-      clearInterval(checkTimer);
-      checkTimer = null;
       return;
     }
     
@@ -154,15 +159,22 @@ export const startConnectionRetry = (onConnected = null) => {
     const connected = await checkBackendConnection();
     if (connected) {
       console.log('后端服务连接成功，停止重试');
-      clearInterval(checkTimer);
-      checkTimer = null;
+      return;
+    }
+    scheduleRetry();
+  };
+  
+  // 立即执行一次检查，失败后按退避间隔重试
+  checkBackendConnection().then((connected) => {
+    if (!connected) {
+      scheduleRetry();
     }
-  }, CHECK_INTERVAL);
+  });
   
   // 返回清理函数
   return () => {
     if (checkTimer) {
-      clearInterval(checkTimer);
+      clearTimeout(checkTimer);
       checkTimer = null;
     }
   };
@@ -173,7 +185,7 @@ export const startConnectionRetry = (onConnected = null) => {
  */
 export const stopConnectionRetry = () => {
   if (checkTimer) {
-    clearInterval(checkTimer);
+    clearTimeout(checkTimer);
     checkTimer = null;
   }
   retryCount = 0;